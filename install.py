@@ -28,12 +28,12 @@ def check_python():
     """Verifica versão do Python"""
     print("🐍 Verificando Python...")
     
-    if sys.version_info >= (3, 8):
+    if sys.version_info >= (3, 10):
         print(f"   ✅ Python {sys.version_info.major}.{sys.version_info.minor} OK")
         return True
     else:
-        print(f"   ❌ Python {sys.version_info.major}.{sys.version_info.minor} - Requer 3.8+")
-        print("   💡 Instale Python 3.8+ em: https://python.org")
+        print(f"   ❌ Python {sys.version_info.major}.{sys.version_info.minor} - Requer 3.10+")
+        print("   💡 Instale Python 3.10+ em: https://python.org")
         return False
 
 def install_dependencies():
@@ -63,7 +63,9 @@ def install_dependencies():
                     "cryptography>=43.0.0",
                     "python-multipart>=0.0.9",
                     "aiohttp>=3.10.0",
-                    "psutil>=5.9.0"
+                    "psutil>=5.9.0",
+                    "orjson>=3.9.0",
+                    "msgspec>=0.18.0"
                 ]
 
                 failed_deps = []
@@ -88,7 +90,9 @@ def install_dependencies():
                 "cryptography>=43.0.0",
                 "python-multipart>=0.0.9",
                 "aiohttp>=3.10.0",
-                "psutil>=5.9.0"
+                "psutil>=5.9.0",
+                "orjson>=3.9.0",
+                "msgspec>=0.18.0"
             ]
             
             for dep in dependencies:
@@ -101,7 +105,7 @@ def install_dependencies():
     except subprocess.CalledProcessError as e:
         print(f"   ❌ Erro na instalação: {e}")
         print("   💡 Tente instalar manualmente:")
-        print("   pip install fastapi uvicorn requests cryptography aiohttp")
+        print("   pip install fastapi uvicorn requests cryptography aiohttp orjson msgspec")
         return False
 
 def create_directories():
@@ -425,7 +429,7 @@ def main():
     if not install_dependencies():
         print("\n❌ Falha na instalação das dependências!")
         print("💡 Tente instalar manualmente:")
-        print("   pip install fastapi uvicorn requests cryptography aiohttp")
+        print("   pip install fastapi uvicorn requests cryptography aiohttp orjson msgspec")
         sys.exit(1)
     
     create_start_scripts()
@@ -10,9 +10,12 @@ import os
 import sys
 import json
 import requests
+import selectors
 import threading
 from urllib.parse import urlparse
 
+from setup_cloudflare_auto import download_executable
+
 class CloudflareTunnelSetup:
     def __init__(self, port=8000):
         self.port = port
@@ -130,17 +133,12 @@ class CloudflareTunnelSetup:
         print("📁 Fazendo download manual...")
         
         try:
-            import urllib.request
-            
             # URL do release mais recente
             url = "https://github.com/cloudflare/cloudflared/releases/latest/download/cloudflared-windows-amd64.exe"
             local_file = "cloudflared.exe"
             
             print(f"⬇️ Baixando de: {url}")
-            urllib.request.urlretrieve(url, local_file)
-            
-            # Tornar executável
-            os.chmod(local_file, 0o755)
+            self._download_executable(url, local_file)
             
             print(f"✅ Download concluído: {local_file}")
             return f"./{local_file}"
@@ -149,6 +147,10 @@ class CloudflareTunnelSetup:
             print(f"❌ Erro no download: {e}")
             return False
     
+    def _download_executable(self, url, local_file):
+        """Baixa um binário já criando o arquivo com permissão de execução"""
+        download_executable(url, local_file)
+    
     def _install_macos(self):
         """Instala no macOS"""
         print("🍎 Instalando para macOS...")
@@ -175,10 +177,8 @@ class CloudflareTunnelSetup:
         except:
             try:
                 # Download direto
-                import urllib.request
                 url = "https://github.com/cloudflare/cloudflared/releases/latest/download/cloudflared-linux-amd64"
-                urllib.request.urlretrieve(url, "cloudflared")
-                os.chmod("cloudflared", 0o755)
+                self._download_executable(url, "cloudflared")
                 print("📁 Baixado cloudflared")
                 return "./cloudflared"
             except Exception as e:
@@ -220,35 +220,56 @@ class CloudflareTunnelSetup:
         """Aguarda e extrai URL do túnel"""
         print("⏳ Aguardando URL do túnel...")
         
+        # No Windows o select não funciona com pipes: mantém a leitura por linha
+        if os.name == 'nt':
+            return self._wait_for_tunnel_url_polling(timeout)
+        
+        deadline = time.monotonic() + timeout
+        stderr_fd = self.tunnel_process.stderr.fileno()
+        pending = ""
+        
+        # Acorda apenas quando chegam dados no stderr (epoll/kqueue/select)
+        with selectors.DefaultSelector() as sel:
+            sel.register(stderr_fd, selectors.EVENT_READ)
+            
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                
+                events = sel.select(timeout=remaining)
+                if not events:
+                    break
+                
+                chunk = os.read(stderr_fd, 4096)
+                if not chunk:
+                    # EOF: processo morreu
+                    self._report_tunnel_failure()
+                    return None
+                
+                pending += chunk.decode(errors='replace')
+                *lines, pending = pending.split('\n')
+                for line in lines:
+                    if self._check_tunnel_line(line):
+                        return self.tunnel_url
+        
+        print("⚠️ Timeout aguardando URL do túnel")
+        return None
+    
+    def _wait_for_tunnel_url_polling(self, timeout):
+        """Aguarda URL do túnel lendo o stderr linha por linha (Windows)"""
         start_time = time.time()
         
         while time.time() - start_time < timeout:
             if self.tunnel_process.poll() is not None:
-                # Processo morreu
-                try:
-                    stdout, stderr = self.tunnel_process.communicate(timeout=2)
-                    print(f"❌ Processo falhou:")
-                    print(f"   stdout: {stdout}")
-                    print(f"   stderr: {stderr}")
-                except:
-                    pass
+                self._report_tunnel_failure()
                 return None
             
             # Ler stderr linha por linha
             try:
                 line = self.tunnel_process.stderr.readline()
-                if line:
-                    print(f"   Log: {line.strip()}")
-                    
-                    # Procurar URL do tipo trycloudflare.com
-                    if 'trycloudflare.com' in line and 'https://' in line:
-                        # Extrair URL
-                        parts = line.split()
-                        for part in parts:
-                            if 'trycloudflare.com' in part and part.startswith('https://'):
-                                self.tunnel_url = part.strip()
-                                print(f"✅ Túnel ativo: {self.tunnel_url}")
-                                return self.tunnel_url
+                if line and self._check_tunnel_line(line):
+                    return self.tunnel_url
             except:
                 pass
             
@@ -257,6 +278,33 @@ class CloudflareTunnelSetup:
         print("⚠️ Timeout aguardando URL do túnel")
         return None
     
+    def _check_tunnel_line(self, line):
+        """Procura URL do tipo trycloudflare.com em uma linha de log"""
+        if not line.strip():
+            return False
+        
+        print(f"   Log: {line.strip()}")
+        
+        if 'trycloudflare.com' in line and 'https://' in line:
+            # Extrair URL
+            parts = line.split()
+            for part in parts:
+                if 'trycloudflare.com' in part and part.startswith('https://'):
+                    self.tunnel_url = part.strip()
+                    print(f"✅ Túnel ativo: {self.tunnel_url}")
+                    return True
+        return False
+    
+    def _report_tunnel_failure(self):
+        """Mostra a saída do processo cloudflared que terminou"""
+        try:
+            stdout, stderr = self.tunnel_process.communicate(timeout=2)
+            print(f"❌ Processo falhou:")
+            print(f"   stdout: {stdout}")
+            print(f"   stderr: {stderr}")
+        except:
+            pass
+    
     def test_tunnel(self):
         """Testa se o túnel está funcionando"""
         if not self.tunnel_url:
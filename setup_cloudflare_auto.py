@@ -12,31 +12,57 @@ import urllib.request
 import zipfile
 import shutil
 
+# Valores de platform.machine() (minúsculos) por família de arquitetura
+_ARM64 = frozenset({'arm64', 'aarch64'})
+_ARM32 = frozenset({'arm', 'armv7l', 'armv6l'})
+_X64 = frozenset({'x86_64', 'amd64', 'x64'})
+
 def detect_system():
     """Detecta o sistema operacional"""
     system = platform.system().lower()
     arch = platform.machine().lower()
 
     if system == "windows":
-        if "64" in arch or "amd64" in arch:
+        if arch in _X64 or arch in _ARM64:
             return "windows-amd64"
         else:
             return "windows-386"
     elif system == "darwin":  # macOS
-        if "arm" in arch or "m1" in arch or "m2" in arch:
+        if arch in _ARM64:
             return "darwin-arm64"
         else:
             return "darwin-amd64"
     elif system == "linux":
-        if "64" in arch or "amd64" in arch:
+        if arch in _X64:
             return "linux-amd64"
-        elif "arm" in arch:
+        elif arch in _ARM64:
             return "linux-arm64"
+        elif arch in _ARM32 or arch.startswith('arm'):
+            # Demais variantes 32 bits (armv8l, armv7, armhf, armv5tel...)
+            return "linux-arm"
         else:
             return "linux-386"
     else:
         return None
 
+def download_executable(url, local_file):
+    """Baixa um binário já criando o arquivo com permissão de execução"""
+    # Conecta antes de criar qualquer arquivo e grava num temporário ao lado do destino:
+    # um download que falhe não deixa um executável vazio/parcial no lugar do binário
+    tmp_file = os.path.join(os.path.dirname(os.path.abspath(local_file)),
+                            f".{os.path.basename(local_file)}.{os.getpid()}.part")
+    try:
+        with urllib.request.urlopen(url) as response:
+            # O modo é aplicado na criação (ignorado no Windows), dispensando o chmod
+            fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o755)
+            with os.fdopen(fd, 'wb') as out:
+                shutil.copyfileobj(response, out)
+        os.replace(tmp_file, local_file)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
 def check_cloudflared():
     """Verifica se cloudflared já está instalado"""
     try:
@@ -75,7 +101,7 @@ def install_cloudflared_windows():
     try:
         url = "https://github.com/cloudflare/cloudflared/releases/latest/download/cloudflared-windows-amd64.exe"
         print("📥 Baixando cloudflared...")
-        urllib.request.urlretrieve(url, "cloudflared.exe")
+        download_executable(url, "cloudflared.exe")
         print("✅ Cloudflared baixado como cloudflared.exe")
 
         # Testar se funciona
@@ -107,8 +133,7 @@ def install_cloudflared_macos():
         arch = detect_system()
         url = f"https://github.com/cloudflare/cloudflared/releases/latest/download/cloudflared-{arch}"
         print("📥 Baixando cloudflared...")
-        urllib.request.urlretrieve(url, "cloudflared")
-        os.chmod("cloudflared", 0o755)
+        download_executable(url, "cloudflared")
         print("✅ Cloudflared baixado como ./cloudflared")
 
         # Testar se funciona
@@ -160,8 +185,7 @@ def install_cloudflared_linux():
         arch = detect_system()
         url = f"https://github.com/cloudflare/cloudflared/releases/latest/download/cloudflared-{arch}"
         print("📥 Baixando cloudflared...")
-        urllib.request.urlretrieve(url, "cloudflared")
-        os.chmod("cloudflared", 0o755)
+        download_executable(url, "cloudflared")
         print("✅ Cloudflared baixado como ./cloudflared")
 
         # Testar se funciona
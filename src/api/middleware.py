@@ -0,0 +1,118 @@
+"""
+Middlewares ASGI puros da API
+Evitam o custo por requisição do BaseHTTPMiddleware (task extra, Request/Response)
+"""
+
+import logging
+from urllib.parse import parse_qs
+
+logger = logging.getLogger(__name__)
+
+
+class ASGICORSMiddleware:
+    """CORS liberado para qualquer origem, implementado direto sobre o protocolo ASGI"""
+
+    ALLOW_METHODS = b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"
+    MAX_AGE = b"600"
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = dict(scope["headers"])
+        origin = request_headers.get(b"origin")
+
+        # Requisições sem Origin não são CORS: seguem direto
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Com credenciais a origem precisa ser explícita (não "*")
+        allow_origin = origin if b"cookie" in request_headers else b"*"
+
+        # Preflight: responde aqui mesmo, sem passar pelo roteamento
+        if scope["method"] == "OPTIONS" and b"access-control-request-method" in request_headers:
+            headers = [
+                (b"access-control-allow-origin", origin),
+                (b"access-control-allow-credentials", b"true"),
+                (b"access-control-allow-methods", self.ALLOW_METHODS),
+                (b"access-control-max-age", self.MAX_AGE),
+                (b"vary", b"Origin"),
+                (b"content-length", b"0"),
+            ]
+            requested_headers = request_headers.get(b"access-control-request-headers")
+            if requested_headers:
+                headers.append((b"access-control-allow-headers", requested_headers))
+
+            await send({"type": "http.response.start", "status": 204, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"access-control-allow-origin", allow_origin))
+                headers.append((b"access-control-allow-credentials", b"true"))
+                if allow_origin is origin:
+                    headers.append((b"vary", b"Origin"))
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+
+class ProfilerMiddleware:
+    """Perfila a requisição com pyinstrument quando a URL tem o parâmetro profile=1
+
+    Expõe caminhos e pilhas internas: só é montado com DECTERUM_PROFILING ativo (ver create_app).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def wants_profile(scope) -> bool:
+        """True só para o parâmetro exato profile=1 (não casa xprofile=1 nem profile=10)"""
+        query_string = scope.get("query_string", b"")
+        if b"profile" not in query_string:
+            return False
+        return parse_qs(query_string.decode("latin-1")).get("profile") == ["1"]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning("⚠️ pyinstrument não instalado - profiling desabilitado")
+            await self.app(scope, receive, send)
+            return
+
+        # Só rotas async def são perfiladas de forma útil (as sync rodam em threads)
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+
+        async def discard_response(message):
+            pass
+
+        try:
+            await self.app(scope, receive, discard_response)
+        finally:
+            profiler.stop()
+
+        body = profiler.output_html().encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/html; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
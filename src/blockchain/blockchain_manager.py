@@ -5,7 +5,10 @@ Gerencia escolha entre blockchain simples ou real
 
 import os
 import asyncio
-from typing import Optional
+from collections import defaultdict, deque
+from itertools import islice
+from typing import Dict, Optional
+from cryptography.hazmat.primitives import serialization
 from .dtc_blockchain import DTCBlockchain as SimpleBlockchain
 from .real_blockchain import DTCBlockchain as RealBlockchain, DTCWallet, DTCMiner
 from .p2p_network import DTCNetworkNode
@@ -31,6 +34,15 @@ class BlockchainManager:
         self.is_network_started = False
         self.mining_active = False
 
+        # Índice endereço -> transações do blockchain real (atualizado incrementalmente)
+        self._addr_index: Dict[str, deque] = defaultdict(lambda: deque(maxlen=10_000))
+        self._indexed_chain = None
+        self._indexed_height = 0
+        self._indexed_tip_hash = None
+
+        # PEM da chave privada da carteira atual: (carteira, texto), gerado uma vez
+        self._wallet_pem = None
+
     def initialize(self, user_id: str):
         """Inicializa o blockchain escolhido"""
         if self.use_real_blockchain:
@@ -50,6 +62,33 @@ class BlockchainManager:
         self.real_blockchain = RealBlockchain(self.wallet.address)
         self.miner = DTCMiner(self.real_blockchain, self.wallet)
         self.p2p_node = DTCNetworkNode(self.real_blockchain, self.wallet, self.port)
+        self._reset_address_index()
+
+    def _reset_address_index(self):
+        """Descarta o índice de endereços para ser reconstruído"""
+        self._addr_index.clear()
+        self._indexed_chain = None
+        self._indexed_height = 0
+        self._indexed_tip_hash = None
+
+    def _sync_address_index(self):
+        """Indexa apenas os blocos adicionados desde a última consulta"""
+        chain = self.real_blockchain.chain
+
+        # Chain substituída (sincronização P2P) ou reorganizada: reconstrói
+        if (chain is not self._indexed_chain or len(chain) < self._indexed_height or
+                (self._indexed_height and chain[self._indexed_height - 1].hash != self._indexed_tip_hash)):
+            self._reset_address_index()
+            self._indexed_chain = chain
+
+        for block in islice(chain, self._indexed_height, None):
+            for tx in block.transactions:
+                self._addr_index[tx.sender_address].append(tx)
+                if tx.recipient_address != tx.sender_address:
+                    self._addr_index[tx.recipient_address].append(tx)
+
+        self._indexed_height = len(chain)
+        self._indexed_tip_hash = chain[-1].hash if chain else None
 
     async def start_network(self):
         """Inicia rede P2P (apenas para blockchain real)"""
@@ -116,28 +155,25 @@ class BlockchainManager:
     def get_transactions(self, user_id: str, limit: int = 50) -> list:
         """Obtém transações (unificado)"""
         if self.use_real_blockchain:
-            transactions = []
             address = self.wallet.address if user_id == "current_user" else user_id
 
-            # Busca em todos os blocos
-            for block in reversed(self.real_blockchain.chain):
-                for tx in block.transactions:
-                    if tx.sender_address == address or tx.recipient_address == address:
-                        transactions.append({
-                            "id": tx.id,
-                            "sender": tx.sender_address,
-                            "recipient": tx.recipient_address,
-                            "amount": tx.amount,
-                            "transaction_type": getattr(tx, 'metadata', {}).get('type', 'transfer'),
-                            "timestamp": tx.timestamp,
-                            "delivered": True,
-                            "read": True
-                        })
-
-                if len(transactions) >= limit:
-                    break
-
-            return transactions[:limit]
+            self._sync_address_index()
+            if address not in self._addr_index:
+                return []
+
+            return [
+                {
+                    "id": tx.id,
+                    "sender": tx.sender_address,
+                    "recipient": tx.recipient_address,
+                    "amount": tx.amount,
+                    "transaction_type": getattr(tx, 'metadata', {}).get('type', 'transfer'),
+                    "timestamp": tx.timestamp,
+                    "delivered": True,
+                    "read": True
+                }
+                for tx in islice(reversed(self._addr_index[address]), limit)
+            ]
         else:
             return self.simple_blockchain.get_user_transactions(user_id, limit)
 
@@ -185,32 +221,35 @@ class BlockchainManager:
     def export_wallet(self) -> dict:
         """Exporta carteira (blockchain real)"""
         if self.use_real_blockchain and self.wallet:
-            from cryptography.hazmat.primitives import serialization
             return {
                 "address": self.wallet.address,
-                "private_key_pem": self.wallet.private_key.private_bytes(
-                    encoding=serialization.Encoding.PEM,
-                    format=serialization.PrivateFormat.PKCS8,
-                    encryption_algorithm=serialization.NoEncryption()
-                ).decode(),
+                "private_key_pem": self._get_wallet_pem(),
                 "balance": self.get_balance("current_user"),
                 "blockchain_type": "real"
             }
         return {"error": "Only available for real blockchain"}
 
-    def get_exchange_rates(self) -> dict:
+    def _get_wallet_pem(self) -> str:
+        """PEM (PKCS8) da chave privada; a chave não muda, então serializa uma vez por carteira"""
+        if self._wallet_pem is None or self._wallet_pem[0] is not self.wallet:
+            pem = self.wallet.private_key.private_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption()
+            ).decode()
+            self._wallet_pem = (self.wallet, pem)
+        return self._wallet_pem[1]
+
+    async def get_exchange_rates(self) -> dict:
         """Obtém taxas de câmbio"""
-        return {
-            "DTC_USD": dtc_exchange.get_exchange_rate("DTC", "USD"),
-            "DTC_BTC": dtc_exchange.get_exchange_rate("DTC", "BTC"),
-            "DTC_ETH": dtc_exchange.get_exchange_rate("DTC", "ETH"),
-            "market_info": dtc_exchange.get_dtc_market_info()
-        }
-
-    def calculate_conversion(self, amount: float, from_currency: str, to_currency: str) -> dict:
+        rates = await dtc_exchange.get_exchange_rates([("DTC", "USD"), ("DTC", "BTC"), ("DTC", "ETH")])
+        rates["market_info"] = dtc_exchange.get_dtc_market_info()
+        return rates
+
+    async def calculate_conversion(self, amount: float, from_currency: str, to_currency: str) -> dict:
         """Calcula conversão de moedas"""
-        return dtc_exchange.calculate_conversion(amount, from_currency, to_currency)
+        return await dtc_exchange.calculate_conversion(amount, from_currency, to_currency)
 
-    def get_supported_currencies(self) -> list:
+    def get_supported_currencies(self) -> tuple:
         """Lista moedas suportadas para conversão"""
         return dtc_exchange.get_supported_currencies()
\ No newline at end of file
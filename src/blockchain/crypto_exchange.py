@@ -3,14 +3,59 @@ DTC Crypto Exchange System
 Sistema de conversão DTC para outras criptomoedas
 """
 
-import requests
+import aiohttp
+import orjson
 import time
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 import json
 
 
-@dataclass
+# Mapeamento de símbolos para IDs do CoinGecko
+_COIN_IDS = {
+    "BTC": "bitcoin",
+    "ETH": "ethereum",
+    "BNB": "binancecoin",
+    "ADA": "cardano",
+    "USDT": "tether",
+    "USDC": "usd-coin"
+}
+_COIN_IDS_SET = frozenset(_COIN_IDS)
+
+# Origens possíveis de uma taxa (compartilhadas por todas as instâncias de ExchangeRate)
+_SRC_INTERNAL = "internal"
+_SRC_INTERNAL_INVERSE = "internal_inverse"
+_SRC_COINGECKO = "coingecko"
+
+# Modelos das instruções de conversão: DTC -> outra moeda e outra moeda -> DTC
+_INSTR_DTC_OUT = (
+    "1. Send DTC to the conversion pool",
+    "2. Wait for confirmation (1-3 blocks)",
+    "3. Receive {currency} in your external wallet",
+    "4. Transaction will be visible in your history"
+)
+_INSTR_DTC_IN = (
+    "1. Send {currency} to our conversion address",
+    "2. Provide your DTC wallet address",
+    "3. Wait for network confirmations",
+    "4. Receive DTC in your wallet (automatic)"
+)
+
+# Instruções já formatadas, por moeda
+_INSTR_DTC_OUT_CACHE: Dict[str, Tuple[str, ...]] = {}
+_INSTR_DTC_IN_CACHE: Dict[str, Tuple[str, ...]] = {}
+
+
+def _build_instructions(cache: Dict[str, Tuple[str, ...]], template: Tuple[str, ...],
+                        currency: str) -> Tuple[str, ...]:
+    """Formata as instruções para a moeda e guarda no cache"""
+    instructions = tuple(line.format(currency=currency) for line in template)
+    cache[currency] = instructions
+    return instructions
+
+
+@dataclass(slots=True, frozen=True)
 class ExchangeRate:
     """Taxa de câmbio entre criptomoedas"""
     from_currency: str
@@ -25,19 +70,39 @@ class DTCCryptoExchange:
 
     def __init__(self):
         # Taxas base (será atualizado dinamicamente)
-        self.base_rates = {
-            "DTC_USD": 0.01,    # 1 DTC = $0.01 USD
-            "DTC_BTC": 0.0000002,  # 1 DTC = 0.0000002 BTC
-            "DTC_ETH": 0.000003,   # 1 DTC = 0.000003 ETH
-            "DTC_BNB": 0.000025,   # 1 DTC = 0.000025 BNB
-            "DTC_ADA": 0.01,       # 1 DTC = 0.01 ADA
-            "DTC_USDT": 0.01,      # 1 DTC = 0.01 USDT
-            "DTC_USDC": 0.01,      # 1 DTC = 0.01 USDC
+        # Pares são tuplas (origem, destino); a forma "DTC_USD" fica só na API pública
+        self.base_rates: Dict[Tuple[str, str], float] = {
+            ("DTC", "USD"): 0.01,       # 1 DTC = $0.01 USD
+            ("DTC", "BTC"): 0.0000002,  # 1 DTC = 0.0000002 BTC
+            ("DTC", "ETH"): 0.000003,   # 1 DTC = 0.000003 ETH
+            ("DTC", "BNB"): 0.000025,   # 1 DTC = 0.000025 BNB
+            ("DTC", "ADA"): 0.01,       # 1 DTC = 0.01 ADA
+            ("DTC", "USDT"): 0.01,      # 1 DTC = 0.01 USDT
+            ("DTC", "USDC"): 0.01,      # 1 DTC = 0.01 USDC
         }
 
+        # Taxas internas nos dois sentidos: par -> (taxa, origem)
+        self._all_rates: Dict[Tuple[str, str], tuple] = {}
+        self._rebuild_internal_rates()
+
+        # Dados constantes/quase constantes servidos sem reconstrução
+        self._SUPPORTED = ("DTC", "BTC", "ETH", "BNB", "ADA", "USDT", "USDC", "USD")
+        self._market_info: Optional[Dict] = None
+        self._market_info_duration = 5  # segundos
+
         # Cache de taxas
-        self.rate_cache: Dict[str, ExchangeRate] = {}
+        # LRU limitado; pares estáveis ganham validade maior
+        self.rate_cache: "OrderedDict[Tuple[str, str], ExchangeRate]" = OrderedDict()
+        self.rate_cache_size = 256
         self.cache_duration = 300  # 5 minutos
+        self.stable_cache_duration = 1800  # 30 minutos
+        self.stable_rate_threshold = 0.001  # desvio padrão / média
+
+        # Estatísticas móveis por par: (amostras, média, variância)
+        self._rate_stats: "OrderedDict[Tuple[str, str], tuple]" = OrderedDict()
+
+        # Sessão HTTP reutilizada entre chamadas (keep-alive), criada sob demanda
+        self._http: Optional[aiohttp.ClientSession] = None
 
         # Suporte a exchanges externas
         self.supported_exchanges = {
@@ -55,61 +120,130 @@ class DTCCryptoExchange:
             }
         }
 
-    def get_exchange_rate(self, from_currency: str, to_currency: str) -> Optional[ExchangeRate]:
+    def _get_http_session(self) -> aiohttp.ClientSession:
+        """Retorna a sessão HTTP compartilhada, criando-a no loop atual se preciso"""
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=10),
+                connector=aiohttp.TCPConnector(limit_per_host=8)
+            )
+        return self._http
+
+    async def close(self):
+        """Fecha a sessão HTTP compartilhada"""
+        if self._http is not None and not self._http.closed:
+            await self._http.close()
+        self._http = None
+
+    def _get_cached_rate(self, pair: Tuple[str, str]) -> Optional[ExchangeRate]:
+        """Retorna a taxa em cache se ainda estiver válida"""
+        cached_rate = self.rate_cache.get(pair)
+        if not cached_rate:
+            return None
+
+        if time.time() - cached_rate.timestamp < self._cache_ttl(pair):
+            self.rate_cache.move_to_end(pair)
+            return cached_rate
+
+        del self.rate_cache[pair]
+        return None
+
+    def _cache_ttl(self, pair: Tuple[str, str]) -> float:
+        """Validade do cache do par de acordo com a volatilidade observada"""
+        stats = self._rate_stats.get(pair)
+        if stats:
+            samples, mean, variance = stats
+            if samples >= 3 and mean and variance ** 0.5 / abs(mean) < self.stable_rate_threshold:
+                return self.stable_cache_duration
+        return self.cache_duration
+
+    def _store_rate(self, pair: Tuple[str, str], rate: ExchangeRate):
+        """Guarda a taxa no LRU e atualiza a volatilidade do par"""
+        alpha = 0.2
+        samples, mean, variance = self._rate_stats.get(pair, (0, rate.rate, 0.0))
+        delta = rate.rate - mean
+        mean += alpha * delta
+        variance = (1 - alpha) * (variance + alpha * delta * delta)
+        self._rate_stats[pair] = (samples + 1, mean, variance)
+        self._rate_stats.move_to_end(pair)
+
+        self.rate_cache[pair] = rate
+        self.rate_cache.move_to_end(pair)
+
+        while len(self.rate_cache) > self.rate_cache_size:
+            self.rate_cache.popitem(last=False)
+        while len(self._rate_stats) > self.rate_cache_size:
+            self._rate_stats.popitem(last=False)
+
+    async def get_exchange_rate(self, from_currency: str, to_currency: str) -> Optional[ExchangeRate]:
         """Obtém taxa de câmbio entre duas moedas"""
-        pair = f"{from_currency}_{to_currency}"
+        pair = (from_currency, to_currency)
 
         # Verifica cache
-        if pair in self.rate_cache:
-            cached_rate = self.rate_cache[pair]
-            if time.time() - cached_rate.timestamp < self.cache_duration:
-                return cached_rate
+        cached_rate = self._get_cached_rate(pair)
+        if cached_rate:
+            return cached_rate
 
         # Busca nova taxa
-        rate = self._fetch_exchange_rate(from_currency, to_currency)
+        rate = await self._fetch_exchange_rate(from_currency, to_currency)
         if rate:
-            self.rate_cache[pair] = rate
+            self._store_rate(pair, rate)
             return rate
 
         return None
 
-    def _fetch_exchange_rate(self, from_currency: str, to_currency: str) -> Optional[ExchangeRate]:
-        """Busca taxa de câmbio"""
-        pair = f"{from_currency}_{to_currency}"
+    async def get_exchange_rates(self, pairs: List[tuple]) -> Dict[str, Optional[ExchangeRate]]:
+        """Obtém várias taxas, agrupando as consultas externas em uma única requisição"""
+        external_pairs = {
+            pair for pair in pairs
+            if pair not in self._all_rates
+            and pair[0] in _COIN_IDS_SET and pair[1] in _COIN_IDS_SET
+            and not self._get_cached_rate(pair)
+        }
 
-        # Se é conversão DTC, usa taxa base
-        if pair in self.base_rates:
-            return ExchangeRate(
-                from_currency=from_currency,
-                to_currency=to_currency,
-                rate=self.base_rates[pair],
-                timestamp=time.time(),
-                source="internal"
+        if external_pairs:
+            await self._fetch_coingecko_bulk(
+                sorted({from_currency for from_currency, _ in external_pairs}),
+                sorted({to_currency for _, to_currency in external_pairs})
             )
 
-        # Conversão inversa DTC
-        inverse_pair = f"{to_currency}_{from_currency}"
-        if inverse_pair in self.base_rates:
+        rates = {}
+        for pair in pairs:
+            from_currency, to_currency = pair
+            if pair in external_pairs:
+                # Já consultado em lote: não repete a requisição individual
+                rate = self._get_cached_rate(pair)
+            else:
+                rate = await self.get_exchange_rate(from_currency, to_currency)
+            rates[f"{from_currency}_{to_currency}"] = rate
+        return rates
+
+    async def _fetch_exchange_rate(self, from_currency: str, to_currency: str) -> Optional[ExchangeRate]:
+        """Busca taxa de câmbio"""
+        # Conversão DTC (direta ou inversa) usa as taxas base pré-calculadas
+        internal_rate = self._all_rates.get((from_currency, to_currency))
+        if internal_rate:
+            rate, source = internal_rate
             return ExchangeRate(
                 from_currency=from_currency,
                 to_currency=to_currency,
-                rate=1.0 / self.base_rates[inverse_pair],
+                rate=rate,
                 timestamp=time.time(),
-                source="internal_inverse"
+                source=source
             )
 
         # Busca em APIs externas
-        external_rate = self._fetch_external_rate(from_currency, to_currency)
+        external_rate = await self._fetch_external_rate(from_currency, to_currency)
         if external_rate:
             return external_rate
 
         return None
 
-    def _fetch_external_rate(self, from_currency: str, to_currency: str) -> Optional[ExchangeRate]:
+    async def _fetch_external_rate(self, from_currency: str, to_currency: str) -> Optional[ExchangeRate]:
         """Busca taxa em APIs externas"""
         try:
             # Tenta CoinGecko primeiro
-            rate = self._fetch_coingecko_rate(from_currency, to_currency)
+            rate = await self._fetch_coingecko_rate(from_currency, to_currency)
             if rate:
                 return rate
 
@@ -121,46 +255,69 @@ class DTCCryptoExchange:
             print(f"Erro buscando taxa externa: {e}")
             return None
 
-    def _fetch_coingecko_rate(self, from_currency: str, to_currency: str) -> Optional[ExchangeRate]:
+    async def _fetch_coingecko_rate(self, from_currency: str, to_currency: str) -> Optional[ExchangeRate]:
         """Busca taxa no CoinGecko"""
         try:
-            # Mapeamento de símbolos para IDs do CoinGecko
-            coin_ids = {
-                "BTC": "bitcoin",
-                "ETH": "ethereum",
-                "BNB": "binancecoin",
-                "ADA": "cardano",
-                "USDT": "tether",
-                "USDC": "usd-coin"
-            }
-
-            if from_currency not in coin_ids or to_currency not in coin_ids:
+            if from_currency not in _COIN_IDS_SET or to_currency not in _COIN_IDS_SET:
                 return None
 
-            from_id = coin_ids[from_currency]
+            from_id = _COIN_IDS[from_currency]
             to_currency_lower = to_currency.lower()
 
             url = f"https://api.coingecko.com/api/v3/simple/price?ids={from_id}&vs_currencies={to_currency_lower}"
-            response = requests.get(url, timeout=10)
-
-            if response.status_code == 200:
-                data = response.json()
-                if from_id in data and to_currency_lower in data[from_id]:
-                    rate = float(data[from_id][to_currency_lower])
-                    return ExchangeRate(
-                        from_currency=from_currency,
-                        to_currency=to_currency,
-                        rate=rate,
-                        timestamp=time.time(),
-                        source="coingecko"
-                    )
+            async with self._get_http_session().get(url) as response:
+                if response.status != 200:
+                    return None
+                data = orjson.loads(await response.read())
+
+            if from_id in data and to_currency_lower in data[from_id]:
+                rate = float(data[from_id][to_currency_lower])
+                return ExchangeRate(
+                    from_currency=from_currency,
+                    to_currency=to_currency,
+                    rate=rate,
+                    timestamp=time.time(),
+                    source=_SRC_COINGECKO
+                )
 
         except Exception as e:
             print(f"Erro no CoinGecko: {e}")
 
         return None
 
-    def calculate_conversion(self, amount: float, from_currency: str, to_currency: str) -> Optional[Dict]:
+    async def _fetch_coingecko_bulk(self, from_currencies: List[str], vs_currencies: List[str]):
+        """Busca no CoinGecko todas as combinações de moedas com uma única requisição"""
+        try:
+            ids = {_COIN_IDS[currency]: currency for currency in from_currencies}
+            vs = {currency.lower(): currency for currency in vs_currencies}
+
+            url = (f"https://api.coingecko.com/api/v3/simple/price"
+                   f"?ids={','.join(ids)}&vs_currencies={','.join(vs)}")
+            async with self._get_http_session().get(url) as response:
+                if response.status != 200:
+                    return
+                data = orjson.loads(await response.read())
+
+            now = time.time()
+            for coin_id, prices in data.items():
+                from_currency = ids.get(coin_id)
+                if not from_currency:
+                    continue
+                for vs_lower, price in prices.items():
+                    to_currency = vs.get(vs_lower)
+                    if to_currency and to_currency != from_currency:
+                        self._store_rate((from_currency, to_currency), ExchangeRate(
+                            from_currency=from_currency,
+                            to_currency=to_currency,
+                            rate=float(price),
+                            timestamp=now,
+                            source=_SRC_COINGECKO
+                        ))
+
+        except Exception as e:
+            print(f"Erro no CoinGecko: {e}")
+
+    async def calculate_conversion(self, amount: float, from_currency: str, to_currency: str) -> Optional[Dict]:
         """Calcula conversão entre moedas"""
         if from_currency == to_currency:
             return {
@@ -171,7 +328,7 @@ class DTCCryptoExchange:
                 "total": amount
             }
 
-        rate = self.get_exchange_rate(from_currency, to_currency)
+        rate = await self.get_exchange_rate(from_currency, to_currency)
         if not rate:
             return None
 
@@ -193,26 +350,32 @@ class DTCCryptoExchange:
             "rate_timestamp": rate.timestamp
         }
 
-    def get_supported_currencies(self) -> List[str]:
+    def get_supported_currencies(self) -> Tuple[str, ...]:
         """Lista moedas suportadas"""
-        return ["DTC", "BTC", "ETH", "BNB", "ADA", "USDT", "USDC", "USD"]
+        return self._SUPPORTED
 
     def get_dtc_market_info(self) -> Dict:
         """Informações de mercado do DTC"""
-        # Simula dados de mercado (em uma implementação real, seria baseado em volume/transações)
-        return {
-            "price_usd": self.base_rates["DTC_USD"],
-            "price_btc": self.base_rates["DTC_BTC"],
-            "market_cap_usd": self.base_rates["DTC_USD"] * 1000000,  # Simula supply de 1M
-            "volume_24h": 50000,  # Volume simulado
-            "change_24h": 0.05,   # +5% (simulado)
-            "last_updated": time.time()
-        }
+        now = time.time()
+        if self._market_info is None:
+            # Simula dados de mercado (em uma implementação real, seria baseado em volume/transações)
+            self._market_info = {
+                "price_usd": self.base_rates[("DTC", "USD")],
+                "price_btc": self.base_rates[("DTC", "BTC")],
+                "market_cap_usd": self.base_rates[("DTC", "USD")] * 1000000,  # Simula supply de 1M
+                "volume_24h": 50000,  # Volume simulado
+                "change_24h": 0.05,   # +5% (simulado)
+                "last_updated": now
+            }
+        elif now - self._market_info["last_updated"] >= self._market_info_duration:
+            self._market_info["last_updated"] = now
+
+        return self._market_info
 
-    def create_conversion_order(self, amount: float, from_currency: str, to_currency: str,
+    async def create_conversion_order(self, amount: float, from_currency: str, to_currency: str,
                               user_address: str) -> Dict:
         """Cria ordem de conversão (simulada)"""
-        conversion = self.calculate_conversion(amount, from_currency, to_currency)
+        conversion = await self.calculate_conversion(amount, from_currency, to_currency)
 
         if not conversion:
             return {
@@ -233,31 +396,36 @@ class DTCCryptoExchange:
             "instructions": self._get_conversion_instructions(from_currency, to_currency)
         }
 
-    def _get_conversion_instructions(self, from_currency: str, to_currency: str) -> List[str]:
+    def _get_conversion_instructions(self, from_currency: str, to_currency: str) -> Tuple[str, ...]:
         """Instruções para conversão"""
         if from_currency == "DTC":
-            return [
-                f"1. Send {from_currency} to the conversion pool",
-                f"2. Wait for confirmation (1-3 blocks)",
-                f"3. Receive {to_currency} in your external wallet",
-                f"4. Transaction will be visible in your history"
-            ]
-        else:
-            return [
-                f"1. Send {from_currency} to our conversion address",
-                f"2. Provide your DTC wallet address",
-                f"3. Wait for network confirmations",
-                f"4. Receive DTC in your wallet (automatic)"
-            ]
+            return (_INSTR_DTC_OUT_CACHE.get(to_currency) or
+                    _build_instructions(_INSTR_DTC_OUT_CACHE, _INSTR_DTC_OUT, to_currency))
+        return (_INSTR_DTC_IN_CACHE.get(from_currency) or
+                _build_instructions(_INSTR_DTC_IN_CACHE, _INSTR_DTC_IN, from_currency))
+
+    def _rebuild_internal_rates(self):
+        """Pré-calcula as taxas internas diretas e inversas a partir de base_rates"""
+        all_rates = {}
+        for (from_currency, to_currency), rate in self.base_rates.items():
+            all_rates[(from_currency, to_currency)] = (rate, _SRC_INTERNAL)
+            all_rates[(to_currency, from_currency)] = (1.0 / rate, _SRC_INTERNAL_INVERSE)
+        self._all_rates = all_rates
 
     def update_base_rates(self, new_rates: Dict[str, float]):
-        """Atualiza taxas base do DTC"""
-        for pair, rate in new_rates.items():
+        """Atualiza taxas base do DTC (pares no formato "DTC_USD")"""
+        for pair_name, rate in new_rates.items():
+            from_currency, _, to_currency = pair_name.partition("_")
+            pair = (from_currency, to_currency)
             if pair in self.base_rates:
                 self.base_rates[pair] = rate
-                # Limpa cache relacionado
-                if pair in self.rate_cache:
-                    del self.rate_cache[pair]
+                # Limpa cache relacionado (nos dois sentidos)
+                for cached_pair in (pair, (to_currency, from_currency)):
+                    self.rate_cache.pop(cached_pair, None)
+                    self._rate_stats.pop(cached_pair, None)
+
+        self._rebuild_internal_rates()
+        self._market_info = None
 
     def get_conversion_history(self, user_address: str) -> List[Dict]:
         """Histórico de conversões do usuário (simulado)"""
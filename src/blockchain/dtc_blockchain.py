@@ -1,11 +1,75 @@
 import time
-import json
+import sqlite3
+import orjson
 import hashlib
 import uuid
+import threading
+from collections import OrderedDict
 from typing import List, Dict, Optional
 from dataclasses import dataclass
 
 
+# Consultas em constantes de módulo: a string idêntica a cada chamada reaproveita
+# o statement já preparado no cache da conexão (sem novo parse/plan no SQLite)
+_SQL_GET_BALANCE = 'SELECT balance FROM dtc_balances WHERE user_id = ?'
+
+_SQL_TOTAL_SUPPLY = "SELECT value FROM dtc_metadata WHERE key = 'total_supply'"
+
+_SQL_ADD_TOTAL_SUPPLY = "UPDATE dtc_metadata SET value = value + ? WHERE key = 'total_supply'"
+
+# Reconta o supply a partir dos saldos (inicialização e ajustes manuais de saldo)
+_SQL_RECOUNT_TOTAL_SUPPLY = '''
+    INSERT INTO dtc_metadata (key, value)
+    VALUES ('total_supply', (SELECT COALESCE(SUM(balance), 0) FROM dtc_balances WHERE balance > 0))
+    ON CONFLICT(key) DO UPDATE SET value = excluded.value
+'''
+
+# Insere uma transação
+_SQL_INSERT_TX = '''
+    INSERT INTO dtc_transactions
+    (id, sender, recipient, amount, transaction_type, metadata, timestamp, uptime_hours, reason)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Aplica a variação de saldo de forma atômica (não pode ficar negativo)
+_SQL_UPSERT_BALANCE = '''
+    INSERT INTO dtc_balances (user_id, balance, last_updated)
+    VALUES (?, MAX(0, ?), ?)
+    ON CONFLICT(user_id) DO UPDATE SET
+        balance = MAX(0, balance + ?),
+        last_updated = ?
+'''
+
+# Histórico do usuário: duas buscas por índice em vez de um OR (que força varredura da tabela)
+_SQL_USER_TX_COLUMNS = 'id, sender, recipient, amount, transaction_type, metadata, timestamp, uptime_hours, reason'
+
+_SQL_USER_TX = f'''
+    SELECT * FROM (
+        SELECT {_SQL_USER_TX_COLUMNS} FROM dtc_transactions WHERE sender = ?
+        ORDER BY timestamp DESC LIMIT ?
+    )
+    UNION
+    SELECT * FROM (
+        SELECT {_SQL_USER_TX_COLUMNS} FROM dtc_transactions WHERE recipient = ?
+        ORDER BY timestamp DESC LIMIT ?
+    )
+    ORDER BY timestamp DESC LIMIT ?
+'''
+
+# Acumula estatísticas de mineração do usuário
+_SQL_UPSERT_MINING_STATS = '''
+    INSERT OR REPLACE INTO dtc_mining_stats
+    (user_id, total_mined, blocks_mined, last_mining_reward, uptime_hours)
+    VALUES (
+        ?,
+        COALESCE((SELECT total_mined FROM dtc_mining_stats WHERE user_id = ?), 0) + ?,
+        COALESCE((SELECT blocks_mined FROM dtc_mining_stats WHERE user_id = ?), 0) + 1,
+        ?,
+        ?
+    )
+'''
+
+
 @dataclass
 class DTCTransaction:
     """Transação da DECTERUM Coin"""
@@ -40,53 +104,106 @@ class DTCBlockchain:
 
     def __init__(self, database):
         self.db = database
+        # Mesmo pool de conexões do P2PDatabase
+        self.pool = database.pool
+
+        # Cache LRU de saldos; escritas invalidam as entradas afetadas após o commit
+        self._balance_cache: "OrderedDict[str, float]" = OrderedDict()
+        self._balance_cache_size = 10_000
+        self._balance_generation = 0
+        self._total_supply: Optional[float] = None
+        self._balance_lock = threading.Lock()
+
         self.init_blockchain_tables()
 
     def init_blockchain_tables(self):
         """Inicializa tabelas do blockchain"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-
-        # Tabela de transações
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS dtc_transactions (
-                id TEXT PRIMARY KEY,
-                sender TEXT,
-                recipient TEXT,
-                amount REAL,
-                transaction_type TEXT,
-                metadata TEXT,
-                timestamp REAL,
-                block_height INTEGER DEFAULT 0
-            )
-        ''')
-
-        # Tabela de saldos
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS dtc_balances (
-                user_id TEXT PRIMARY KEY,
-                balance REAL DEFAULT 0.0,
-                last_updated REAL
-            )
-        ''')
-
-        # Tabela de mineração/recompensas
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS dtc_mining_stats (
-                user_id TEXT PRIMARY KEY,
-                total_mined REAL DEFAULT 0.0,
-                blocks_mined INTEGER DEFAULT 0,
-                last_mining_reward REAL,
-                uptime_hours REAL DEFAULT 0.0
-            )
-        ''')
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
 
-        conn.commit()
-        conn.close()
+            # Tabela de transações
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS dtc_transactions (
+                    id TEXT PRIMARY KEY,
+                    sender TEXT,
+                    recipient TEXT,
+                    amount REAL,
+                    transaction_type TEXT,
+                    metadata TEXT,
+                    timestamp REAL,
+                    block_height INTEGER DEFAULT 0,
+                    uptime_hours REAL,
+                    reason TEXT
+                )
+            ''')
+
+            # Adicionar colunas de metadados dedicadas se não existirem (para banco existente)
+            for column in ('uptime_hours REAL', 'reason TEXT'):
+                try:
+                    cursor.execute(f'ALTER TABLE dtc_transactions ADD COLUMN {column}')
+                except sqlite3.OperationalError:
+                    pass
+
+            # Tabela de saldos
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS dtc_balances (
+                    user_id TEXT PRIMARY KEY,
+                    balance REAL DEFAULT 0.0,
+                    last_updated REAL
+                )
+            ''')
+
+            # Tabela de mineração/recompensas
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS dtc_mining_stats (
+                    user_id TEXT PRIMARY KEY,
+                    total_mined REAL DEFAULT 0.0,
+                    blocks_mined INTEGER DEFAULT 0,
+                    last_mining_reward REAL,
+                    uptime_hours REAL DEFAULT 0.0
+                )
+            ''')
+
+            # Valores agregados mantidos incrementalmente (ex.: supply total)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS dtc_metadata (
+                    key TEXT PRIMARY KEY,
+                    value REAL
+                )
+            ''')
+            cursor.execute(_SQL_TOTAL_SUPPLY)
+            if cursor.fetchone() is None:
+                cursor.execute(_SQL_RECOUNT_TOTAL_SUPPLY)
+
+            # Índices para o histórico por usuário (remetente/destinatário + ordem temporal)
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_tx_sender_ts
+                ON dtc_transactions(sender, timestamp DESC)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_tx_recipient_ts
+                ON dtc_transactions(recipient, timestamp DESC)
+            ''')
+
+            conn.commit()
 
     def create_transaction(self, sender: str, recipient: str, amount: float,
                           transaction_type: str, metadata: Dict = None) -> DTCTransaction:
         """Cria uma nova transação"""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            transaction = self._create_transaction(
+                cursor, sender, recipient, amount, transaction_type, metadata
+            )
+            conn.commit()
+
+        self._balances_changed(sender, recipient, amount)
+        return transaction
+
+    def _create_transaction(self, cursor, sender: str, recipient: str, amount: float,
+                            transaction_type: str, metadata: Dict = None) -> DTCTransaction:
+        """Registra a transação e os saldos no cursor dado (sem commit)"""
         transaction = DTCTransaction(
             id=str(uuid.uuid4()),
             sender=sender,
@@ -97,48 +214,79 @@ class DTCBlockchain:
         )
 
         # Verifica saldo do remetente
-        if sender != "NETWORK" and not self.has_sufficient_balance(sender, amount):
+        if sender != "NETWORK" and self._get_balance(cursor, sender) < amount:
             raise ValueError("Saldo insuficiente")
 
         # Salva transação
-        self.save_transaction(transaction)
+        self._save_transaction(cursor, transaction)
 
         # Atualiza saldos
-        self.update_balance(sender, -amount)
-        self.update_balance(recipient, amount)
+        self._update_balance(cursor, sender, -amount)
+        self._update_balance(cursor, recipient, amount)
+
+        # Emissões da rede e envios para ela alteram o supply; transferências apenas o redistribuem
+        supply_change = self._supply_change(sender, recipient, amount)
+        if supply_change:
+            cursor.execute(_SQL_ADD_TOTAL_SUPPLY, (supply_change,))
 
         return transaction
 
     def save_transaction(self, transaction: DTCTransaction):
         """Salva transação no banco"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            INSERT INTO dtc_transactions
-            (id, sender, recipient, amount, transaction_type, metadata, timestamp)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        with self.pool.connection() as conn:
+            self._save_transaction(conn.cursor(), transaction)
+            conn.commit()
+
+    def _save_transaction(self, cursor, transaction: DTCTransaction):
+        """Insere a transação no cursor dado (sem commit)"""
+        metadata = transaction.metadata
+        uptime_hours = reason = None
+
+        # Tipos frequentes com esquema conhecido usam colunas próprias, sem blob JSON
+        if transaction.transaction_type == "mining_reward" and metadata.keys() == {"uptime_hours"}:
+            uptime_hours = metadata["uptime_hours"]
+            metadata = None
+        elif transaction.transaction_type == "initial_grant" and metadata.keys() == {"reason"}:
+            reason = metadata["reason"]
+            metadata = None
+
+        cursor.execute(_SQL_INSERT_TX, (
             transaction.id,
             transaction.sender,
             transaction.recipient,
             transaction.amount,
             transaction.transaction_type,
-            json.dumps(transaction.metadata),
-            transaction.timestamp
+            orjson.dumps(metadata) if metadata else None,
+            transaction.timestamp,
+            uptime_hours,
+            reason
         ))
 
-        conn.commit()
-        conn.close()
-
     def get_balance(self, user_id: str) -> float:
         """Obtém saldo atual do usuário"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute('SELECT balance FROM dtc_balances WHERE user_id = ?', (user_id,))
+        with self._balance_lock:
+            balance = self._balance_cache.get(user_id)
+            if balance is not None:
+                self._balance_cache.move_to_end(user_id)
+                return balance
+            generation = self._balance_generation
+
+        with self.pool.connection() as conn:
+            balance = self._get_balance(conn.cursor(), user_id)
+
+        with self._balance_lock:
+            # Só guarda se nenhuma escrita aconteceu durante a leitura
+            if generation == self._balance_generation:
+                self._balance_cache[user_id] = balance
+                if len(self._balance_cache) > self._balance_cache_size:
+                    self._balance_cache.popitem(last=False)
+
+        return balance
+
+    def _get_balance(self, cursor, user_id: str) -> float:
+        """Lê o saldo pelo cursor dado"""
+        cursor.execute(_SQL_GET_BALANCE, (user_id,))
         result = cursor.fetchone()
-        conn.close()
 
         return result[0] if result else 0.0
 
@@ -147,19 +295,43 @@ class DTCBlockchain:
         if user_id == "NETWORK":
             return  # Sistema não tem saldo
 
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
-
-        current_balance = self.get_balance(user_id)
-        new_balance = max(0, current_balance + amount_change)  # Não pode ficar negativo
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            self._update_balance(cursor, user_id, amount_change)
+            # O saldo pode ter sido limitado a zero: reconta o supply
+            cursor.execute(_SQL_RECOUNT_TOTAL_SUPPLY)
+            conn.commit()
 
-        cursor.execute('''
-            INSERT OR REPLACE INTO dtc_balances (user_id, balance, last_updated)
-            VALUES (?, ?, ?)
-        ''', (user_id, new_balance, time.time()))
+        with self._balance_lock:
+            self._balance_generation += 1
+            self._balance_cache.pop(user_id, None)
+            self._total_supply = None
+
+    def _balances_changed(self, sender: str, recipient: str, amount: float):
+        """Invalida o cache após uma transação confirmada e ajusta o supply"""
+        with self._balance_lock:
+            self._balance_generation += 1
+            self._balance_cache.pop(sender, None)
+            self._balance_cache.pop(recipient, None)
+            if self._total_supply is not None:
+                self._total_supply += self._supply_change(sender, recipient, amount)
+
+    @staticmethod
+    def _supply_change(sender: str, recipient: str, amount: float) -> float:
+        """Variação do supply: + na emissão pela NETWORK, - no envio de saldo para ela"""
+        if sender == "NETWORK" and recipient != "NETWORK":
+            return amount
+        if recipient == "NETWORK" and sender != "NETWORK":
+            return -amount
+        return 0.0
+
+    def _update_balance(self, cursor, user_id: str, amount_change: float):
+        """Atualiza o saldo no cursor dado (sem commit)"""
+        if user_id == "NETWORK":
+            return  # Sistema não tem saldo
 
-        conn.commit()
-        conn.close()
+        now = time.time()
+        cursor.execute(_SQL_UPSERT_BALANCE, (user_id, amount_change, now, amount_change, now))
 
     def has_sufficient_balance(self, user_id: str, amount: float) -> bool:
         """Verifica se usuário tem saldo suficiente"""
@@ -167,27 +339,32 @@ class DTCBlockchain:
 
     def get_user_transactions(self, user_id: str, limit: int = 50) -> List[Dict]:
         """Obtém transações do usuário"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute('''
-            SELECT * FROM dtc_transactions
-            WHERE sender = ? OR recipient = ?
-            ORDER BY timestamp DESC LIMIT ?
-        ''', (user_id, user_id, limit))
+            cursor.execute(_SQL_USER_TX, (user_id, limit, user_id, limit, limit))
 
-        results = cursor.fetchall()
-        conn.close()
+            results = cursor.fetchall()
 
         transactions = []
         for row in results:
+            # Blob JSON só existe para metadados fora das colunas dedicadas
+            if row[5]:
+                metadata = orjson.loads(row[5])
+            elif row[7] is not None:
+                metadata = {'uptime_hours': row[7]}
+            elif row[8] is not None:
+                metadata = {'reason': row[8]}
+            else:
+                metadata = {}
+
             transactions.append({
                 'id': row[0],
                 'sender': row[1],
                 'recipient': row[2],
                 'amount': row[3],
                 'transaction_type': row[4],
-                'metadata': json.loads(row[5]) if row[5] else {},
+                'metadata': metadata,
                 'timestamp': row[6]
             })
 
@@ -209,45 +386,51 @@ class DTCBlockchain:
         reward = min(uptime_hours * 0.1, 5.0)  # Máximo 5 DTC por sessão
 
         if reward > 0:
-            self.create_transaction(
-                sender="NETWORK",
-                recipient=user_id,
-                amount=reward,
-                transaction_type="mining_reward",
-                metadata={"uptime_hours": uptime_hours}
-            )
-
-            # Atualiza estatísticas de mineração
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
+            # Transação, saldo e estatísticas de mineração em um único commit
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+
+                self._create_transaction(
+                    cursor,
+                    sender="NETWORK",
+                    recipient=user_id,
+                    amount=reward,
+                    transaction_type="mining_reward",
+                    metadata={"uptime_hours": uptime_hours}
+                )
 
-            cursor.execute('''
-                INSERT OR REPLACE INTO dtc_mining_stats
-                (user_id, total_mined, blocks_mined, last_mining_reward, uptime_hours)
-                VALUES (
-                    ?,
-                    COALESCE((SELECT total_mined FROM dtc_mining_stats WHERE user_id = ?), 0) + ?,
-                    COALESCE((SELECT blocks_mined FROM dtc_mining_stats WHERE user_id = ?), 0) + 1,
-                    ?,
-                    ?
+                # Atualiza estatísticas de mineração
+                cursor.execute(
+                    _SQL_UPSERT_MINING_STATS,
+                    (user_id, user_id, reward, user_id, reward, uptime_hours)
                 )
-            ''', (user_id, user_id, reward, user_id, reward, uptime_hours))
 
-            conn.commit()
-            conn.close()
+                conn.commit()
+
+            self._balances_changed("NETWORK", user_id, reward)
 
         return reward
 
     def get_total_supply(self) -> float:
         """Obtém o supply total de DTC em circulação"""
-        conn = self.db.get_connection()
-        cursor = conn.cursor()
+        with self._balance_lock:
+            if self._total_supply is not None:
+                return self._total_supply
+            generation = self._balance_generation
 
-        cursor.execute('SELECT SUM(balance) FROM dtc_balances WHERE balance > 0')
-        result = cursor.fetchone()
-        conn.close()
+        # Lido da tabela dtc_metadata (consulta por chave primária)
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute(_SQL_TOTAL_SUPPLY)
+            result = cursor.fetchone()
 
-        return result[0] if result and result[0] else 0.0
+        total_supply = result[0] if result and result[0] else 0.0
+        with self._balance_lock:
+            if generation == self._balance_generation:
+                self._total_supply = total_supply
+        return total_supply
 
     def get_current_timestamp(self) -> float:
         """Obtém timestamp atual"""
@@ -4,32 +4,200 @@ Rede peer-to-peer para sincronização do blockchain DTC
 """
 
 import asyncio
-import json
+import msgspec
+import orjson
+import os
 import time
 import threading
-from typing import Dict, List, Set, Optional
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Union
 import websockets
 import websockets.server
 from websockets.exceptions import ConnectionClosed
 import logging
-from .real_blockchain import DTCBlockchain, DTCBlock, DTCTransaction, DTCWallet
+from .real_blockchain import DTCBlockchain, DTCBlock, DTCTransaction, DTCWallet, verify_block_hash
 
 logger = logging.getLogger(__name__)
 
+# Números do protocolo preservam int/float como recebidos (o hash depende da forma)
+Number = Union[int, float]
+
+
+class TransactionWire(msgspec.Struct):
+    """Transação como trafega na rede"""
+    id: str
+    sender_address: str
+    recipient_address: str
+    amount: Number
+    fee: Number
+    timestamp: Number
+    signature: str = ""
+    public_key: str = ""
+
+
+class BlockWire(msgspec.Struct):
+    """Bloco como trafega na rede"""
+    index: int
+    timestamp: Number
+    transactions: List[TransactionWire]
+    previous_hash: str
+    nonce: int = 0
+    hash: str = ""
+    miner_address: str = ""
+    difficulty: int = 4
+
+
+class HandshakeMsg(msgspec.Struct, tag="handshake", tag_field="type"):
+    node_address: str = ""
+    blockchain_length: int = 0
+    latest_hash: str = ""
+    timestamp: Number = 0
+    # Formatos de mensagem que o nó entende (peers antigos não enviam: só JSON)
+    protocols: List[str] = []
+
+
+class BlockchainReqMsg(msgspec.Struct, tag="request_blockchain", tag_field="type"):
+    from_block: int = 0
+    timestamp: Number = 0
+
+
+class BlockchainDataMsg(msgspec.Struct, tag="blockchain_data", tag_field="type"):
+    chain: List[BlockWire] = []
+    timestamp: Number = 0
+
+
+class BlockchainChunkMsg(msgspec.Struct, tag="blockchain_chunk", tag_field="type"):
+    """Faixa [chunk_start, chunk_end) da cadeia; a última traz final=True"""
+    chunk_start: int
+    chunk_end: int
+    blocks: List[BlockWire] = []
+    final: bool = False
+    timestamp: Number = 0
+
+
+class NewBlockMsg(msgspec.Struct, tag="new_block", tag_field="type"):
+    block: BlockWire
+    timestamp: Number = 0
+
+
+class NewTxMsg(msgspec.Struct, tag="new_transaction", tag_field="type"):
+    transaction: TransactionWire
+    timestamp: Number = 0
+
+
+class SyncReqMsg(msgspec.Struct, tag="sync_request", tag_field="type"):
+    our_length: int = 0
+    timestamp: Number = 0
+
+
+class BlockAnnounceMsg(msgspec.Struct, tag="block_announce", tag_field="type"):
+    """Cabeçalho do bloco + ids das transações (corpos buscados sob demanda)"""
+    index: int
+    timestamp: Number
+    previous_hash: str
+    nonce: int
+    hash: str
+    miner_address: str
+    difficulty: int
+    tx_ids: List[str]
+    # Transações que nenhum peer tem na pool (recompensa de mineração) vão junto
+    prefilled: List[TransactionWire] = []
+
+
+class GetTxMsg(msgspec.Struct, tag="get_tx", tag_field="type"):
+    ids: List[str]
+    block_hash: str = ""
+    timestamp: Number = 0
+
+
+class TxDataMsg(msgspec.Struct, tag="tx_data", tag_field="type"):
+    transactions: List[TransactionWire]
+    block_hash: str = ""
+    timestamp: Number = 0
+
+
+_MESSAGE_TYPES = Union[HandshakeMsg, BlockchainReqMsg, BlockchainDataMsg, BlockchainChunkMsg, NewBlockMsg,
+                       NewTxMsg, SyncReqMsg, BlockAnnounceMsg, GetTxMsg, TxDataMsg]
+
+# Decodifica direto para o struct do tipo da mensagem, sem dicts intermediários
+_MESSAGE_DECODER = msgspec.json.Decoder(_MESSAGE_TYPES)
+
+# Mesmo esquema em MessagePack, para peers que anunciam "msgpack" no handshake
+_MSGPACK_DECODER = msgspec.msgpack.Decoder(_MESSAGE_TYPES)
+_MSGPACK_ENCODER = msgspec.msgpack.Encoder()
+
+
+def _verify_blocks_worker(blocks: List[DTCBlock]) -> bool:
+    """Verifica PoW/hash dos blocos (roda no pool de processos de validação)"""
+    return all(verify_block_hash(block) for block in blocks)
+
 
 class DTCNetworkNode:
     """Nó da rede P2P do blockchain DTC"""
 
+    # Blocos por mensagem blockchain_chunk na sincronização
+    SYNC_CHUNK_SIZE = 100
+    # Teto de blocos acumulados numa sincronização (o anunciado no handshake, limitado a este)
+    MAX_SYNC_BLOCKS = 100_000
+
+    # Filtro de blocos/transações já vistos (gossip chega repetido de vários peers)
+    SEEN_TTL = 30.0
+    SEEN_CAPACITY = 10_000
+
+    # Formatos anunciados no handshake; blocos e transações vão em msgpack se ambos suportarem
+    PROTOCOLS = ["json", "msgpack"]
+
     def __init__(self, blockchain: DTCBlockchain, wallet: DTCWallet, port: int = 9999):
         self.blockchain = blockchain
         self.wallet = wallet
         self.port = port
         self.host = "127.0.0.1"
-        self.peers: Set[str] = set()
         self.connections: Dict[str, websockets.WebSocketServerProtocol] = {}
         self.server = None
         self.is_running = False
 
+        # Pool de processos para verificar PoW fora do event loop (criado em start_server)
+        self._validator_pool: Optional[ProcessPoolExecutor] = None
+
+        # JSON já codificado de blocos (por hash) e transações (por id): são imutáveis
+        self._block_ser_cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._block_pack_cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._tx_ser_cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._tx_ser_cache_size = 10_000
+        # Limite por cache de blocos (LRU): blocos órfãos de replace_chain acabam expulsos
+        self._block_cache_size = 2_000
+
+        # Anúncios de bloco aguardando transações pedidas via get_tx (por hash)
+        self._pending_announces: "OrderedDict[str, BlockAnnounceMsg]" = OrderedDict()
+        self._pending_announces_size = 100
+
+        # Blocos recebidos em blockchain_chunk, acumulados por conexão até o final
+        self._sync_buffers: Dict[object, List[BlockWire]] = {}
+        # Tamanho da cadeia anunciado por conexão no handshake
+        self._peer_lengths: Dict[object, int] = {}
+
+        # Hash do bloco / id da transação -> instante em que foi visto
+        self._seen_blocks: "OrderedDict[str, float]" = OrderedDict()
+        self._seen_txs: "OrderedDict[str, float]" = OrderedDict()
+
+        # Conexões cujo peer anunciou suporte a msgpack
+        self._msgpack_peers = set()
+
+        # Tabela de despacho: tipo da mensagem decodificada -> handler(websocket, message)
+        self._handlers = {
+            HandshakeMsg: self.handle_handshake,
+            BlockchainReqMsg: lambda ws, m: self.handle_blockchain_request(ws),
+            BlockchainChunkMsg: self.handle_blockchain_chunk,
+            BlockchainDataMsg: lambda ws, m: self.handle_blockchain_data(m),
+            NewBlockMsg: lambda ws, m: self.handle_new_block(m),
+            NewTxMsg: lambda ws, m: self.handle_new_transaction(m),
+            SyncReqMsg: lambda ws, m: self.handle_sync_request(ws, m),
+            BlockAnnounceMsg: self.handle_block_announce,
+            GetTxMsg: self.handle_get_tx,
+            TxDataMsg: lambda ws, m: self.handle_tx_data(m),
+        }
+
         # Descoberta de rede
         self.known_peers = [
             "127.0.0.1:9999",
@@ -38,9 +206,16 @@ class DTCNetworkNode:
             "127.0.0.1:10002"
         ]
 
+    @property
+    def peers(self):
+        """Endereços dos peers conectados (derivado de connections)"""
+        return self.connections.keys()
+
     async def start_server(self):
         """Inicia o servidor P2P"""
         try:
+            self._validator_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+
             self.server = await websockets.serve(
                 self.handle_connection,
                 self.host,
@@ -67,7 +242,6 @@ class DTCNetworkNode:
         logger.info(f"🤝 Nova conexão de {peer_address}")
 
         self.connections[peer_address] = websocket
-        self.peers.add(peer_address)
 
         try:
             # Envia handshake
@@ -82,10 +256,12 @@ class DTCNetworkNode:
         except Exception as e:
             logger.error(f"Erro na conexão {peer_address}: {e}")
         finally:
-            # Remove conexão
-            if peer_address in self.connections:
+            # Remove conexão (se ainda for esta)
+            if self.connections.get(peer_address) is websocket:
                 del self.connections[peer_address]
-            self.peers.discard(peer_address)
+            self._sync_buffers.pop(websocket, None)
+            self._peer_lengths.pop(websocket, None)
+            self._msgpack_peers.discard(websocket)
 
     async def connect_to_peers(self):
         """Conecta a peers conhecidos"""
@@ -95,13 +271,13 @@ class DTCNetworkNode:
 
     async def connect_to_peer(self, peer_address: str):
         """Conecta a um peer específico"""
+        websocket = None
         try:
             host, port = peer_address.split(':')
             uri = f"ws://{host}:{port}"
 
             websocket = await websockets.connect(uri)
             self.connections[peer_address] = websocket
-            self.peers.add(peer_address)
 
             logger.info(f"🔗 Conectado ao peer {peer_address}")
 
@@ -114,6 +290,13 @@ class DTCNetworkNode:
 
         except Exception as e:
             logger.debug(f"Não foi possível conectar a {peer_address}: {e}")
+        finally:
+            if websocket is not None:
+                if self.connections.get(peer_address) is websocket:
+                    del self.connections[peer_address]
+                self._sync_buffers.pop(websocket, None)
+                self._peer_lengths.pop(websocket, None)
+                self._msgpack_peers.discard(websocket)
 
     async def send_handshake(self, websocket):
         """Envia handshake inicial"""
@@ -122,36 +305,40 @@ class DTCNetworkNode:
             "node_address": self.wallet.address,
             "blockchain_length": len(self.blockchain.chain),
             "latest_hash": self.blockchain.get_latest_block().hash,
-            "timestamp": time.time()
+            "timestamp": time.time(),
+            "protocols": self.PROTOCOLS
         }
-        await websocket.send(json.dumps(handshake))
+        await websocket.send(orjson.dumps(handshake))
 
-    async def handle_message(self, websocket, message_str: str):
+    async def handle_message(self, websocket, message_str):
         """Processa mensagens recebidas"""
         try:
-            message = json.loads(message_str)
-            msg_type = message.get("type")
-
-            if msg_type == "handshake":
-                await self.handle_handshake(websocket, message)
-            elif msg_type == "request_blockchain":
-                await self.handle_blockchain_request(websocket)
-            elif msg_type == "blockchain_data":
-                await self.handle_blockchain_data(message)
-            elif msg_type == "new_block":
-                await self.handle_new_block(message)
-            elif msg_type == "new_transaction":
-                await self.handle_new_transaction(message)
-            elif msg_type == "sync_request":
-                await self.handle_sync_request(websocket, message)
+            try:
+                # JSON começa com "{"; qualquer outro frame binário é msgpack
+                if isinstance(message_str, str) or message_str[:1] == b"{":
+                    message = _MESSAGE_DECODER.decode(message_str)
+                else:
+                    message = _MSGPACK_DECODER.decode(message_str)
+            except msgspec.ValidationError as e:
+                # Tipo desconhecido ou campos fora do esquema
+                logger.debug(f"Mensagem ignorada: {e}")
+                return
+
+            handler = self._handlers.get(type(message))
+            if handler:
+                await handler(websocket, message)
 
         except Exception as e:
             logger.error(f"Erro processando mensagem: {e}")
 
-    async def handle_handshake(self, websocket, message):
+    async def handle_handshake(self, websocket, message: HandshakeMsg):
         """Processa handshake de outros nós"""
-        peer_length = message.get("blockchain_length", 0)
+        peer_length = message.blockchain_length
         our_length = len(self.blockchain.chain)
+        self._peer_lengths[websocket] = peer_length
+
+        if "msgpack" in message.protocols:
+            self._msgpack_peers.add(websocket)
 
         logger.info(f"🤝 Handshake recebido - Blocos: eles={peer_length}, nós={our_length}")
 
@@ -166,27 +353,68 @@ class DTCNetworkNode:
             "from_block": len(self.blockchain.chain),
             "timestamp": time.time()
         }
-        await websocket.send(json.dumps(request))
+        await websocket.send(orjson.dumps(request))
 
     async def handle_blockchain_request(self, websocket):
-        """Responde solicitação de blockchain"""
-        blockchain_data = {
-            "type": "blockchain_data",
-            "chain": [self.serialize_block(block) for block in self.blockchain.chain],
-            "timestamp": time.time()
-        }
-        await websocket.send(json.dumps(blockchain_data))
+        """Responde solicitação de blockchain em faixas de SYNC_CHUNK_SIZE blocos"""
+        # Cópia da lista: a cadeia pode crescer enquanto cedemos o loop entre as faixas
+        chain = list(self.blockchain.chain)
+        total = len(chain)
+        packed = websocket in self._msgpack_peers
+
+        for start in range(0, total, self.SYNC_CHUNK_SIZE):
+            end = min(start + self.SYNC_CHUNK_SIZE, total)
+            header = {"chunk_start": start, "chunk_end": end, "final": end == total}
+            if packed:
+                blocks = [msgspec.Raw(self.pack_block(block)) for block in chain[start:end]]
+                message = self.pack_message("blockchain_chunk", blocks=blocks, **header)
+            else:
+                blocks = b"[" + b",".join([self.encode_block(block) for block in chain[start:end]]) + b"]"
+                message = self.build_message("blockchain_chunk", "blocks", blocks, header)
+            await websocket.send(message)
+            # Deixa o loop atender outras conexões entre as faixas
+            await asyncio.sleep(0)
+
+    async def handle_blockchain_chunk(self, websocket, message: BlockchainChunkMsg):
+        """Acumula as faixas da cadeia recebidas e sincroniza ao chegar a final"""
+        if message.chunk_start == 0:
+            buffer = self._sync_buffers[websocket] = []
+        else:
+            buffer = self._sync_buffers.get(websocket)
+
+        # Faixa fora de ordem (ou sem o início): descarta a sincronização em curso
+        if buffer is None or message.chunk_start != len(buffer) or \
+                message.chunk_end != message.chunk_start + len(message.blocks):
+            logger.warning("❌ Faixa de blockchain fora de sequência descartada")
+            self._sync_buffers.pop(websocket, None)
+            return
 
-    async def handle_blockchain_data(self, message):
-        """Processa dados de blockchain recebidos"""
-        try:
-            received_chain = message.get("chain", [])
+        # Mais blocos do que o peer anunciou (folga de uma faixa, a cadeia dele pode ter
+        # crescido desde o handshake): descarta em vez de acumular sem limite
+        limit = min(self._peer_lengths.get(websocket, 0) + self.SYNC_CHUNK_SIZE, self.MAX_SYNC_BLOCKS)
+        if message.chunk_end > limit:
+            logger.warning(f"❌ Sincronização descartada: faixa até {message.chunk_end} excede {limit} blocos")
+            self._sync_buffers.pop(websocket, None)
+            return
+
+        buffer.extend(message.blocks)
+
+        if message.final:
+            del self._sync_buffers[websocket]
+            self.sync_received_chain(buffer)
 
+    async def handle_blockchain_data(self, message: BlockchainDataMsg):
+        """Processa dados de blockchain recebidos (cadeia inteira numa mensagem)"""
+        self.sync_received_chain(message.chain)
+
+    def sync_received_chain(self, received_chain: List[BlockWire]):
+        """Substitui nossa cadeia pela recebida se for mais longa e válida"""
+        try:
             if len(received_chain) > len(self.blockchain.chain):
                 # Valida e substitui blockchain se válido
-                if self.validate_received_chain(received_chain):
-                    self.blockchain.chain = [self.deserialize_block(block_data) for block_data in received_chain]
-                    self.blockchain.recalculate_balances()
+                new_chain = self.validate_received_chain(received_chain)
+                if new_chain is not None:
+                    self.blockchain.replace_chain(new_chain)
                     logger.info(f"✅ Blockchain sincronizado! Novos blocos: {len(received_chain)}")
                 else:
                     logger.warning("❌ Blockchain recebido é inválido")
@@ -194,89 +422,246 @@ class DTCNetworkNode:
         except Exception as e:
             logger.error(f"Erro sincronizando blockchain: {e}")
 
-    async def handle_new_block(self, message):
+    async def handle_new_block(self, message: NewBlockMsg):
         """Processa novo bloco recebido"""
         try:
-            block_data = message.get("block")
+            block_data = message.block
+            if self.is_seen(self._seen_blocks, block_data.hash):
+                return
             new_block = self.deserialize_block(block_data)
+            await self.accept_block(new_block)
 
-            # Valida o novo bloco
-            if self.validate_new_block(new_block):
-                self.blockchain.chain.append(new_block)
-                self.blockchain.update_balances(new_block)
-                logger.info(f"✅ Novo bloco aceito: {new_block.index}")
+        except Exception as e:
+            logger.error(f"Erro processando novo bloco: {e}")
+
+    async def accept_block(self, new_block: DTCBlock):
+        """Valida e anexa um bloco recebido, repassando-o aos peers"""
+        # Encadeamento primeiro (barato); o PoW roda no pool de validação
+        valid = self.validate_new_block(new_block, check_pow=False) and await self.verify_blocks([new_block])
+
+        # A cadeia pode ter avançado enquanto o PoW era verificado
+        if valid and self.validate_new_block(new_block, check_pow=False):
+            self.blockchain.append_block(new_block)
+            logger.info(f"✅ Novo bloco aceito: {new_block.index}")
+
+            # Rebroadcast para outros peers (broadcast_block o registra como visto)
+            await self.broadcast_block(new_block, exclude_sender=True)
+        elif self._in_chain(new_block):
+            # Já temos este bloco: anúncios repetidos dele podem ser ignorados
+            self.already_seen(self._seen_blocks, new_block.hash)
+        else:
+            # Não registra como visto: um bloco forjado com o hash de um válido não o bloqueia
+            logger.warning(f"❌ Bloco inválido rejeitado: {new_block.index}")
+
+    def _in_chain(self, block: DTCBlock) -> bool:
+        """True se o bloco já está na nossa cadeia, na mesma altura"""
+        chain = self.blockchain.chain
+        return block.index < len(chain) and chain[block.index].hash == block.hash
+
+    async def handle_block_announce(self, websocket, message: BlockAnnounceMsg):
+        """Processa anúncio de bloco; pede só as transações que ainda não temos"""
+        try:
+            if message.index != len(self.blockchain.chain):
+                return
+            if self.is_seen(self._seen_blocks, message.hash):
+                return
+
+            known = self._known_transactions(message)
+            missing = [tx_id for tx_id in message.tx_ids if tx_id not in known]
+            if not missing:
+                await self.accept_block(self.assemble_block(message, known))
+                return
+
+            self._pending_announces[message.hash] = message
+            while len(self._pending_announces) > self._pending_announces_size:
+                self._pending_announces.popitem(last=False)
+
+            await websocket.send(orjson.dumps({
+                "type": "get_tx",
+                "ids": missing,
+                "block_hash": message.hash,
+                "timestamp": time.time()
+            }))
 
-                # Rebroadcast para outros peers
-                await self.broadcast_block(new_block, exclude_sender=True)
+        except Exception as e:
+            logger.error(f"Erro processando anúncio de bloco: {e}")
+
+    async def handle_get_tx(self, websocket, message: GetTxMsg):
+        """Responde pedido de transações pelos ids"""
+        found = [encoded for encoded in map(self._find_transaction_bytes, message.ids) if encoded]
+        await websocket.send(
+            b'{"type":"tx_data","transactions":[' + b",".join(found) +
+            b'],"block_hash":' + orjson.dumps(message.block_hash) +
+            b',"timestamp":' + orjson.dumps(time.time()) + b"}"
+        )
+
+    async def handle_tx_data(self, message: TxDataMsg):
+        """Completa um bloco anunciado com as transações recebidas"""
+        try:
+            announce = self._pending_announces.pop(message.block_hash, None)
+            if announce is None or announce.index != len(self.blockchain.chain):
+                return
+
+            known = self._known_transactions(announce)
+            for tx_data in message.transactions:
+                known[tx_data.id] = self.deserialize_transaction(tx_data)
+
+            if all(tx_id in known for tx_id in announce.tx_ids):
+                await self.accept_block(self.assemble_block(announce, known))
             else:
-                logger.warning(f"❌ Bloco inválido rejeitado: {new_block.index}")
+                logger.warning(f"❌ Transações faltando para o bloco {announce.index}")
 
         except Exception as e:
-            logger.error(f"Erro processando novo bloco: {e}")
+            logger.error(f"Erro processando transações recebidas: {e}")
+
+    def _known_transactions(self, announce: BlockAnnounceMsg) -> Dict[str, DTCTransaction]:
+        """Transações do anúncio já disponíveis: pool de pendentes + enviadas junto"""
+        known = {tx.id: tx for tx in self.blockchain.pending_transactions}
+        for tx_data in announce.prefilled:
+            known[tx_data.id] = self.deserialize_transaction(tx_data)
+        return known
+
+    def _find_transaction_bytes(self, tx_id: str) -> Optional[bytes]:
+        """JSON de uma transação conhecida (cache, pendentes ou blocos recentes)"""
+        encoded = self._tx_ser_cache.get(tx_id)
+        if encoded is not None:
+            return encoded
+
+        for tx in self.blockchain.pending_transactions:
+            if tx.id == tx_id:
+                return self.encode_transaction(tx)
+        for block in self.blockchain.chain[-10:]:
+            for tx in block.transactions:
+                if tx.id == tx_id:
+                    return self.encode_transaction(tx)
+        return None
+
+    def assemble_block(self, announce: BlockAnnounceMsg, known: Dict[str, DTCTransaction]) -> DTCBlock:
+        """Reconstrói o bloco anunciado a partir das transações conhecidas"""
+        return DTCBlock(
+            index=announce.index,
+            timestamp=announce.timestamp,
+            transactions=[known[tx_id] for tx_id in announce.tx_ids],
+            previous_hash=announce.previous_hash,
+            nonce=announce.nonce,
+            hash=announce.hash,
+            miner_address=announce.miner_address,
+            difficulty=announce.difficulty
+        )
 
-    async def handle_new_transaction(self, message):
+    async def handle_new_transaction(self, message: NewTxMsg):
         """Processa nova transação recebida"""
         try:
-            tx_data = message.get("transaction")
+            tx_data = message.transaction
+            if self.is_seen(self._seen_txs, tx_data.id):
+                return
             transaction = self.deserialize_transaction(tx_data)
 
             # Adiciona à pool de pendentes
             if self.blockchain.add_transaction(transaction):
                 logger.info(f"📝 Nova transação aceita: {transaction.id[:8]}...")
 
-                # Rebroadcast para outros peers
+                # Rebroadcast para outros peers (broadcast_transaction a registra como vista)
                 await self.broadcast_transaction(transaction)
+            elif self.blockchain.has_seen_transaction(transaction.id):
+                # Já pendente ou minerada: anúncios repetidos dela podem ser ignorados
+                self.already_seen(self._seen_txs, transaction.id)
             else:
+                # Não registra como vista: uma transação forjada com o id de uma válida não a bloqueia
                 logger.warning(f"❌ Transação rejeitada: {transaction.id[:8]}...")
 
         except Exception as e:
             logger.error(f"Erro processando transação: {e}")
 
     async def broadcast_block(self, block: DTCBlock, exclude_sender: bool = False):
-        """Faz broadcast de um novo bloco"""
-        message = {
-            "type": "new_block",
-            "block": self.serialize_block(block),
-            "timestamp": time.time()
+        """Anuncia um novo bloco (cabeçalho + ids; peers pedem as transações que faltarem)"""
+        # O eco do nosso próprio anúncio volta dos peers: já conta como visto
+        self.already_seen(self._seen_blocks, block.hash)
+        announce = {
+            "type": "block_announce",
+            "index": block.index,
+            "timestamp": block.timestamp,
+            "previous_hash": block.previous_hash,
+            "nonce": block.nonce,
+            "hash": block.hash,
+            "miner_address": block.miner_address,
+            "difficulty": block.difficulty,
+            "tx_ids": [tx.id for tx in block.transactions],
+            "prefilled": [self.serialize_transaction(tx) for tx in block.transactions
+                          if tx.sender_address == "MINING_REWARD"]
         }
+        packed = _MSGPACK_ENCODER.encode(announce) if self._msgpack_peers else None
 
-        await self.broadcast_to_peers(message)
+        await self.broadcast_to_peers(orjson.dumps(announce), packed)
         logger.info(f"📡 Bloco {block.index} enviado para {len(self.peers)} peers")
 
     async def broadcast_transaction(self, transaction: DTCTransaction):
         """Faz broadcast de uma nova transação"""
-        message = {
-            "type": "new_transaction",
-            "transaction": self.serialize_transaction(transaction),
-            "timestamp": time.time()
-        }
+        self.already_seen(self._seen_txs, transaction.id)
+        message = self.build_message("new_transaction", "transaction", self.encode_transaction(transaction))
+        packed = None
+        if self._msgpack_peers:
+            packed = self.pack_message("new_transaction", transaction=self.serialize_transaction(transaction))
+
+        await self.broadcast_to_peers(message, packed)
+
+    def is_seen(self, seen: "OrderedDict[str, float]", key: str) -> bool:
+        """Retorna True se `key` foi registrado há menos de SEEN_TTL (sem registrá-lo)"""
+        now = time.monotonic()
+
+        # Expira pela frente (mais antigos primeiro) e respeita a capacidade
+        while seen:
+            oldest_key, seen_at = next(iter(seen.items()))
+            if now - seen_at < self.SEEN_TTL and len(seen) < self.SEEN_CAPACITY:
+                break
+            del seen[oldest_key]
+
+        return key in seen
+
+    def already_seen(self, seen: "OrderedDict[str, float]", key: str) -> bool:
+        """Retorna True se `key` foi visto há menos de SEEN_TTL; senão o registra"""
+        if self.is_seen(seen, key):
+            return True
+        seen[key] = time.monotonic()
+        return False
 
-        await self.broadcast_to_peers(message)
+    async def broadcast_to_peers(self, message: Union[Dict, bytes], packed: Optional[bytes] = None):
+        """Envia mensagem (dict ou JSON já codificado) para todos os peers conectados
 
-    async def broadcast_to_peers(self, message: Dict):
-        """Envia mensagem para todos os peers conectados"""
+        Se `packed` (a mesma mensagem em msgpack) for dado, vai para os peers que o suportam.
+        """
         if not self.connections:
             return
 
-        message_str = json.dumps(message)
+        # Codifica uma vez; o mesmo buffer é enviado a todos os peers em paralelo
+        message_bytes = message if isinstance(message, bytes) else orjson.dumps(message)
+        peers = list(self.connections.items())
+
+        if packed is None or not self._msgpack_peers:
+            await self.send_to_peers(peers, message_bytes)
+            return
 
-        # Envia para todos os peers
-        tasks = []
-        for peer_addr, websocket in self.connections.items():
-            tasks.append(self.safe_send(websocket, message_str, peer_addr))
+        json_peers = [peer for peer in peers if peer[1] not in self._msgpack_peers]
+        msgpack_peers = [peer for peer in peers if peer[1] in self._msgpack_peers]
+        await asyncio.gather(self.send_to_peers(json_peers, message_bytes),
+                             self.send_to_peers(msgpack_peers, packed))
 
-        await asyncio.gather(*tasks, return_exceptions=True)
+    async def send_to_peers(self, peers: List[tuple], message: bytes):
+        """Envia o mesmo buffer a vários (endereço, websocket) concorrentemente"""
+        await asyncio.gather(
+            *[self.safe_send(websocket, message, peer_addr) for peer_addr, websocket in peers],
+            return_exceptions=True
+        )
 
-    async def safe_send(self, websocket, message: str, peer_addr: str):
+    async def safe_send(self, websocket, message: bytes, peer_addr: str):
         """Envia mensagem de forma segura"""
         try:
             await websocket.send(message)
         except Exception as e:
             logger.warning(f"Erro enviando para {peer_addr}: {e}")
             # Remove conexão com problema
-            if peer_addr in self.connections:
+            if self.connections.get(peer_addr) is websocket:
                 del self.connections[peer_addr]
-            self.peers.discard(peer_addr)
 
     async def periodic_sync(self):
         """Sincronização periódica com a rede"""
@@ -286,13 +671,12 @@ class DTCNetworkNode:
 
                 if self.connections:
                     # Solicita status de alguns peers
-                    for peer_addr, websocket in list(self.connections.items())[:3]:
-                        sync_request = {
-                            "type": "sync_request",
-                            "our_length": len(self.blockchain.chain),
-                            "timestamp": time.time()
-                        }
-                        await self.safe_send(websocket, json.dumps(sync_request), peer_addr)
+                    sync_request = orjson.dumps({
+                        "type": "sync_request",
+                        "our_length": len(self.blockchain.chain),
+                        "timestamp": time.time()
+                    })
+                    await self.send_to_peers(list(self.connections.items())[:3], sync_request)
 
             except Exception as e:
                 logger.error(f"Erro na sincronização periódica: {e}")
@@ -310,40 +694,118 @@ class DTCNetworkNode:
             "difficulty": block.difficulty
         }
 
-    def deserialize_block(self, block_data: Dict) -> DTCBlock:
-        """Deserializa bloco do JSON"""
+    def encode_block(self, block: DTCBlock) -> bytes:
+        """JSON do bloco, codificado uma única vez por hash"""
+        return self.cached_encoding(self._block_ser_cache, block, lambda b: orjson.dumps(self.serialize_block(b)))
+
+    def cached_encoding(self, cache: "OrderedDict[str, bytes]", block: DTCBlock, encode) -> bytes:
+        """Codificação do bloco em `cache` (LRU por hash, até _block_cache_size entradas)"""
+        encoded = cache.get(block.hash)
+        if encoded is not None:
+            cache.move_to_end(block.hash)
+            return encoded
+
+        encoded = cache[block.hash] = encode(block)
+        if len(cache) > self._block_cache_size:
+            cache.popitem(last=False)
+        return encoded
+
+    def pack_block(self, block: DTCBlock) -> bytes:
+        """Bloco em msgpack, codificado uma única vez por hash"""
+        return self.cached_encoding(self._block_pack_cache, block,
+                                    lambda b: _MSGPACK_ENCODER.encode(self.serialize_block(b)))
+
+    def pack_message(self, msg_type: str, **fields) -> bytes:
+        """Mensagem {"type", **fields, "timestamp"} em msgpack"""
+        return _MSGPACK_ENCODER.encode({"type": msg_type, **fields, "timestamp": time.time()})
+
+    def build_message(self, msg_type: str, key: str, payload: bytes, fields: Optional[Dict] = None) -> bytes:
+        """Monta {"type", [fields], <key>, "timestamp"} embutindo payload já codificado"""
+        head = orjson.dumps({"type": msg_type, **fields})[:-1] if fields else b'{"type":' + orjson.dumps(msg_type)
+        return (head + b',"' + key.encode() + b'":' + payload +
+                b',"timestamp":' + orjson.dumps(time.time()) + b"}")
+
+    def deserialize_block(self, block_data: BlockWire) -> DTCBlock:
+        """Converte o bloco recebido da rede"""
         return DTCBlock(
-            index=block_data["index"],
-            timestamp=block_data["timestamp"],
-            transactions=[self.deserialize_transaction(tx) for tx in block_data["transactions"]],
-            previous_hash=block_data["previous_hash"],
-            nonce=block_data["nonce"],
-            hash=block_data["hash"],
-            miner_address=block_data["miner_address"],
-            difficulty=block_data["difficulty"]
+            index=block_data.index,
+            timestamp=block_data.timestamp,
+            transactions=[self.deserialize_transaction(tx) for tx in block_data.transactions],
+            previous_hash=block_data.previous_hash,
+            nonce=block_data.nonce,
+            hash=block_data.hash,
+            miner_address=block_data.miner_address,
+            difficulty=block_data.difficulty
         )
 
     def serialize_transaction(self, transaction: DTCTransaction) -> Dict:
         """Serializa transação para JSON"""
         return transaction.to_dict()
 
-    def deserialize_transaction(self, tx_data: Dict) -> DTCTransaction:
-        """Deserializa transação do JSON"""
-        return DTCTransaction(**tx_data)
+    def encode_transaction(self, transaction: DTCTransaction) -> bytes:
+        """JSON da transação, codificado uma única vez por id"""
+        encoded = self._tx_ser_cache.get(transaction.id)
+        if encoded is None:
+            encoded = self._tx_ser_cache[transaction.id] = orjson.dumps(self.serialize_transaction(transaction))
+            if len(self._tx_ser_cache) > self._tx_ser_cache_size:
+                self._tx_ser_cache.popitem(last=False)
+        return encoded
+
+    def deserialize_transaction(self, tx_data: TransactionWire) -> DTCTransaction:
+        """Converte a transação recebida da rede"""
+        return DTCTransaction(
+            id=tx_data.id,
+            sender_address=tx_data.sender_address,
+            recipient_address=tx_data.recipient_address,
+            amount=tx_data.amount,
+            fee=tx_data.fee,
+            timestamp=tx_data.timestamp,
+            signature=tx_data.signature,
+            public_key=tx_data.public_key
+        )
 
-    def validate_received_chain(self, chain_data: List[Dict]) -> bool:
-        """Valida blockchain recebido"""
+    def validate_received_chain(self, chain_data: List[BlockWire]) -> Optional[List[DTCBlock]]:
+        """Valida blockchain recebido; retorna a nova cadeia ou None se inválido"""
         try:
-            # Reconstrói e valida a chain
-            temp_blockchain = DTCBlockchain(self.wallet.address)
-            temp_blockchain.chain = [self.deserialize_block(block_data) for block_data in chain_data]
-            return temp_blockchain.validate_chain()
+            local_chain = self.blockchain.chain
+            new_chain: List[DTCBlock] = []
+
+            # Prefixo idêntico ao local: compara só os hashes e reaproveita nossos blocos
+            for local_block, block_data in zip(local_chain, chain_data):
+                if block_data.hash != local_block.hash:
+                    break
+                new_chain.append(local_block)
+
+            # Sufixo novo: valida bloco a bloco e para na primeira falha
+            previous = new_chain[-1] if new_chain else None
+            for block_data in chain_data[len(new_chain):]:
+                block = self.deserialize_block(block_data)
+
+                # O bloco gênese não é validado (como em validate_chain)
+                if previous is not None:
+                    if block.previous_hash != previous.hash:
+                        return None
+                    if not verify_block_hash(block):
+                        return None
+
+                new_chain.append(block)
+                previous = block
+
+            return new_chain
         except Exception as e:
             logger.error(f"Erro validando blockchain: {e}")
-            return False
+            return None
 
-    def validate_new_block(self, block: DTCBlock) -> bool:
-        """Valida um novo bloco"""
+    async def verify_blocks(self, blocks: List[DTCBlock]) -> bool:
+        """Verifica PoW/hash dos blocos no pool de processos (inline se o servidor não iniciou)"""
+        if self._validator_pool is None:
+            return _verify_blocks_worker(blocks)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._validator_pool, _verify_blocks_worker, blocks)
+
+    def validate_new_block(self, block: DTCBlock, check_pow: bool = True) -> bool:
+        """Valida um novo bloco (check_pow=False deixa o PoW para verify_blocks)"""
         try:
             # Verifica índice sequencial
             if block.index != len(self.blockchain.chain):
@@ -353,12 +815,8 @@ class DTCNetworkNode:
             if block.previous_hash != self.blockchain.get_latest_block().hash:
                 return False
 
-            # Verifica proof-of-work
-            if not block.hash.startswith("0" * block.difficulty):
-                return False
-
-            # Verifica hash do bloco
-            if block.hash != block.calculate_hash():
+            # Verifica proof-of-work e hash do bloco
+            if check_pow and not verify_block_hash(block):
                 return False
 
             return True
@@ -371,7 +829,7 @@ class DTCNetworkNode:
         self.is_running = False
 
         # Fecha conexões
-        for websocket in self.connections.values():
+        for websocket in list(self.connections.values()):
             await websocket.close()
 
         # Para servidor
@@ -379,6 +837,10 @@ class DTCNetworkNode:
             self.server.close()
             await self.server.wait_closed()
 
+        if self._validator_pool:
+            self._validator_pool.shutdown(wait=False, cancel_futures=True)
+            self._validator_pool = None
+
         logger.info("🛑 Nó P2P parado")
 
     def get_network_stats(self) -> Dict:
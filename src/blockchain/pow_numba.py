@@ -0,0 +1,120 @@
+"""
+Kernel de mineração em Numba (opcional)
+SHA-256 do último bloco de 64 bytes (só o nonce varia) compilado, sem overhead de Python por nonce
+"""
+
+from typing import Tuple
+
+import numpy as np
+from numba import njit
+
+# Constantes de rodada e estado inicial do SHA-256 (FIPS 180-4)
+_K = np.array([
+    0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+    0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+    0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+    0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+    0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+    0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+    0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+    0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2,
+], dtype=np.uint32)
+
+_H0 = np.array([
+    0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a, 0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19,
+], dtype=np.uint32)
+
+@njit(cache=True, inline="always")
+def _rotr(x, n):
+    return np.uint32((x >> np.uint32(n)) | (x << np.uint32(32 - n)))
+
+
+@njit(cache=True, nogil=True)
+def _compress(state, block, w, out):
+    """Compressão de um bloco de 64 bytes sobre `state`, resultado em `out` (uint32, aritmética mod 2^32)"""
+    for i in range(16):
+        w[i] = (np.uint32(block[4 * i]) << np.uint32(24)) | (np.uint32(block[4 * i + 1]) << np.uint32(16)) | \
+            (np.uint32(block[4 * i + 2]) << np.uint32(8)) | np.uint32(block[4 * i + 3])
+    for i in range(16, 64):
+        s0 = _rotr(w[i - 15], 7) ^ _rotr(w[i - 15], 18) ^ (w[i - 15] >> np.uint32(3))
+        s1 = _rotr(w[i - 2], 17) ^ _rotr(w[i - 2], 19) ^ (w[i - 2] >> np.uint32(10))
+        w[i] = w[i - 16] + s0 + w[i - 7] + s1
+
+    a, b, c, d = state[0], state[1], state[2], state[3]
+    e, f, g, h = state[4], state[5], state[6], state[7]
+    for i in range(64):
+        t1 = np.uint32(h + (_rotr(e, 6) ^ _rotr(e, 11) ^ _rotr(e, 25)) + ((e & f) ^ (~e & g)) + _K[i] + w[i])
+        t2 = np.uint32((_rotr(a, 2) ^ _rotr(a, 13) ^ _rotr(a, 22)) + ((a & b) ^ (a & c) ^ (b & c)))
+        h, g, f, e = g, f, e, np.uint32(d + t1)
+        d, c, b, a = c, b, a, np.uint32(t1 + t2)
+
+    out[0] = state[0] + a
+    out[1] = state[1] + b
+    out[2] = state[2] + c
+    out[3] = state[3] + d
+    out[4] = state[4] + e
+    out[5] = state[5] + f
+    out[6] = state[6] + g
+    out[7] = state[7] + h
+
+
+@njit(cache=True)
+def _midstate(prefix):
+    state = _H0.copy()
+    w = np.empty(64, np.uint32)
+    for offset in range(0, prefix.shape[0], 64):
+        _compress(state.copy(), prefix[offset:offset + 64], w, state)
+    return state
+
+
+@njit(cache=True)
+def _meets_difficulty(digest, difficulty):
+    """Os primeiros `difficulty` dígitos hex do hash (palavras big-endian) são zero"""
+    bits = difficulty * 4
+    for word in range(8):
+        if bits <= 0:
+            return True
+        if bits >= 32:
+            if digest[word] != 0:
+                return False
+        elif digest[word] >> np.uint32(32 - bits) != 0:
+            return False
+        bits -= 32
+    return True
+
+
+@njit(cache=True, nogil=True)
+def _search(state, block, start_nonce, count, difficulty):
+    w = np.empty(64, np.uint32)
+    digest = np.empty(8, np.uint32)
+    for nonce in range(start_nonce, start_nonce + count):
+        # Nonce little-endian nos 8 primeiros bytes do bloco final
+        value = nonce
+        for i in range(8):
+            block[i] = value & 0xFF
+            value >>= 8
+        _compress(state, block, w, digest)
+        if _meets_difficulty(digest, difficulty):
+            return True, nonce
+    return False, start_nonce + count
+
+
+def midstate(prefix: bytes) -> np.ndarray:
+    """Estado do SHA-256 após o prefixo (múltiplo de 64 bytes, ver DTCBlock._prefix_bytes)"""
+    return _midstate(np.frombuffer(prefix, dtype=np.uint8))
+
+
+def mine_nonce_range(state: np.ndarray, prefix_len: int, start_nonce: int, count: int,
+                     difficulty: int) -> Tuple[bool, int]:
+    """Procura um nonce válido em [start_nonce, start_nonce + count) a partir do midstate
+
+    Retorna (encontrou, nonce) — se não encontrou, o nonce é o próximo a testar.
+    """
+    # Bloco final: nonce (8 bytes) + padding 0x80 + tamanho total da mensagem em bits
+    block = np.zeros(64, np.uint8)
+    block[8] = 0x80
+    for i, byte in enumerate(((prefix_len + 8) * 8).to_bytes(8, "big")):
+        block[56 + i] = byte
+
+    found, nonce = _search(state, block, start_nonce, count, difficulty)
+    return bool(found), int(nonce)
@@ -4,18 +4,133 @@ Implementação de blockchain real com mineração proof-of-work
 """
 
 import hashlib
-import json
+import os
 import time
 import threading
 import socket
 import struct
 from typing import List, Dict, Optional, Tuple
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 import uuid
-from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import rsa, padding
+from cryptography.hazmat.primitives.asymmetric import ed25519
 from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
 import base64
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# Kernel de mineração compilado (opcional): sem numba usa o laço com hashlib
+try:
+    from . import pow_numba
+except ImportError:
+    pow_numba = None
+
+
+# Nonces testados por chamada a mine_nonce_range (entre lotes checa o tempo limite)
+MINING_BATCH_SIZE = 100_000
+
+# O nonce fecha o hash do bloco como inteiro de 64 bits little-endian
+_NONCE = struct.Struct('<Q')
+
+# Codificação binária canônica usada nos hashes (campos fixos + strings com tamanho)
+_STR_LEN = struct.Struct('<I')
+_TX_NUMBERS = struct.Struct('<ddd')       # amount, fee, timestamp
+_BLOCK_HEADER = struct.Struct('<QdI')     # index, timestamp, difficulty
+
+
+def _pack_str(value: str) -> bytes:
+    """String prefixada pelo tamanho: campos vizinhos não se confundem"""
+    data = value.encode()
+    return _STR_LEN.pack(len(data)) + data
+
+
+def mine_nonce_range(midstate, start_nonce: int, count: int, difficulty: int) -> Tuple[bool, int, str]:
+    """Procura um nonce válido em [start_nonce, start_nonce + count)
+
+    `midstate` é o hashlib.sha256 já alimentado com o prefixo do bloco
+    (DTCBlock._prefix_bytes); por nonce só os seus 8 bytes são hasheados.
+    Retorna (encontrou, nonce, hash) — se não encontrou, o nonce é o próximo a testar.
+    """
+    # "0" * difficulty em hex = difficulty // 2 bytes zerados (+ meio byte se ímpar):
+    # compara o digest bruto e só gera o hex do vencedor
+    full_bytes, half_byte = divmod(difficulty, 2)
+    zeros = bytes(full_bytes)
+    # Buffer do nonce reaproveitado: nenhum bytes novo por iteração além do digest
+    nonce_buf = bytearray(_NONCE.size)
+    pack_into = _NONCE.pack_into
+    for nonce in range(start_nonce, start_nonce + count):
+        pack_into(nonce_buf, 0, nonce)
+        h = midstate.copy()
+        h.update(nonce_buf)
+        digest = h.digest()
+        if digest[:full_bytes] == zeros and (not half_byte or digest[full_bytes] < 0x10):
+            return True, nonce, digest.hex()
+    return False, start_nonce + count, ""
+
+
+def _disable_numba(reason: str):
+    """Desliga o kernel Numba (avisa uma vez): a mineração volta ao laço com hashlib"""
+    global pow_numba
+    if pow_numba is not None:
+        pow_numba = None
+        print(f"⚠️ Kernel Numba desabilitado ({reason}) - minerando com hashlib")
+
+
+def _check_numba_parity():
+    """Confere uma vez o kernel Numba contra mine_nonce_range (hashlib) no mesmo intervalo"""
+    # Prefixo já no formato de DTCBlock._prefix_bytes (múltiplo de 64 bytes)
+    prefix = bytes(range(128))
+    for difficulty in (1, 2, 3):
+        expected = mine_nonce_range(hashlib.sha256(prefix), 0, 20_000, difficulty)[:2]
+        got = pow_numba.mine_nonce_range(pow_numba.midstate(prefix), len(prefix), 0, 20_000, difficulty)
+        if got != expected:
+            _disable_numba(f"diverge do hashlib: {got} != {expected}")
+            return
+
+
+_numba_checked = False
+_numba_check_lock = threading.Lock()
+
+
+def _numba_kernel():
+    """Kernel Numba já conferido contra o hashlib (None se indisponível ou divergente)
+
+    A conferência compila o kernel e minera alguns milhares de nonces: roda na primeira
+    mineração, não na importação do módulo (que os workers e serviços também fazem).
+    """
+    global _numba_checked
+    if pow_numba is None or _numba_checked:
+        return pow_numba
+    with _numba_check_lock:
+        if not _numba_checked:
+            try:
+                _check_numba_parity()
+            except Exception as e:
+                _disable_numba(f"erro no kernel: {e}")
+            _numba_checked = True
+    return pow_numba
+
+
+def _nonce_searcher(prefix: bytes, difficulty: int):
+    """Função (start_nonce, count) -> (encontrou, nonce, hash) sobre o prefixo do bloco
+
+    Usa o kernel Numba quando disponível; o hash hex do vencedor sai do hashlib.
+    """
+    midstate = hashlib.sha256(prefix)
+    kernel = _numba_kernel()
+    if kernel is None:
+        return lambda start, count: mine_nonce_range(midstate, start, count, difficulty)
+
+    state = kernel.midstate(prefix)
+
+    def search(start: int, count: int) -> Tuple[bool, int, str]:
+        found, nonce = kernel.mine_nonce_range(state, len(prefix), start, count, difficulty)
+        if not found:
+            return False, nonce, ""
+        h = midstate.copy()
+        h.update(_NONCE.pack(nonce))
+        return True, nonce, h.hexdigest()
+
+    return search
 
 
 @dataclass
@@ -31,19 +146,34 @@ class DTCTransaction:
     public_key: str = ""
 
     def to_dict(self):
-        return asdict(self)
-
-    def get_hash(self) -> str:
-        """Hash da transação para verificação"""
-        tx_data = {
+        # Montado à mão: asdict() faz cópia profunda recursiva e domina o custo do hash do bloco
+        return {
             'id': self.id,
             'sender_address': self.sender_address,
             'recipient_address': self.recipient_address,
             'amount': self.amount,
             'fee': self.fee,
-            'timestamp': self.timestamp
+            'timestamp': self.timestamp,
+            'signature': self.signature,
+            'public_key': self.public_key
         }
-        return hashlib.sha256(json.dumps(tx_data, sort_keys=True).encode()).hexdigest()
+
+    def get_hash(self) -> str:
+        """Hash da transação para verificação"""
+        return hashlib.sha256(self._signing_bytes()).hexdigest()
+
+    def _signing_bytes(self) -> bytes:
+        """Campos assinados (tudo menos assinatura e chave pública), em binário"""
+        return b"".join((
+            _pack_str(self.id),
+            _pack_str(self.sender_address),
+            _pack_str(self.recipient_address),
+            _TX_NUMBERS.pack(self.amount, self.fee, self.timestamp)
+        ))
+
+    def to_bytes(self) -> bytes:
+        """Transação completa em binário (como entra no hash do bloco)"""
+        return self._signing_bytes() + _pack_str(self.signature) + _pack_str(self.public_key)
 
 
 @dataclass
@@ -59,59 +189,177 @@ class DTCBlock:
     difficulty: int = 4
 
     def calculate_hash(self) -> str:
-        """Calcula hash do bloco"""
-        block_data = {
-            'index': self.index,
-            'timestamp': self.timestamp,
-            'transactions': [tx.to_dict() for tx in self.transactions],
-            'previous_hash': self.previous_hash,
-            'nonce': self.nonce,
-            'miner_address': self.miner_address
-        }
-        return hashlib.sha256(json.dumps(block_data, sort_keys=True).encode()).hexdigest()
-
-    def mine_block(self, difficulty: int) -> bool:
-        """Minera o bloco usando Proof-of-Work"""
-        target = "0" * difficulty
+        """Calcula hash do bloco: SHA-256(prefixo || nonce)"""
+        h = hashlib.sha256(self._prefix_bytes())
+        h.update(_NONCE.pack(self.nonce))
+        return h.hexdigest()
+
+    def _prefix_bytes(self) -> bytearray:
+        """Cabeçalho binário canônico (tudo menos nonce/hash), completado com zeros até
+        múltiplo de 64 bytes (o bloco do SHA-256): o nonce cai sozinho no último bloco"""
+        previous_hash = self.previous_hash.encode()
+        miner_address = self.miner_address.encode()
+        size = _BLOCK_HEADER.size + 2 * _STR_LEN.size + len(previous_hash) + len(miner_address) + 32
+
+        # Um único buffer já no tamanho final (o padding são os zeros que sobram)
+        buf = bytearray(size + (-size % 64))
+        _BLOCK_HEADER.pack_into(buf, 0, self.index, self.timestamp, self.difficulty)
+        offset = _BLOCK_HEADER.size
+        for value in (previous_hash, miner_address):
+            _STR_LEN.pack_into(buf, offset, len(value))
+            offset += _STR_LEN.size
+            buf[offset:offset + len(value)] = value
+            offset += len(value)
+        buf[offset:offset + 32] = self.merkle_root()
+        return buf
+
+    def merkle_root(self) -> bytes:
+        """Raiz Merkle (32 bytes) das transações: o cabeçalho tem tamanho fixo"""
+        if not self.transactions:
+            return b"\0" * 32
+
+        # Folhas cobrem a transação inteira (inclusive assinatura e chave pública)
+        level = [hashlib.sha256(tx.to_bytes()).digest() for tx in self.transactions]
+        while len(level) > 1:
+            paired = [
+                hashlib.sha256(hashlib.sha256(level[i] + level[i + 1]).digest()).digest()
+                for i in range(0, len(level) - 1, 2)
+            ]
+            # Nível ímpar: o último sobe sozinho (duplicá-lo, como no Bitcoin, faria
+            # [a, b, c] e [a, b, c, c] terem a mesma raiz)
+            if len(level) % 2:
+                paired.append(level[-1])
+            level = paired
+        return level[0]
+
+    def mine_block(self, difficulty: int, workers: int = 1,
+                   cancel: Optional[threading.Event] = None) -> bool:
+        """Minera o bloco usando Proof-of-Work
+
+        Com workers > 1 o espaço de nonces é fatiado entre threads (lote k vai para a
+        thread k % workers); só compensa com o kernel Numba, que solta o GIL.
+        `cancel` interrompe a busca entre lotes (retorna False).
+        """
         start_time = time.time()
+        deadline = start_time + 300  # 5 minutos máximo (evita travamento)
 
         print(f"⛏️  Minerando bloco {self.index} (dificuldade: {difficulty})...")
 
-        while True:
-            self.hash = self.calculate_hash()
+        # Estado do SHA-256 após o prefixo fixo: por nonce só os 8 bytes do nonce são hasheados
+        search = _nonce_searcher(self._prefix_bytes(), difficulty)
+        stop_event = threading.Event()
+        cancel = cancel or threading.Event()
+
+        if workers <= 1:
+            result = self._mine_shard(search, self.nonce, MINING_BATCH_SIZE, stop_event, cancel, deadline)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(self._mine_shard, search, self.nonce + k * MINING_BATCH_SIZE,
+                                    workers * MINING_BATCH_SIZE, stop_event, cancel, deadline)
+                    for k in range(workers)
+                ]
+                result = next((r for r in (f.result() for f in futures) if r), None)
+
+        if result is None:
+            return False
 
-            if self.hash.startswith(target):
-                mining_time = time.time() - start_time
-                print(f"✅ Bloco {self.index} minerado! Hash: {self.hash[:16]}... (Tempo: {mining_time:.2f}s)")
-                return True
+        self.nonce, self.hash = result
+        if not verify_block_hash(self):
+            # Só o kernel Numba chega aqui: um nonce que o hashlib não confirma seria
+            # rejeitado por todos os peers; desliga o kernel e refaz a busca com hashlib
+            if pow_numba is None:
+                return False
+            _disable_numba(f"nonce {self.nonce} do bloco {self.index} não confere")
+            return self.mine_block(difficulty, workers, cancel)
 
-            self.nonce += 1
+        mining_time = time.time() - start_time
+        print(f"✅ Bloco {self.index} minerado! Hash: {self.hash[:16]}... (Tempo: {mining_time:.2f}s)")
+        return True
 
-            # Limita tempo de mineração (evita travamento)
-            if time.time() - start_time > 300:  # 5 minutos máximo
-                return False
+    @staticmethod
+    def _mine_shard(search, start_nonce: int, stride: int, stop_event: threading.Event,
+                    cancel: threading.Event, deadline: float) -> Optional[Tuple[int, str]]:
+        """Testa lotes [start, start + MINING_BATCH_SIZE) avançando `stride` até achar,
+        outra thread achar (stop_event), a mineração ser cancelada ou estourar o tempo limite"""
+        start = start_nonce
+        while not stop_event.is_set() and not cancel.is_set():
+            found, nonce, block_hash = search(start, MINING_BATCH_SIZE)
+            if found:
+                stop_event.set()
+                return nonce, block_hash
+            if time.time() > deadline:
+                return None
+            start += stride
+        return None
+
+
+def verify_block_hash(block: DTCBlock) -> bool:
+    """Verifica proof-of-work e hash declarado do bloco (prefixo primeiro, SHA-256 uma vez)"""
+    if not block.hash.startswith("0" * block.difficulty):
+        return False
+    return block.hash == block.calculate_hash()
+
+
+# Chaves públicas já carregadas, por SHA-256 dos 32 bytes da chave
+_pubkey_cache: "OrderedDict[bytes, object]" = OrderedDict()
+_PUBKEY_CACHE_SIZE = 10_000
+_pubkey_lock = threading.Lock()
+
+
+def _load_public_key(public_key_b64: str):
+    """Chave pública da transação, carregada uma única vez por chave"""
+    public_key_bytes = base64.b64decode(public_key_b64)
+    key_id = hashlib.sha256(public_key_bytes).digest()
+
+    with _pubkey_lock:
+        public_key = _pubkey_cache.get(key_id)
+        if public_key is not None:
+            _pubkey_cache.move_to_end(key_id)
+            return public_key
+
+    public_key = ed25519.Ed25519PublicKey.from_public_bytes(public_key_bytes)
+    with _pubkey_lock:
+        _pubkey_cache[key_id] = public_key
+        if len(_pubkey_cache) > _PUBKEY_CACHE_SIZE:
+            _pubkey_cache.popitem(last=False)
+    return public_key
+
+
+def verify_transaction(transaction: DTCTransaction) -> bool:
+    """Verifica a assinatura de uma transação com a chave pública que ela carrega"""
+    try:
+        public_key = _load_public_key(transaction.public_key)
+
+        # Verifica assinatura
+        signature = base64.b64decode(transaction.signature)
+        tx_hash = transaction.get_hash()
+
+        public_key.verify(signature, tx_hash.encode())
+        return True
+    except Exception:
+        return False
 
 
 class DTCWallet:
-    """Carteira criptográfica real para DTC"""
+    """Carteira criptográfica real para DTC (chaves Ed25519)"""
 
     def __init__(self):
-        # Gera par de chaves RSA
-        self.private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=2048
-        )
+        # Gera par de chaves Ed25519 (chave pública de 32 bytes, assinatura de 64)
+        self.private_key = ed25519.Ed25519PrivateKey.generate()
         self.public_key = self.private_key.public_key()
+        self.public_key_bytes = self.public_key.public_bytes(
+            encoding=Encoding.Raw,
+            format=PublicFormat.Raw
+        )
+        # Como vai em cada transação (base64 dos 32 bytes)
+        self.public_key_b64 = base64.b64encode(self.public_key_bytes).decode()
         self.address = self.generate_address()
 
     def generate_address(self) -> str:
         """Gera endereço da carteira baseado na chave pública"""
-        public_bytes = self.public_key.public_bytes(
-            encoding=Encoding.PEM,
-            format=PublicFormat.SubjectPublicKeyInfo
-        )
         # Hash duplo como Bitcoin
-        sha256 = hashlib.sha256(public_bytes).digest()
+        sha256 = hashlib.sha256(self.public_key_bytes).digest()
         ripemd160 = hashlib.new('ripemd160')
         ripemd160.update(sha256)
         return "DTC" + ripemd160.hexdigest()[:34]  # Endereço DTC
@@ -119,39 +367,13 @@ class DTCWallet:
     def sign_transaction(self, transaction: DTCTransaction) -> str:
         """Assina transação com chave privada"""
         tx_hash = transaction.get_hash()
-        signature = self.private_key.sign(
-            tx_hash.encode(),
-            padding.PSS(
-                mgf=padding.MGF1(hashes.SHA256()),
-                salt_length=padding.PSS.MAX_LENGTH
-            ),
-            hashes.SHA256()
-        )
+        signature = self.private_key.sign(tx_hash.encode())
         return base64.b64encode(signature).decode()
 
-    def verify_signature(self, transaction: DTCTransaction) -> bool:
+    @staticmethod
+    def verify_signature(transaction: DTCTransaction) -> bool:
         """Verifica assinatura de uma transação"""
-        try:
-            # Decodifica chave pública
-            public_key_bytes = base64.b64decode(transaction.public_key)
-            public_key = serialization.load_pem_public_key(public_key_bytes)
-
-            # Verifica assinatura
-            signature = base64.b64decode(transaction.signature)
-            tx_hash = transaction.get_hash()
-
-            public_key.verify(
-                signature,
-                tx_hash.encode(),
-                padding.PSS(
-                    mgf=padding.MGF1(hashes.SHA256()),
-                    salt_length=padding.PSS.MAX_LENGTH
-                ),
-                hashes.SHA256()
-            )
-            return True
-        except Exception:
-            return False
+        return verify_transaction(transaction)
 
     def create_transaction(self, recipient_address: str, amount: float, fee: float = 0.001) -> DTCTransaction:
         """Cria e assina uma transação"""
@@ -162,12 +384,7 @@ class DTCWallet:
             amount=amount,
             fee=fee,
             timestamp=time.time(),
-            public_key=base64.b64encode(
-                self.public_key.public_bytes(
-                    encoding=Encoding.PEM,
-                    format=PublicFormat.SubjectPublicKeyInfo
-                )
-            ).decode()
+            public_key=self.public_key_b64
         )
 
         transaction.signature = self.sign_transaction(transaction)
@@ -177,14 +394,31 @@ class DTCWallet:
 class DTCBlockchain:
     """Blockchain real do DECTERUM Coin"""
 
+    # A cada N blocos guarda uma cópia dos saldos (recálculo completo parte dela)
+    BALANCE_CHECKPOINT_INTERVAL = 1000
+    # Quantos checkpoints manter (os mais recentes); reorganizações mais fundas revertem bloco a bloco
+    BALANCE_CHECKPOINTS_KEPT = 3
+
+    # Quantos IDs de transações admitidas lembrar (rejeita reenvio/replay sem verificar assinatura)
+    SEEN_TX_CAPACITY = 100_000
+
     def __init__(self, node_address: str):
         self.chain: List[DTCBlock] = []
         self.pending_transactions: List[DTCTransaction] = []
+        # Totais incrementais das pendentes: taxas e valor comprometido (amount + fee) por remetente
+        self._pending_fee_total = 0.0
+        self._pending_by_sender: Dict[str, float] = defaultdict(float)
+        self._pending_lock = threading.Lock()
+        # IDs de transações já admitidas (LRU limitado): duplicata é recusada antes da verificação de assinatura
+        self._seen_tx_ids: "OrderedDict[str, None]" = OrderedDict()
         self.mining_reward = 50.0  # DTC por bloco
         self.difficulty = 4  # Dificuldade inicial
         self.target_block_time = 30  # 30 segundos por bloco
         self.node_address = node_address
-        self.balances: Dict[str, float] = {}
+        # defaultdict: endereço novo começa em 0 sem teste de pertinência (leitura via .get não cria chave)
+        self.balances: Dict[str, float] = defaultdict(float)
+        # Altura -> (hash do bloco, saldos após aplicá-lo)
+        self._balance_checkpoints: Dict[int, Tuple[str, Dict[str, float]]] = {}
         self.is_mining = False
         self.connected_nodes: List[str] = []
 
@@ -209,27 +443,50 @@ class DTCBlockchain:
         """Retorna o último bloco"""
         return self.chain[-1]
 
+    def has_seen_transaction(self, tx_id: str) -> bool:
+        """True se a transação já foi admitida (pendente ou minerada)"""
+        return tx_id in self._seen_tx_ids
+
     def add_transaction(self, transaction: DTCTransaction) -> bool:
         """Adiciona transação à pool de pendentes"""
-        # Verifica assinatura
-        wallet = DTCWallet()
-        if not wallet.verify_signature(transaction):
+        # Duplicata (reenvio de peer ou replay): recusa antes da verificação de assinatura
+        if transaction.id in self._seen_tx_ids:
+            return False
+
+        # Verifica assinatura (sem gerar carteira/chave RSA nova a cada chamada)
+        if not verify_transaction(transaction):
             print(f"❌ Transação inválida: assinatura incorreta")
             return False
 
-        # Verifica saldo (exceto para recompensas de mineração)
-        if transaction.sender_address != "MINING_REWARD":
-            sender_balance = self.get_balance(transaction.sender_address)
-            if sender_balance < (transaction.amount + transaction.fee):
-                print(f"❌ Saldo insuficiente: {sender_balance} < {transaction.amount + transaction.fee}")
+        cost = transaction.amount + transaction.fee
+        with self._pending_lock:
+            if transaction.id in self._seen_tx_ids:
                 return False
 
-        self.pending_transactions.append(transaction)
+            # Verifica saldo descontando o já comprometido em pendentes (evita gasto duplo)
+            if transaction.sender_address != "MINING_REWARD":
+                sender_balance = (
+                    self.get_balance(transaction.sender_address)
+                    - self._pending_by_sender.get(transaction.sender_address, 0.0)
+                )
+                if sender_balance < cost:
+                    print(f"❌ Saldo insuficiente: {sender_balance} < {cost}")
+                    return False
+                self._pending_by_sender[transaction.sender_address] += cost
+
+            self.pending_transactions.append(transaction)
+            self._pending_fee_total += transaction.fee
+
+            self._seen_tx_ids[transaction.id] = None
+            if len(self._seen_tx_ids) > self.SEEN_TX_CAPACITY:
+                self._seen_tx_ids.popitem(last=False)
+
         print(f"📝 Transação adicionada: {transaction.amount} DTC de {transaction.sender_address[:10]}...")
         return True
 
-    def mine_pending_transactions(self, miner_address: str) -> bool:
-        """Minera as transações pendentes"""
+    def mine_pending_transactions(self, miner_address: str, workers: int = 1,
+                                  cancel: Optional[threading.Event] = None) -> bool:
+        """Minera as transações pendentes (workers: threads de busca de nonce; cancel: interrompe)"""
         if self.is_mining:
             return False
 
@@ -246,25 +503,24 @@ class DTCBlockchain:
                 timestamp=time.time()
             )
 
-            # Coleta taxas das transações
-            total_fees = sum(tx.fee for tx in self.pending_transactions)
-            reward_transaction.amount += total_fees
+            # Coleta taxas das transações (total mantido por add_transaction)
+            with self._pending_lock:
+                mined = list(self.pending_transactions)
+                reward_transaction.amount += self._pending_fee_total
 
             # Cria novo bloco
             block = DTCBlock(
                 index=len(self.chain),
                 timestamp=time.time(),
-                transactions=self.pending_transactions + [reward_transaction],
+                transactions=mined + [reward_transaction],
                 previous_hash=self.get_latest_block().hash,
                 miner_address=miner_address,
                 difficulty=self.difficulty
             )
 
             # Minera o bloco
-            if block.mine_block(self.difficulty):
-                self.chain.append(block)
-                self.update_balances(block)
-                self.pending_transactions = []
+            if block.mine_block(self.difficulty, workers, cancel):
+                self.append_block(block)
                 self.adjust_difficulty()
 
                 print(f"💰 Bloco minerado! Recompensa: {reward_transaction.amount} DTC")
@@ -272,6 +528,9 @@ class DTCBlockchain:
                 # Broadcast para outros nós
                 self.broadcast_block(block)
                 return True
+            elif cancel is not None and cancel.is_set():
+                print("🛑 Mineração do bloco interrompida")
+                return False
             else:
                 print("⏰ Tempo limite de mineração atingido")
                 return False
@@ -279,19 +538,94 @@ class DTCBlockchain:
         finally:
             self.is_mining = False
 
+    def _remove_pending(self, tx_ids):
+        """Remove das pendentes as transações já incluídas em blocos e refaz os totais das restantes"""
+        tx_ids = set(tx_ids)
+        if not tx_ids:
+            return
+        with self._pending_lock:
+            self.pending_transactions = [tx for tx in self.pending_transactions if tx.id not in tx_ids]
+            self._pending_fee_total = 0.0
+            self._pending_by_sender = defaultdict(float)
+            for tx in self.pending_transactions:
+                self._pending_fee_total += tx.fee
+                if tx.sender_address != "MINING_REWARD":
+                    self._pending_by_sender[tx.sender_address] += tx.amount + tx.fee
+
     def update_balances(self, block: DTCBlock):
         """Atualiza saldos após um novo bloco"""
+        balances = self.balances
         for transaction in block.transactions:
             # Deduz do remetente
             if transaction.sender_address != "MINING_REWARD":
-                if transaction.sender_address not in self.balances:
-                    self.balances[transaction.sender_address] = 0
-                self.balances[transaction.sender_address] -= (transaction.amount + transaction.fee)
+                balances[transaction.sender_address] -= transaction.amount + transaction.fee
 
             # Adiciona ao destinatário
-            if transaction.recipient_address not in self.balances:
-                self.balances[transaction.recipient_address] = 0
-            self.balances[transaction.recipient_address] += transaction.amount
+            balances[transaction.recipient_address] += transaction.amount
+
+        if block.index and block.index % self.BALANCE_CHECKPOINT_INTERVAL == 0:
+            checkpoints = self._balance_checkpoints
+            checkpoints[block.index] = (block.hash, dict(balances))
+            while len(checkpoints) > self.BALANCE_CHECKPOINTS_KEPT:
+                del checkpoints[min(checkpoints)]
+
+    def revert_balances(self, block: DTCBlock):
+        """Desfaz os efeitos de um bloco nos saldos (inverso de update_balances)"""
+        balances = self.balances
+        for transaction in reversed(block.transactions):
+            balances[transaction.recipient_address] -= transaction.amount
+            if transaction.sender_address != "MINING_REWARD":
+                balances[transaction.sender_address] += transaction.amount + transaction.fee
+
+        self._balance_checkpoints.pop(block.index, None)
+
+    def recalculate_balances(self):
+        """Recalcula os saldos da cadeia atual a partir do último checkpoint válido"""
+        start = 0
+        self.balances = defaultdict(float)
+        for height in sorted(self._balance_checkpoints, reverse=True):
+            block_hash, balances = self._balance_checkpoints[height]
+            if height < len(self.chain) and self.chain[height].hash == block_hash:
+                start = height + 1
+                self.balances = defaultdict(float, balances)
+                break
+
+        # Checkpoints de outra cadeia (acima do ponto de partida) não valem mais
+        for height in [h for h in self._balance_checkpoints if h >= start]:
+            del self._balance_checkpoints[height]
+
+        for block in self.chain[start:]:
+            self.update_balances(block)
+
+    def append_block(self, block: DTCBlock):
+        """Anexa um bloco já validado: atualiza saldos e tira suas transações das pendentes"""
+        self.chain.append(block)
+        self.update_balances(block)
+        self._remove_pending(tx.id for tx in block.transactions)
+
+    def replace_chain(self, new_chain: List[DTCBlock]):
+        """Troca a cadeia ajustando saldos só a partir do ponto de bifurcação"""
+        fork_point = 0
+        for old_block, new_block in zip(self.chain, new_chain):
+            if old_block.hash != new_block.hash:
+                break
+            fork_point += 1
+
+        # Checkpoint abaixo da bifurcação é comum às duas cadeias; se refazer a partir
+        # dele custa menos que reverter os blocos abandonados, recalcula dali
+        checkpoint = max((h for h in self._balance_checkpoints if h < fork_point), default=None)
+        if checkpoint is not None and fork_point - checkpoint < len(self.chain) - fork_point:
+            self.chain = new_chain
+            self.recalculate_balances()
+        else:
+            # Desfaz os blocos abandonados (do topo para trás) e aplica os novos
+            for block in reversed(self.chain[fork_point:]):
+                self.revert_balances(block)
+            for block in new_chain[fork_point:]:
+                self.update_balances(block)
+            self.chain = new_chain
+
+        self._remove_pending(tx.id for block in new_chain[fork_point:] for tx in block.transactions)
 
     def get_balance(self, address: str) -> float:
         """Obtém saldo de um endereço"""
@@ -318,22 +652,26 @@ class DTCBlockchain:
             self.difficulty = max(1, self.difficulty - 1)
             print(f"📉 Dificuldade diminuída para {self.difficulty}")
 
-    def validate_chain(self) -> bool:
-        """Valida toda a cadeia de blocos"""
+    def validate_chain(self, deep: bool = False) -> bool:
+        """Valida toda a cadeia de blocos
+
+        Todo bloco já tem o hash verificado ao entrar na cadeia (mine_block ou
+        validação P2P), então por padrão só confere ligações e o prefixo de zeros;
+        deep=True recalcula o hash de cada bloco.
+        """
         for i in range(1, len(self.chain)):
             current = self.chain[i]
             previous = self.chain[i-1]
 
-            # Verifica hash do bloco atual
-            if current.hash != current.calculate_hash():
-                return False
-
             # Verifica ligação com bloco anterior
             if current.previous_hash != previous.hash:
                 return False
 
-            # Verifica proof-of-work
-            if not current.hash.startswith("0" * current.difficulty):
+            # Verifica proof-of-work (e, se deep, o hash recalculado do bloco)
+            if deep:
+                if not verify_block_hash(current):
+                    return False
+            elif not current.hash.startswith("0" * current.difficulty):
                 return False
 
         return True
@@ -369,6 +707,10 @@ class DTCMiner:
         self.wallet = wallet
         self.is_mining = False
         self.mining_thread = None
+        # Sinaliza parada: interrompe a busca de nonce e a espera entre tentativas
+        self._stop = threading.Event()
+        # Threads só aceleram com o kernel Numba (sem GIL); o hashlib em 8 bytes segura o GIL
+        self.workers = (os.cpu_count() or 1) if pow_numba is not None else 1
 
     def start_mining(self):
         """Inicia mineração contínua"""
@@ -376,24 +718,26 @@ class DTCMiner:
             return
 
         self.is_mining = True
+        self._stop.clear()
         self.mining_thread = threading.Thread(target=self._mining_loop)
         self.mining_thread.start()
         print(f"⛏️  Mineração iniciada! Endereço: {self.wallet.address}")
 
     def stop_mining(self):
-        """Para a mineração"""
+        """Para a mineração (não bloqueia além de 1s esperando a thread)"""
+        self._stop.set()
         self.is_mining = False
         if self.mining_thread:
-            self.mining_thread.join()
+            self.mining_thread.join(timeout=1.0)
         print("🛑 Mineração parada")
 
     def _mining_loop(self):
         """Loop principal de mineração"""
-        while self.is_mining:
+        while not self._stop.is_set():
             if len(self.blockchain.pending_transactions) >= 1:  # Minera com 1+ transação
-                self.blockchain.mine_pending_transactions(self.wallet.address)
+                self.blockchain.mine_pending_transactions(self.wallet.address, self.workers, self._stop)
 
-            time.sleep(5)  # Espera 5 segundos antes de tentar novamente
+            self._stop.wait(5)  # Espera 5 segundos antes de tentar novamente
 
 
 # Funções de utilidade
@@ -2,573 +2,598 @@ import sqlite3
 import uuid
 import time
 import logging
+import queue
+from contextlib import contextmanager
 from typing import Dict, List, Optional
 from cryptography.fernet import Fernet
-from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# SQL das operações frequentes: texto fixo = mesma chave no cache de statements da conexão
+_SQL_GET_USER = '''
+    SELECT user_id, username, public_key, private_key, created_at, last_seen, status, avatar
+    FROM users WHERE user_id = ?
+'''
+_SQL_CREATE_USER = '''
+    INSERT INTO users (user_id, username, public_key, private_key, created_at, last_seen)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+_SQL_UPDATE_USERNAME = 'UPDATE users SET username = ?, last_seen = ? WHERE user_id = ?'
+_SQL_UPDATE_STATUS = 'UPDATE users SET status = ?, last_seen = ? WHERE user_id = ?'
+_SQL_ADD_CONTACT = '''
+    INSERT OR REPLACE INTO contacts (owner_id, contact_id, username, added_at)
+    VALUES (?, ?, ?, ?)
+'''
+_SQL_GET_CONTACTS = '''
+    SELECT c.contact_id, c.username, c.added_at, c.status,
+           COALESCE(unread.count, 0) as unread_count
+    FROM contacts c
+    LEFT JOIN (
+        SELECT sender_id, recipient_id,
+               COUNT(*) as count
+        FROM messages
+        WHERE recipient_id = ? AND read_status = 0
+        GROUP BY sender_id
+    ) unread ON c.contact_id = unread.sender_id
+    WHERE c.owner_id = ?
+'''
+_SQL_REMOVE_CONTACT = 'DELETE FROM contacts WHERE owner_id = ? AND contact_id = ?'
+_SQL_MARK_READ = '''
+    UPDATE messages
+    SET read_status = 1
+    WHERE recipient_id = ? AND sender_id = ? AND read_status = 0
+'''
+_SQL_UNREAD_COUNT = '''
+    SELECT COUNT(*)
+    FROM messages
+    WHERE recipient_id = ? AND sender_id = ? AND read_status = 0
+'''
+_SQL_SAVE_MESSAGE = '''
+    INSERT OR REPLACE INTO messages
+    (id, sender_id, sender_username, recipient_id, content, timestamp, message_type, delivered, read_status)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+_SQL_GET_CONVERSATION = '''
+    SELECT id, sender_id, sender_username, recipient_id, content, timestamp,
+           message_type, delivered, read_status AS read
+    FROM messages
+    WHERE (sender_id = ? AND recipient_id = ?) OR (sender_id = ? AND recipient_id = ?)
+    ORDER BY timestamp DESC LIMIT ?
+'''
+_SQL_GET_USER_MESSAGES = '''
+    SELECT id, sender_id, sender_username, recipient_id, content, timestamp,
+           message_type, delivered, read_status AS read
+    FROM messages
+    WHERE sender_id = ? OR recipient_id = ?
+    ORDER BY timestamp DESC LIMIT ?
+'''
+_SQL_SAVE_PEER = '''
+    INSERT OR REPLACE INTO discovered_peers
+    (node_id, host, port, username, tunnel_url, discovery_method, last_seen, status)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+_SQL_GET_PEERS = '''
+    SELECT node_id, host, port, username, tunnel_url, discovery_method, last_seen, status
+    FROM discovered_peers WHERE status = 'online'
+'''
+_SQL_SET_SETTING = 'INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)'
+_SQL_GET_SETTING = 'SELECT value FROM settings WHERE key = ?'
+
+
+class ConnectionPool:
+    """Pool de conexões SQLite de longa duração (mantém o cache de páginas quente)"""
+
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA cache_size=-64000",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA mmap_size=268435456",
+    )
+
+    def __init__(self, db_path: str, size: int = 4, cached_statements: int = 256):
+        self.db_path = db_path
+        self.cached_statements = cached_statements
+        self._idle: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=size)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Abre uma nova conexão e aplica os PRAGMAs uma única vez"""
+        # Statements preparados ficam em cache por conexão, indexados pelo texto do SQL
+        conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        # Linhas acessíveis por nome (e ainda por posição)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def get(self) -> sqlite3.Connection:
+        """Obtém uma conexão ociosa ou abre uma nova"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def release(self, conn: sqlite3.Connection):
+        """Devolve a conexão ao pool (fecha se o pool já estiver cheio)"""
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        """Empresta uma conexão durante o bloco with"""
+        conn = self.get()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Fecha todas as conexões ociosas"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
 
 class P2PDatabase:
     """Database para o sistema P2P"""
 
     def __init__(self, db_path: str = "decterum.db"):
         self.db_path = db_path
+        # Conexões persistentes (WAL) reaproveitadas entre chamadas, em vez de abrir uma por método
+        self.pool = ConnectionPool(db_path)
         self.init_database()
 
     def init_database(self):
         """Inicializa database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Tabela de usuários
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                user_id TEXT PRIMARY KEY,
-                username TEXT UNIQUE,
-                public_key TEXT,
-                private_key TEXT,
-                created_at REAL,
-                last_seen REAL,
-                status TEXT DEFAULT 'online',
-                avatar TEXT DEFAULT ''
-            )
-        ''')
-
-        # Tabela de contatos
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS contacts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                owner_id TEXT,
-                contact_id TEXT,
-                username TEXT,
-                added_at REAL,
-                status TEXT DEFAULT 'offline',
-                unread_count INTEGER DEFAULT 0,
-                FOREIGN KEY (owner_id) REFERENCES users (user_id)
-            )
-        ''')
-
-        # Adicionar coluna unread_count se não existir (para banco existente)
-        try:
-            cursor.execute('ALTER TABLE contacts ADD COLUMN unread_count INTEGER DEFAULT 0')
-        except sqlite3.OperationalError:
-            pass
-
-        # Tabela de mensagens
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS messages (
-                id TEXT PRIMARY KEY,
-                sender_id TEXT,
-                sender_username TEXT,
-                recipient_id TEXT,
-                content TEXT,
-                timestamp REAL,
-                message_type TEXT DEFAULT 'chat',
-                delivered INTEGER DEFAULT 0,
-                read_status INTEGER DEFAULT 0
-            )
-        ''')
-
-        # Tabela de peers descobertos
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS discovered_peers (
-                node_id TEXT PRIMARY KEY,
-                host TEXT,
-                port INTEGER,
-                username TEXT,
-                tunnel_url TEXT,
-                discovery_method TEXT,
-                last_seen REAL,
-                status TEXT DEFAULT 'online'
-            )
-        ''')
-
-        # Tabela de configurações
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY,
-                value TEXT
-            )
-        ''')
-
-        # Tabela de posts do feed
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS feed_posts (
-                id TEXT PRIMARY KEY,
-                author_id TEXT,
-                author_username TEXT,
-                content TEXT,
-                timestamp REAL,
-                post_type TEXT DEFAULT 'text',
-                parent_post_id TEXT,
-                thread_level INTEGER DEFAULT 0,
-                upvotes INTEGER DEFAULT 0,
-                downvotes INTEGER DEFAULT 0,
-                comments_count INTEGER DEFAULT 0,
-                retweets_count INTEGER DEFAULT 0,
-                shares_count INTEGER DEFAULT 0,
-                weight_score REAL DEFAULT 1.0,
-                is_pinned INTEGER DEFAULT 0,
-                tags TEXT,
-                metadata TEXT,
-                FOREIGN KEY (author_id) REFERENCES users (user_id),
-                FOREIGN KEY (parent_post_id) REFERENCES feed_posts (id)
-            )
-        ''')
-
-        # Tabela de votos
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS feed_votes (
-                id TEXT PRIMARY KEY,
-                post_id TEXT,
-                voter_id TEXT,
-                voter_username TEXT,
-                vote_type TEXT,
-                vote_weight REAL DEFAULT 1.0,
-                timestamp REAL,
-                FOREIGN KEY (post_id) REFERENCES feed_posts (id),
-                FOREIGN KEY (voter_id) REFERENCES users (user_id),
-                UNIQUE(post_id, voter_id)
-            )
-        ''')
-
-        # Tabela de selos comunitários
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS community_badges (
-                id TEXT PRIMARY KEY,
-                post_id TEXT,
-                badge_type TEXT,
-                awarded_by TEXT,
-                awarded_by_username TEXT,
-                timestamp REAL,
-                FOREIGN KEY (post_id) REFERENCES feed_posts (id),
-                FOREIGN KEY (awarded_by) REFERENCES users (user_id)
-            )
-        ''')
-
-        # Tabela de reputação dos usuários
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_reputation (
-                user_id TEXT PRIMARY KEY,
-                username TEXT,
-                total_posts INTEGER DEFAULT 0,
-                total_votes_received INTEGER DEFAULT 0,
-                total_votes_given INTEGER DEFAULT 0,
-                positive_votes_received INTEGER DEFAULT 0,
-                badges_received INTEGER DEFAULT 0,
-                engagement_score REAL DEFAULT 1.0,
-                vote_weight REAL DEFAULT 1.0,
-                reputation_level TEXT DEFAULT 'novato',
-                last_updated REAL,
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
-            )
-        ''')
-
-        # Tabela de sub-threads
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sub_threads (
-                id TEXT PRIMARY KEY,
-                root_post_id TEXT,
-                parent_thread_id TEXT,
-                title TEXT,
-                description TEXT,
-                created_by TEXT,
-                created_by_username TEXT,
-                timestamp REAL,
-                posts_count INTEGER DEFAULT 0,
-                participants_count INTEGER DEFAULT 0,
-                is_active INTEGER DEFAULT 1,
-                FOREIGN KEY (root_post_id) REFERENCES feed_posts (id),
-                FOREIGN KEY (parent_thread_id) REFERENCES sub_threads (id),
-                FOREIGN KEY (created_by) REFERENCES users (user_id)
-            )
-        ''')
-
-
-        # Tabela de retweets/republicações
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS feed_retweets (
-                id TEXT PRIMARY KEY,
-                original_post_id TEXT,
-                user_id TEXT,
-                username TEXT,
-                retweet_type TEXT DEFAULT 'simple',
-                comment TEXT,
-                timestamp REAL,
-                FOREIGN KEY (original_post_id) REFERENCES feed_posts (id),
-                FOREIGN KEY (user_id) REFERENCES users (user_id),
-                UNIQUE(original_post_id, user_id)
-            )
-        ''')
-
-        # Índices para performance
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_feed_posts_timestamp ON feed_posts(timestamp)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_feed_posts_author ON feed_posts(author_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_feed_posts_parent ON feed_posts(parent_post_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_feed_votes_post ON feed_votes(post_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_community_badges_post ON community_badges(post_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_feed_retweets_original ON feed_retweets(original_post_id)')
-
-        # Tabelas do módulo de vídeos
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS videos (
-                id TEXT PRIMARY KEY,
-                author_id TEXT,
-                author_username TEXT,
-                title TEXT,
-                description TEXT,
-                video_url TEXT,
-                thumbnail_url TEXT,
-                duration INTEGER,
-                video_type TEXT,
-                resolution TEXT,
-                size_bytes INTEGER,
-                mime_type TEXT,
-                timestamp REAL,
-                views_count INTEGER DEFAULT 0,
-                likes_count INTEGER DEFAULT 0,
-                dislikes_count INTEGER DEFAULT 0,
-                comments_count INTEGER DEFAULT 0,
-                shares_count INTEGER DEFAULT 0,
-                is_public INTEGER DEFAULT 1,
-                is_monetized INTEGER DEFAULT 0,
-                tags TEXT,
-                category TEXT DEFAULT 'general',
-                language TEXT DEFAULT 'pt-BR',
-                quality_levels TEXT,
-                chapters TEXT,
-                subtitles_url TEXT,
-                metadata TEXT,
-                FOREIGN KEY (author_id) REFERENCES users (user_id)
-            )
-        ''')
-
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS video_likes (
-                id TEXT PRIMARY KEY,
-                video_id TEXT,
-                user_id TEXT,
-                username TEXT,
-                like_type TEXT,
-                timestamp REAL,
-                FOREIGN KEY (video_id) REFERENCES videos (id),
-                FOREIGN KEY (user_id) REFERENCES users (user_id),
-                UNIQUE(video_id, user_id)
-            )
-        ''')
-
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS video_comments (
-                id TEXT PRIMARY KEY,
-                video_id TEXT,
-                author_id TEXT,
-                author_username TEXT,
-                content TEXT,
-                timestamp REAL,
-                parent_comment_id TEXT,
-                likes_count INTEGER DEFAULT 0,
-                replies_count INTEGER DEFAULT 0,
-                is_pinned INTEGER DEFAULT 0,
-                is_creator_reply INTEGER DEFAULT 0,
-                FOREIGN KEY (video_id) REFERENCES videos (id),
-                FOREIGN KEY (author_id) REFERENCES users (user_id),
-                FOREIGN KEY (parent_comment_id) REFERENCES video_comments (id)
-            )
-        ''')
-
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS video_views (
-                id TEXT PRIMARY KEY,
-                video_id TEXT,
-                viewer_id TEXT,
-                viewer_username TEXT,
-                watch_time INTEGER,
-                completion_rate REAL,
-                timestamp REAL,
-                device_type TEXT DEFAULT 'web',
-                quality_watched TEXT DEFAULT '720p',
-                FOREIGN KEY (video_id) REFERENCES videos (id),
-                FOREIGN KEY (viewer_id) REFERENCES users (user_id)
-            )
-        ''')
-
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS video_shares (
-                id TEXT PRIMARY KEY,
-                video_id TEXT,
-                sharer_id TEXT,
-                sharer_username TEXT,
-                platform TEXT,
-                timestamp REAL,
-                FOREIGN KEY (video_id) REFERENCES videos (id),
-                FOREIGN KEY (sharer_id) REFERENCES users (user_id)
-            )
-        ''')
-
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS playlists (
-                id TEXT PRIMARY KEY,
-                creator_id TEXT,
-                creator_username TEXT,
-                title TEXT,
-                description TEXT,
-                is_public INTEGER DEFAULT 1,
-                video_ids TEXT,
-                thumbnail_url TEXT,
-                timestamp REAL,
-                views_count INTEGER DEFAULT 0,
-                FOREIGN KEY (creator_id) REFERENCES users (user_id)
-            )
-        ''')
-
-        # Índices para performance dos vídeos
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_videos_timestamp ON videos(timestamp)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_videos_author ON videos(author_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_videos_type ON videos(video_type)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_videos_category ON videos(category)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_videos_views ON videos(views_count)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_video_likes_video ON video_likes(video_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_video_comments_video ON video_comments(video_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_video_views_video ON video_views(video_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_playlists_creator ON playlists(creator_id)')
-
-        conn.commit()
-        conn.close()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+
+            # Tabela de usuários
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    user_id TEXT PRIMARY KEY,
+                    username TEXT UNIQUE,
+                    public_key TEXT,
+                    private_key TEXT,
+                    created_at REAL,
+                    last_seen REAL,
+                    status TEXT DEFAULT 'online',
+                    avatar TEXT DEFAULT ''
+                )
+            ''')
+
+            # Tabela de contatos
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS contacts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    owner_id TEXT,
+                    contact_id TEXT,
+                    username TEXT,
+                    added_at REAL,
+                    status TEXT DEFAULT 'offline',
+                    unread_count INTEGER DEFAULT 0,
+                    FOREIGN KEY (owner_id) REFERENCES users (user_id)
+                )
+            ''')
+
+            # Adicionar coluna unread_count se não existir (para banco existente)
+            try:
+                cursor.execute('ALTER TABLE contacts ADD COLUMN unread_count INTEGER DEFAULT 0')
+            except sqlite3.OperationalError:
+                pass
+
+            # Tabela de mensagens
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS messages (
+                    id TEXT PRIMARY KEY,
+                    sender_id TEXT,
+                    sender_username TEXT,
+                    recipient_id TEXT,
+                    content TEXT,
+                    timestamp REAL,
+                    message_type TEXT DEFAULT 'chat',
+                    delivered INTEGER DEFAULT 0,
+                    read_status INTEGER DEFAULT 0
+                )
+            ''')
+
+            # Tabela de peers descobertos
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS discovered_peers (
+                    node_id TEXT PRIMARY KEY,
+                    host TEXT,
+                    port INTEGER,
+                    username TEXT,
+                    tunnel_url TEXT,
+                    discovery_method TEXT,
+                    last_seen REAL,
+                    status TEXT DEFAULT 'online'
+                )
+            ''')
+
+            # Tabela de configurações
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS settings (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+
+            # Tabela de posts do feed
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS feed_posts (
+                    id TEXT PRIMARY KEY,
+                    author_id TEXT,
+                    author_username TEXT,
+                    content TEXT,
+                    timestamp REAL,
+                    post_type TEXT DEFAULT 'text',
+                    parent_post_id TEXT,
+                    thread_level INTEGER DEFAULT 0,
+                    upvotes INTEGER DEFAULT 0,
+                    downvotes INTEGER DEFAULT 0,
+                    comments_count INTEGER DEFAULT 0,
+                    retweets_count INTEGER DEFAULT 0,
+                    shares_count INTEGER DEFAULT 0,
+                    weight_score REAL DEFAULT 1.0,
+                    is_pinned INTEGER DEFAULT 0,
+                    tags TEXT,
+                    metadata TEXT,
+                    FOREIGN KEY (author_id) REFERENCES users (user_id),
+                    FOREIGN KEY (parent_post_id) REFERENCES feed_posts (id)
+                )
+            ''')
+
+            # Tabela de votos
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS feed_votes (
+                    id TEXT PRIMARY KEY,
+                    post_id TEXT,
+                    voter_id TEXT,
+                    voter_username TEXT,
+                    vote_type TEXT,
+                    vote_weight REAL DEFAULT 1.0,
+                    timestamp REAL,
+                    FOREIGN KEY (post_id) REFERENCES feed_posts (id),
+                    FOREIGN KEY (voter_id) REFERENCES users (user_id),
+                    UNIQUE(post_id, voter_id)
+                )
+            ''')
+
+            # Tabela de selos comunitários
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS community_badges (
+                    id TEXT PRIMARY KEY,
+                    post_id TEXT,
+                    badge_type TEXT,
+                    awarded_by TEXT,
+                    awarded_by_username TEXT,
+                    timestamp REAL,
+                    FOREIGN KEY (post_id) REFERENCES feed_posts (id),
+                    FOREIGN KEY (awarded_by) REFERENCES users (user_id)
+                )
+            ''')
+
+            # Tabela de reputação dos usuários
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS user_reputation (
+                    user_id TEXT PRIMARY KEY,
+                    username TEXT,
+                    total_posts INTEGER DEFAULT 0,
+                    total_votes_received INTEGER DEFAULT 0,
+                    total_votes_given INTEGER DEFAULT 0,
+                    positive_votes_received INTEGER DEFAULT 0,
+                    badges_received INTEGER DEFAULT 0,
+                    engagement_score REAL DEFAULT 1.0,
+                    vote_weight REAL DEFAULT 1.0,
+                    reputation_level TEXT DEFAULT 'novato',
+                    last_updated REAL,
+                    FOREIGN KEY (user_id) REFERENCES users (user_id)
+                )
+            ''')
+
+            # Tabela de sub-threads
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sub_threads (
+                    id TEXT PRIMARY KEY,
+                    root_post_id TEXT,
+                    parent_thread_id TEXT,
+                    title TEXT,
+                    description TEXT,
+                    created_by TEXT,
+                    created_by_username TEXT,
+                    timestamp REAL,
+                    posts_count INTEGER DEFAULT 0,
+                    participants_count INTEGER DEFAULT 0,
+                    is_active INTEGER DEFAULT 1,
+                    FOREIGN KEY (root_post_id) REFERENCES feed_posts (id),
+                    FOREIGN KEY (parent_thread_id) REFERENCES sub_threads (id),
+                    FOREIGN KEY (created_by) REFERENCES users (user_id)
+                )
+            ''')
+
+
+            # Tabela de retweets/republicações
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS feed_retweets (
+                    id TEXT PRIMARY KEY,
+                    original_post_id TEXT,
+                    user_id TEXT,
+                    username TEXT,
+                    retweet_type TEXT DEFAULT 'simple',
+                    comment TEXT,
+                    timestamp REAL,
+                    FOREIGN KEY (original_post_id) REFERENCES feed_posts (id),
+                    FOREIGN KEY (user_id) REFERENCES users (user_id),
+                    UNIQUE(original_post_id, user_id)
+                )
+            ''')
+
+            # Índices para performance
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_messages_pair_ts ON messages(sender_id, recipient_id, timestamp)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_messages_unread ON messages(recipient_id, sender_id, read_status)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_feed_posts_timestamp ON feed_posts(timestamp)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_feed_posts_author ON feed_posts(author_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_feed_posts_parent ON feed_posts(parent_post_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_feed_votes_post ON feed_votes(post_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_community_badges_post ON community_badges(post_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_feed_retweets_original ON feed_retweets(original_post_id)')
+
+            # Tabelas do módulo de vídeos
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS videos (
+                    id TEXT PRIMARY KEY,
+                    author_id TEXT,
+                    author_username TEXT,
+                    title TEXT,
+                    description TEXT,
+                    video_url TEXT,
+                    thumbnail_url TEXT,
+                    duration INTEGER,
+                    video_type TEXT,
+                    resolution TEXT,
+                    size_bytes INTEGER,
+                    mime_type TEXT,
+                    timestamp REAL,
+                    views_count INTEGER DEFAULT 0,
+                    likes_count INTEGER DEFAULT 0,
+                    dislikes_count INTEGER DEFAULT 0,
+                    comments_count INTEGER DEFAULT 0,
+                    shares_count INTEGER DEFAULT 0,
+                    is_public INTEGER DEFAULT 1,
+                    is_monetized INTEGER DEFAULT 0,
+                    tags TEXT,
+                    category TEXT DEFAULT 'general',
+                    language TEXT DEFAULT 'pt-BR',
+                    quality_levels TEXT,
+                    chapters TEXT,
+                    subtitles_url TEXT,
+                    metadata TEXT,
+                    FOREIGN KEY (author_id) REFERENCES users (user_id)
+                )
+            ''')
+
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS video_likes (
+                    id TEXT PRIMARY KEY,
+                    video_id TEXT,
+                    user_id TEXT,
+                    username TEXT,
+                    like_type TEXT,
+                    timestamp REAL,
+                    FOREIGN KEY (video_id) REFERENCES videos (id),
+                    FOREIGN KEY (user_id) REFERENCES users (user_id),
+                    UNIQUE(video_id, user_id)
+                )
+            ''')
+
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS video_comments (
+                    id TEXT PRIMARY KEY,
+                    video_id TEXT,
+                    author_id TEXT,
+                    author_username TEXT,
+                    content TEXT,
+                    timestamp REAL,
+                    parent_comment_id TEXT,
+                    likes_count INTEGER DEFAULT 0,
+                    replies_count INTEGER DEFAULT 0,
+                    is_pinned INTEGER DEFAULT 0,
+                    is_creator_reply INTEGER DEFAULT 0,
+                    FOREIGN KEY (video_id) REFERENCES videos (id),
+                    FOREIGN KEY (author_id) REFERENCES users (user_id),
+                    FOREIGN KEY (parent_comment_id) REFERENCES video_comments (id)
+                )
+            ''')
+
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS video_views (
+                    id TEXT PRIMARY KEY,
+                    video_id TEXT,
+                    viewer_id TEXT,
+                    viewer_username TEXT,
+                    watch_time INTEGER,
+                    completion_rate REAL,
+                    timestamp REAL,
+                    device_type TEXT DEFAULT 'web',
+                    quality_watched TEXT DEFAULT '720p',
+                    FOREIGN KEY (video_id) REFERENCES videos (id),
+                    FOREIGN KEY (viewer_id) REFERENCES users (user_id)
+                )
+            ''')
+
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS video_shares (
+                    id TEXT PRIMARY KEY,
+                    video_id TEXT,
+                    sharer_id TEXT,
+                    sharer_username TEXT,
+                    platform TEXT,
+                    timestamp REAL,
+                    FOREIGN KEY (video_id) REFERENCES videos (id),
+                    FOREIGN KEY (sharer_id) REFERENCES users (user_id)
+                )
+            ''')
+
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS playlists (
+                    id TEXT PRIMARY KEY,
+                    creator_id TEXT,
+                    creator_username TEXT,
+                    title TEXT,
+                    description TEXT,
+                    is_public INTEGER DEFAULT 1,
+                    video_ids TEXT,
+                    thumbnail_url TEXT,
+                    timestamp REAL,
+                    views_count INTEGER DEFAULT 0,
+                    FOREIGN KEY (creator_id) REFERENCES users (user_id)
+                )
+            ''')
+
+            # Índices para performance dos vídeos
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_videos_timestamp ON videos(timestamp)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_videos_author ON videos(author_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_videos_type ON videos(video_type)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_videos_category ON videos(category)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_videos_views ON videos(views_count)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_video_likes_video ON video_likes(video_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_video_comments_video ON video_comments(video_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_video_views_video ON video_views(video_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_playlists_creator ON playlists(creator_id)')
+
+            conn.commit()
         logger.info("📊 Database inicializada com módulos de Feed e Vídeos")
 
     def get_user(self, user_id: str) -> Optional[Dict]:
         """Busca usuário por ID"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM users WHERE user_id = ?', (user_id,))
-        result = cursor.fetchone()
-        conn.close()
-
-        if result:
-            return {
-                'user_id': result[0],
-                'username': result[1],
-                'public_key': result[2],
-                'private_key': result[3],
-                'created_at': result[4],
-                'last_seen': result[5],
-                'status': result[6],
-                'avatar': result[7]
-            }
-        return None
+        with self.pool.connection() as conn:
+            result = conn.execute(_SQL_GET_USER, (user_id,)).fetchone()
+        return dict(result) if result else None
 
     def create_user(self, username: str) -> str:
         """Cria novo usuário"""
         user_id = str(uuid.uuid4())
         key = Fernet.generate_key()
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO users (user_id, username, public_key, private_key, created_at, last_seen)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (user_id, username, key.decode(), key.decode(), time.time(), time.time()))
-        conn.commit()
-        conn.close()
+        with self.pool.connection() as conn:
+            conn.execute(_SQL_CREATE_USER, (user_id, username, key.decode(), key.decode(), time.time(), time.time()))
+            conn.commit()
 
         return user_id
 
     def update_user(self, user_id: str, username: str = None, status: str = None):
         """Atualiza dados do usuário"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        if username:
-            cursor.execute('UPDATE users SET username = ?, last_seen = ? WHERE user_id = ?',
-                          (username, time.time(), user_id))
+        with self.pool.connection() as conn:
+            if username:
+                conn.execute(_SQL_UPDATE_USERNAME, (username, time.time(), user_id))
 
-        if status:
-            cursor.execute('UPDATE users SET status = ?, last_seen = ? WHERE user_id = ?',
-                          (status, time.time(), user_id))
+            if status:
+                conn.execute(_SQL_UPDATE_STATUS, (status, time.time(), user_id))
 
-        conn.commit()
-        conn.close()
+            conn.commit()
 
     def add_contact(self, owner_id: str, contact_id: str, username: str):
         """Adiciona contato"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT OR REPLACE INTO contacts (owner_id, contact_id, username, added_at)
-            VALUES (?, ?, ?, ?)
-        ''', (owner_id, contact_id, username, time.time()))
-        conn.commit()
-        conn.close()
+        with self.pool.connection() as conn:
+            conn.execute(_SQL_ADD_CONTACT, (owner_id, contact_id, username, time.time()))
+            conn.commit()
 
     def get_contacts(self, owner_id: str) -> List[Dict]:
         """Lista contatos do usuário"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Obter contatos com contagem de mensagens não lidas
-        cursor.execute('''
-            SELECT c.*,
-                   COALESCE(unread.count, 0) as unread_count
-            FROM contacts c
-            LEFT JOIN (
-                SELECT sender_id, recipient_id,
-                       COUNT(*) as count
-                FROM messages
-                WHERE recipient_id = ? AND read_status = 0
-                GROUP BY sender_id
-            ) unread ON c.contact_id = unread.sender_id
-            WHERE c.owner_id = ?
-        ''', (owner_id, owner_id))
-
-        results = cursor.fetchall()
-        conn.close()
-
-        contacts = []
-        for row in results:
-            contacts.append({
-                'contact_id': row[2],
-                'username': row[3],
-                'added_at': row[4],
-                'status': row[5],
-                'unread_count': row[7] if len(row) > 7 else 0
-            })
-        return contacts
+        with self.pool.connection() as conn:
+            # Obter contatos com contagem de mensagens não lidas
+            results = conn.execute(_SQL_GET_CONTACTS, (owner_id, owner_id)).fetchall()
+
+        return [dict(row) for row in results]
 
     def remove_contact(self, owner_id: str, contact_id: str):
         """Remove um contato"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM contacts WHERE owner_id = ? AND contact_id = ?', (owner_id, contact_id))
-        conn.commit()
-        conn.close()
+        with self.pool.connection() as conn:
+            conn.execute(_SQL_REMOVE_CONTACT, (owner_id, contact_id))
+            conn.commit()
 
     def mark_messages_as_read(self, recipient_id: str, sender_id: str):
         """Marca todas as mensagens de um contato como lidas"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            UPDATE messages
-            SET read_status = 1
-            WHERE recipient_id = ? AND sender_id = ? AND read_status = 0
-        ''', (recipient_id, sender_id))
-        conn.commit()
-        conn.close()
+        with self.pool.connection() as conn:
+            conn.execute(_SQL_MARK_READ, (recipient_id, sender_id))
+            conn.commit()
 
     def get_unread_count(self, recipient_id: str, sender_id: str) -> int:
         """Obtém contagem de mensagens não lidas de um contato específico"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT COUNT(*)
-            FROM messages
-            WHERE recipient_id = ? AND sender_id = ? AND read_status = 0
-        ''', (recipient_id, sender_id))
-        result = cursor.fetchone()
-        conn.close()
+        with self.pool.connection() as conn:
+            result = conn.execute(_SQL_UNREAD_COUNT, (recipient_id, sender_id)).fetchone()
         return result[0] if result else 0
 
     def save_message(self, message):
         """Salva mensagem"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT OR REPLACE INTO messages
-            (id, sender_id, sender_username, recipient_id, content, timestamp, message_type, delivered, read_status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (message.id, message.sender_id, message.sender_username, message.recipient_id,
-              message.content, message.timestamp, message.message_type,
-              int(message.delivered), int(message.read)))
-        conn.commit()
-        conn.close()
+        self.save_messages([message])
+
+    def save_messages(self, messages: list):
+        """Salva várias mensagens com um único executemany e um único commit"""
+        with self.pool.connection() as conn:
+            conn.executemany(_SQL_SAVE_MESSAGE, [
+                (message.id, message.sender_id, message.sender_username, message.recipient_id,
+                 message.content, message.timestamp, message.message_type,
+                 int(message.delivered), int(message.read)) for message in messages
+            ])
+            conn.commit()
 
     def get_messages(self, user_id: str, contact_id: str = None, limit: int = 100) -> List[Dict]:
         """Busca mensagens"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        if contact_id:
-            cursor.execute('''
-                SELECT * FROM messages
-                WHERE (sender_id = ? AND recipient_id = ?) OR (sender_id = ? AND recipient_id = ?)
-                ORDER BY timestamp DESC LIMIT ?
-            ''', (user_id, contact_id, contact_id, user_id, limit))
-        else:
-            cursor.execute('''
-                SELECT * FROM messages
-                WHERE sender_id = ? OR recipient_id = ?
-                ORDER BY timestamp DESC LIMIT ?
-            ''', (user_id, user_id, limit))
-
-        results = cursor.fetchall()
-        conn.close()
+        with self.pool.connection() as conn:
+            if contact_id:
+                results = conn.execute(_SQL_GET_CONVERSATION,
+                                       (user_id, contact_id, contact_id, user_id, limit)).fetchall()
+            else:
+                results = conn.execute(_SQL_GET_USER_MESSAGES, (user_id, user_id, limit)).fetchall()
 
         messages = []
         for row in results:
-            messages.append({
-                'id': row[0],
-                'sender_id': row[1],
-                'sender_username': row[2],
-                'recipient_id': row[3],
-                'content': row[4],
-                'timestamp': row[5],
-                'message_type': row[6],
-                'delivered': bool(row[7]),
-                'read': bool(row[8]),
-                'formatted_time': datetime.fromtimestamp(row[5]).strftime("%H:%M")
-            })
+            message = dict(row)
+            message['delivered'] = bool(message['delivered'])
+            message['read'] = bool(message['read'])
+            message['formatted_time'] = time.strftime("%H:%M", time.localtime(message['timestamp']))
+            messages.append(message)
         return messages[::-1]
 
     def save_discovered_peer(self, peer):
         """Salva peer descoberto"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT OR REPLACE INTO discovered_peers
-            (node_id, host, port, username, tunnel_url, discovery_method, last_seen, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (peer.node_id, peer.host, peer.port, peer.username,
-              peer.tunnel_url, peer.discovery_method, peer.last_seen, 'online'))
-        conn.commit()
-        conn.close()
+        self.save_discovered_peers([peer])
+
+    def save_discovered_peers(self, peers: list):
+        """Salva vários peers descobertos (rajada da descoberta) em um único commit"""
+        with self.pool.connection() as conn:
+            conn.executemany(_SQL_SAVE_PEER, [
+                (peer.node_id, peer.host, peer.port, peer.username,
+                 peer.tunnel_url, peer.discovery_method, peer.last_seen, 'online') for peer in peers
+            ])
+            conn.commit()
 
     def get_discovered_peers(self) -> List[Dict]:
         """Lista peers descobertos"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM discovered_peers WHERE status = "online"')
-        results = cursor.fetchall()
-        conn.close()
+        with self.pool.connection() as conn:
+            results = conn.execute(_SQL_GET_PEERS).fetchall()
 
-        peers = []
-        for row in results:
-            peers.append({
-                'node_id': row[0],
-                'host': row[1],
-                'port': row[2],
-                'username': row[3],
-                'tunnel_url': row[4],
-                'discovery_method': row[5],
-                'last_seen': row[6],
-                'status': row[7]
-            })
-        return peers
+        return [dict(row) for row in results]
 
     def set_setting(self, key: str, value: str):
         """Salva configuração"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)', (key, value))
-        conn.commit()
-        conn.close()
+        with self.pool.connection() as conn:
+            conn.execute(_SQL_SET_SETTING, (key, value))
+            conn.commit()
 
     def get_setting(self, key: str) -> Optional[str]:
         """Busca configuração"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT value FROM settings WHERE key = ?', (key,))
-        result = cursor.fetchone()
-        conn.close()
+        with self.pool.connection() as conn:
+            result = conn.execute(_SQL_GET_SETTING, (key,)).fetchone()
         return result[0] if result else None
 
     def get_connection(self):
@@ -1,6 +1,9 @@
+import asyncio
+import time
 import uuid
 import logging
-from typing import Optional
+from typing import Dict, List, Optional
+import orjson
 from .database import P2PDatabase
 from ..network.cloudflare import CloudflareManager
 
@@ -10,6 +13,15 @@ logger = logging.getLogger(__name__)
 class P2PNode:
     """Nó P2P central do sistema"""
 
+    # Fila de saída por destinatário e quantas mensagens um writer junta num só frame
+    PEER_QUEUE_SIZE = 1024
+    PEER_BATCH_SIZE = 32
+    # Writer sem mensagens por esse tempo encerra e libera a fila do destinatário
+    PEER_IDLE_TIMEOUT = 60.0
+
+    # Validade da lista de peers em cache (consultada em polling pela interface)
+    PEERS_CACHE_TTL = 0.5
+
     def __init__(self, port: int = 8000):
         self.port = port
         self.host = "localhost"
@@ -30,13 +42,24 @@ class P2PNode:
 
         self.node_id = self.current_user_id
 
-        # Sistema de descoberta de rede
-        self.network_manager = None
-        self.setup_network_discovery()
+        # Cache da lista de peers: (instante monotônico, peers) e versão bumpada a cada add/drop
+        self._peers_cache: tuple = (0.0, [])
+        self._peers_version = 0
 
-        # DHT (mantém compatibilidade)
+        # Descoberta de rede e DHT: configurados em start(), no startup da aplicação
+        self.network_manager = None
         self.dht = None
-        self.setup_dht()
+
+        # Envio P2P: uma fila e um único writer por destinatário (nada de task por mensagem)
+        self._peer_queues: Dict[str, asyncio.Queue] = {}
+        self._peer_writers: Dict[str, asyncio.Task] = {}
+
+    async def start(self):
+        """Configura descoberta de rede e DHT em paralelo, fora do event loop (imports + construção)"""
+        await asyncio.gather(
+            asyncio.to_thread(self.setup_network_discovery),
+            asyncio.to_thread(self.setup_dht)
+        )
 
     def setup_network_discovery(self):
         """Configura descoberta de rede"""
@@ -48,6 +71,7 @@ class P2PNode:
                 user['username'] if user else 'Unknown',
                 self.port
             )
+            self.network_manager.on_peers_changed = self.invalidate_peers
             logger.info("✅ Network discovery configurado")
         except ImportError:
             logger.warning("⚠️ network_discovery.py não encontrado - usando descoberta básica")
@@ -70,11 +94,82 @@ class P2PNode:
         return self.db.get_user(self.current_user_id)
 
     def get_discovered_peers(self) -> list:
-        """Obtém peers descobertos"""
-        return self.db.get_discovered_peers()
+        """Obtém peers descobertos (snapshot em cache por PEERS_CACHE_TTL)"""
+        ts, peers = self._peers_cache
+        if time.monotonic() - ts < self.PEERS_CACHE_TTL:
+            return peers
+
+        version = self._peers_version
+        peers = self.db.get_discovered_peers()
+        # Não guarda a leitura se um peer entrou/saiu enquanto ela rodava
+        if version == self._peers_version:
+            self._peers_cache = (time.monotonic(), peers)
+        return peers
+
+    def invalidate_peers(self):
+        """Descarta a lista de peers em cache (chamado pelo NetworkManager ao adicionar/remover peers)"""
+        self._peers_version += 1
+        self._peers_cache = (0.0, [])
+
+    def get_discovered_peers_columnar(self) -> dict:
+        """Obtém peers descobertos em colunas paralelas (ids, addrs, last_seen)"""
+        peers = self.get_discovered_peers()
+        return {
+            "ids": [peer['node_id'] for peer in peers],
+            "addrs": [f"{peer['host']}:{peer['port']}" for peer in peers],
+            "last_seen": [peer['last_seen'] for peer in peers]
+        }
 
     async def send_p2p_message(self, message):
-        """Envia mensagem P2P (placeholder)"""
-        # TODO: Implementar envio P2P real
-        logger.info(f"Enviando mensagem P2P: {message.id}")
-        pass
\ No newline at end of file
+        """Enfileira a mensagem para o destinatário; o writer dele faz o envio"""
+        peer_id = message.recipient_id
+        queue = self._peer_queues.get(peer_id)
+        if queue is None:
+            queue = self._peer_queues[peer_id] = asyncio.Queue(maxsize=self.PEER_QUEUE_SIZE)
+            self._peer_writers[peer_id] = asyncio.create_task(self._peer_writer(peer_id, queue))
+
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # A mensagem já está salva no banco; só a entrega imediata é descartada
+            logger.warning(f"⚠️ Fila de envio cheia para {peer_id[:8]} - mensagem {message.id} não enviada")
+
+    async def _peer_writer(self, peer_id: str, queue: asyncio.Queue):
+        """Drena a fila do destinatário em ordem, juntando as mensagens pendentes num só frame
+
+        Encerra após PEER_IDLE_TIMEOUT sem mensagens: destinatários vêm da requisição e não se
+        acumulam writers/filas para sempre (um envio posterior cria outros).
+        """
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), self.PEER_IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                if not queue.empty():
+                    continue
+                if self._peer_queues.get(peer_id) is queue:
+                    del self._peer_queues[peer_id]
+                    del self._peer_writers[peer_id]
+                return
+
+            batch = [message]
+            while len(batch) < self.PEER_BATCH_SIZE and not queue.empty():
+                batch.append(queue.get_nowait())
+
+            try:
+                await self._deliver_frame(peer_id, batch, orjson.dumps(batch))
+            except Exception as e:
+                logger.warning(f"Erro enviando mensagens P2P para {peer_id[:8]}: {e}")
+
+    async def _deliver_frame(self, peer_id: str, messages: List, frame: bytes):
+        """Entrega um frame de mensagens ao peer (placeholder)"""
+        # TODO: Implementar transporte P2P real (uma escrita por frame)
+        logger.info(f"Enviando {len(messages)} mensagem(ns) P2P para {peer_id[:8]} ({len(frame)} bytes)")
+
+    async def stop_p2p_writers(self):
+        """Cancela os writers de envio P2P (encerramento)"""
+        writers = list(self._peer_writers.values())
+        for task in writers:
+            task.cancel()
+        await asyncio.gather(*writers, return_exceptions=True)
+        self._peer_writers.clear()
+        self._peer_queues.clear()
\ No newline at end of file
@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from typing import Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class User:
     """Usuário da rede"""
     user_id: str
@@ -13,7 +13,7 @@ class User:
     avatar: str = ""
 
 
-@dataclass
+@dataclass(slots=True)
 class Contact:
     """Contato do usuário"""
     contact_id: str
@@ -23,7 +23,7 @@ class Contact:
     unread_count: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class Message:
     """Mensagem da rede"""
     id: str
@@ -37,7 +37,7 @@ class Message:
     read: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class Peer:
     """Peer da rede (legado)"""
     node_id: str
@@ -1,31 +1,65 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+from typing import Dict
+import asyncio
+import msgspec
 from .service import ChatService
 from .models import Message
 import time
 import uuid
 
-router = APIRouter(prefix="/api/chat", tags=["chat"])
+
+class SendBody(msgspec.Struct):
+    """Corpo de POST /api/chat/send"""
+    recipient_id: str
+    content: str
+
+
+class ContactBody(msgspec.Struct):
+    """Corpo de POST /api/chat/contacts"""
+    contact_id: str
+    username: str
+
+
+# Decodificam e validam o corpo cru em uma única passada em C (sem dict intermediário)
+_SEND_DECODER = msgspec.json.Decoder(SendBody)
+_CONTACT_DECODER = msgspec.json.Decoder(ContactBody)
+
+
+async def decode_body(request: Request, decoder: msgspec.json.Decoder):
+    """Decodifica o corpo da requisição; JSON inválido ou campos faltando viram 400"""
+    try:
+        return decoder.decode(await request.body())
+    except (msgspec.ValidationError, msgspec.DecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 def setup_chat_routes(chat_service: ChatService, node) -> APIRouter:
     """Configura as rotas do chat"""
+    # Router novo a cada chamada: cada app registra as rotas uma única vez
+    router = APIRouter(prefix="/api/chat", tags=["chat"])
+
+    # Métodos opcionais do nó resolvidos uma vez aqui, não a cada requisição
+    send_p2p = getattr(node, 'send_p2p_message', None)
 
-    @router.get("/messages/{contact_id}")
-    async def get_messages(contact_id: str) -> List[Dict]:
+    async def get_messages(contact_id: str) -> Response:
         """Obtém mensagens com um contato"""
         try:
-            messages = chat_service.get_conversation(node.current_user_id, contact_id)
-            return {"messages": messages}
+            await chat_service.flush()
+            # Leitura do SQLite + orjson.dumps fora do event loop (como run_db nas rotas do núcleo)
+            body = await asyncio.get_running_loop().run_in_executor(
+                None, chat_service.get_conversation_json, node.current_user_id, contact_id
+            )
+            return Response(content=body, media_type="application/json")
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
-    @router.post("/send")
-    async def send_message(data: Dict[str, Any]) -> Dict:
+    async def send_message(request: Request) -> Dict:
         """Envia uma mensagem"""
+        data = await decode_body(request, _SEND_DECODER)
         try:
-            recipient_id = data.get('recipient_id')
-            content = data.get('content')
+            recipient_id = data.recipient_id
+            content = data.content
 
             if not recipient_id or not content:
                 raise HTTPException(status_code=400, detail="recipient_id e content são obrigatórios")
@@ -34,7 +68,7 @@ def setup_chat_routes(chat_service: ChatService, node) -> APIRouter:
             if not user:
                 raise HTTPException(status_code=404, detail="Usuário não encontrado")
 
-            message = chat_service.create_message(
+            message = await chat_service.create_message(
                 sender_id=node.current_user_id,
                 sender_username=user['username'],
                 recipient_id=recipient_id,
@@ -42,9 +76,9 @@ def setup_chat_routes(chat_service: ChatService, node) -> APIRouter:
             )
 
             # Tentar entregar a mensagem via P2P se possível
-            if hasattr(node, 'send_p2p_message'):
+            if send_p2p is not None:
                 try:
-                    await node.send_p2p_message(message)
+                    await send_p2p(message)
                 except Exception as e:
                     print(f"Erro enviando mensagem P2P: {e}")
 
@@ -54,10 +88,11 @@ def setup_chat_routes(chat_service: ChatService, node) -> APIRouter:
                 "timestamp": message.timestamp
             }
 
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
-    @router.get("/contacts")
     async def get_contacts() -> Dict:
         """Obtém lista de contatos"""
         try:
@@ -66,12 +101,12 @@ def setup_chat_routes(chat_service: ChatService, node) -> APIRouter:
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
-    @router.post("/contacts")
-    async def add_contact(data: Dict[str, Any]) -> Dict:
+    async def add_contact(request: Request) -> Dict:
         """Adiciona um novo contato"""
+        data = await decode_body(request, _CONTACT_DECODER)
         try:
-            contact_id = data.get('contact_id')
-            username = data.get('username')
+            contact_id = data.contact_id
+            username = data.username
 
             if not contact_id or not username:
                 raise HTTPException(status_code=400, detail="contact_id e username são obrigatórios")
@@ -80,10 +115,11 @@ def setup_chat_routes(chat_service: ChatService, node) -> APIRouter:
 
             return {"success": True, "message": "Contato adicionado com sucesso"}
 
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
-    @router.delete("/contacts/{contact_id}")
     async def remove_contact(contact_id: str) -> Dict:
         """Remove um contato"""
         try:
@@ -92,13 +128,25 @@ def setup_chat_routes(chat_service: ChatService, node) -> APIRouter:
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
-    @router.post("/messages/{contact_id}/mark-read")
     async def mark_messages_read(contact_id: str) -> Dict:
         """Marca todas as mensagens de um contato como lidas"""
         try:
+            # Grava antes as mensagens ainda na fila: senão chegariam ao banco depois, como não lidas
+            await chat_service.flush()
             chat_service.mark_messages_as_read(node.current_user_id, contact_id)
             return {"success": True, "message": "Mensagens marcadas como lidas"}
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
+    # Registro explícito; response_model=None pula a validação/serialização via pydantic das respostas
+    for path, handler, method in (
+        ("/messages/{contact_id}", get_messages, "GET"),
+        ("/send", send_message, "POST"),
+        ("/contacts", get_contacts, "GET"),
+        ("/contacts", add_contact, "POST"),
+        ("/contacts/{contact_id}", remove_contact, "DELETE"),
+        ("/messages/{contact_id}/mark-read", mark_messages_read, "POST"),
+    ):
+        router.add_api_route(path, handler, methods=[method], response_model=None)
+
     return router
\ No newline at end of file
@@ -1,56 +1,239 @@
-import uuid
+import asyncio
+import logging
+import threading
 import time
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from secrets import token_hex
+from typing import Dict, List, Optional, Tuple
+import orjson
 from .models import User, Contact, Message
 from ...core.database import P2PDatabase
 
+logger = logging.getLogger(__name__)
+
 
 class ChatService:
     """Serviço responsável pela lógica de negócio do chat"""
 
+    # Fila de escrita (write-behind): mensagens aguardando gravação e máximo por transação
+    WRITE_QUEUE_SIZE = 10_000
+    WRITE_BATCH_SIZE = 256
+    # Lote com falha é regravado com espera exponencial (segundos); stop() desiste após o timeout
+    WRITE_RETRY_DELAY = 0.5
+    WRITE_RETRY_DELAY_MAX = 30.0
+    STOP_FLUSH_TIMEOUT = 10.0
+
+    # Cache de leitura (conversas e contatos consultados em polling pela interface)
+    CACHE_SIZE = 1024
+    CACHE_TTL = 5.0
+
     def __init__(self, database: P2PDatabase):
         self.db = database
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+        # (user_id, contact_id, limit) -> (instante, mensagens); user_id -> (instante, contatos)
+        self._conv_cache: "OrderedDict[Tuple[str, Optional[str], int], Tuple[float, List[Dict]]]" = OrderedDict()
+        self._contacts_cache: "OrderedDict[str, Tuple[float, List[Dict]]]" = OrderedDict()
+        # Mesma chave das conversas -> JSON já serializado da resposta
+        self._conv_json_cache: "OrderedDict[Tuple[str, Optional[str], int], Tuple[float, bytes]]" = OrderedDict()
+        self._cache_generation = 0
+        self._cache_lock = threading.Lock()
+
+        # (destinatário, remetente) -> não lidas; carregado sob demanda e mantido pelas escritas (LRU)
+        self._unread: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self._writes_in_flight = 0
+
+    def start(self):
+        """Inicia a gravação em lote das mensagens (chamar dentro do event loop)"""
+        if self._flush_task is None:
+            self._write_queue = asyncio.Queue(maxsize=self.WRITE_QUEUE_SIZE)
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Grava o que estiver na fila e encerra a tarefa de gravação"""
+        if self._flush_task is None:
+            return
+        try:
+            await asyncio.wait_for(self.flush(), self.STOP_FLUSH_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.error(f"Encerrando com {self._write_queue.qsize()} mensagens não gravadas")
+        self._flush_task.cancel()
+        try:
+            await self._flush_task
+        except asyncio.CancelledError:
+            pass
+        self._flush_task = None
+        self._write_queue = None
+
+    async def flush(self):
+        """Aguarda até todas as mensagens enfileiradas estarem no banco"""
+        if self._write_queue is not None:
+            await self._write_queue.join()
+
+    async def _flush_loop(self):
+        """Consome a fila gravando cada rajada com um executemany e um único commit"""
+        queue = self._write_queue
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.WRITE_BATCH_SIZE:
+                try:
+                    batch.append(queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
 
-    def create_message(self, sender_id: str, sender_username: str,
-                      recipient_id: str, content: str) -> Message:
-        """Cria uma nova mensagem"""
-        message = Message(
-            id=str(uuid.uuid4()),
-            sender_id=sender_id,
-            sender_username=sender_username,
-            recipient_id=recipient_id,
-            content=content,
-            timestamp=time.time(),
-            message_type="chat",
-            delivered=False,
-            read=False
-        )
-        self.db.save_message(message)
+            self._set_write_in_flight(1)
+            try:
+                # O /send já respondeu sucesso: o lote é regravado até entrar no banco
+                delay = self.WRITE_RETRY_DELAY
+                while True:
+                    try:
+                        await loop.run_in_executor(None, self.db.save_messages, batch)
+                        break
+                    except Exception as e:
+                        logger.error(f"Erro gravando {len(batch)} mensagens (nova tentativa em {delay:.1f}s): {e}")
+                        await asyncio.sleep(delay)
+                        delay = min(delay * 2, self.WRITE_RETRY_DELAY_MAX)
+                self._messages_saved(batch)
+            finally:
+                self._set_write_in_flight(-1)
+                for _ in batch:
+                    queue.task_done()
+
+    async def create_message(self, sender_id: str, sender_username: str,
+                             recipient_id: str, content: str) -> Message:
+        """Cria uma nova mensagem (gravada em segundo plano pela fila de escrita)"""
+        # Posicional na ordem dos campos de Message; tipo "chat", não entregue e não lida são os defaults
+        message = Message(token_hex(16), sender_id, sender_username, recipient_id, content, time.time())
+        if self._write_queue is not None:
+            await self._write_queue.put(message)
+        else:
+            self._set_write_in_flight(1)
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.db.save_message, message)
+                self._messages_saved([message])
+            finally:
+                self._set_write_in_flight(-1)
         return message
 
+    def _set_write_in_flight(self, delta: int):
+        """Marca início (+1)/fim (-1) de uma gravação de mensagens"""
+        with self._cache_lock:
+            self._writes_in_flight += delta
+
+    def _messages_saved(self, messages: List[Message]):
+        """Atualiza caches depois que as mensagens chegaram ao banco"""
+        for message in messages:
+            self._invalidate(message.sender_id, message.recipient_id)
+            key = (message.recipient_id, message.sender_id)
+            with self._cache_lock:
+                # Só ajusta contagens já carregadas; as demais vêm do banco, já com a mensagem
+                if key in self._unread:
+                    self._unread[key] += 1
+
+    def _cache_get(self, cache: OrderedDict, key):
+        """Valor em cache ainda dentro do TTL (None se ausente/expirado) e a geração atual"""
+        with self._cache_lock:
+            entry = cache.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.CACHE_TTL:
+                cache.move_to_end(key)
+                return entry[1], self._cache_generation
+            return None, self._cache_generation
+
+    def _cache_put(self, cache: OrderedDict, key, value, generation: int):
+        """Guarda a leitura, exceto se houve escrita enquanto ela rodava"""
+        with self._cache_lock:
+            if generation == self._cache_generation:
+                cache[key] = (time.monotonic(), value)
+                if len(cache) > self.CACHE_SIZE:
+                    cache.popitem(last=False)
+
+    def _invalidate(self, user_a: str, user_b: str):
+        """Descarta conversas entre os dois usuários (e as listagens gerais deles) e seus contatos"""
+        users = (user_a, user_b)
+        with self._cache_lock:
+            self._cache_generation += 1
+            for cache in (self._conv_cache, self._conv_json_cache):
+                for key in [k for k in cache if k[0] in users and (k[1] is None or k[1] in users)]:
+                    del cache[key]
+            self._contacts_cache.pop(user_a, None)
+            self._contacts_cache.pop(user_b, None)
+
     def get_conversation(self, user_id: str, contact_id: str = None, limit: int = 100) -> List[Dict]:
         """Obtém conversas entre dois usuários ou todas as mensagens"""
-        return self.db.get_messages(user_id, contact_id, limit)
+        key = (user_id, contact_id, limit)
+        messages, generation = self._cache_get(self._conv_cache, key)
+        if messages is None:
+            messages = self.db.get_messages(user_id, contact_id, limit)
+            self._cache_put(self._conv_cache, key, messages, generation)
+        return messages
+
+    def get_conversation_json(self, user_id: str, contact_id: str = None, limit: int = 100) -> bytes:
+        """{"messages": [...]} já em JSON: serializado uma vez por atualização da conversa"""
+        key = (user_id, contact_id, limit)
+        body, generation = self._cache_get(self._conv_json_cache, key)
+        if body is None:
+            body = orjson.dumps({"messages": self.get_conversation(user_id, contact_id, limit)})
+            self._cache_put(self._conv_json_cache, key, body, generation)
+        return body
 
     def get_user_contacts(self, user_id: str) -> List[Dict]:
         """Obtém lista de contatos do usuário"""
-        return self.db.get_contacts(user_id)
+        contacts, generation = self._cache_get(self._contacts_cache, user_id)
+        if contacts is None:
+            contacts = self.db.get_contacts(user_id)
+            self._cache_put(self._contacts_cache, user_id, contacts, generation)
+        return contacts
 
     def add_contact(self, owner_id: str, contact_id: str, username: str):
         """Adiciona um novo contato"""
         self.db.add_contact(owner_id, contact_id, username)
+        self._invalidate(owner_id, contact_id)
 
     def remove_contact(self, owner_id: str, contact_id: str):
         """Remove um contato"""
         self.db.remove_contact(owner_id, contact_id)
+        self._invalidate(owner_id, contact_id)
 
     def mark_messages_as_read(self, recipient_id: str, sender_id: str):
         """Marca todas as mensagens de um contato como lidas"""
+        with self._cache_lock:
+            generation = self._cache_generation
         self.db.mark_messages_as_read(recipient_id, sender_id)
+        self._invalidate(recipient_id, sender_id)
+        with self._cache_lock:
+            # Zera a contagem, a menos que outra escrita tenha ocorrido no meio (aí recarrega do banco)
+            if self._cache_generation == generation + 1 and not self._writes_in_flight:
+                self._store_unread((recipient_id, sender_id), 0)
+            else:
+                self._unread.pop((recipient_id, sender_id), None)
 
     def get_unread_count(self, recipient_id: str, sender_id: str) -> int:
         """Obtém contagem de mensagens não lidas de um contato específico"""
-        return self.db.get_unread_count(recipient_id, sender_id)
+        key = (recipient_id, sender_id)
+        with self._cache_lock:
+            count = self._unread.get(key)
+            generation = self._cache_generation
+            if count is not None:
+                self._unread.move_to_end(key)
+        if count is not None:
+            return count
+
+        count = self.db.get_unread_count(recipient_id, sender_id)
+        with self._cache_lock:
+            # Descarta a leitura se alguma mensagem foi gravada/lida enquanto ela rodava:
+            # a contagem do banco já incluiria mensagens que _messages_saved ainda vai somar
+            if generation == self._cache_generation and not self._writes_in_flight:
+                self._store_unread(key, count)
+        return count
+
+    def _store_unread(self, key: Tuple[str, str], count: int):
+        """Guarda a contagem descartando a menos usada além de CACHE_SIZE (chamar com _cache_lock)"""
+        self._unread[key] = count
+        self._unread.move_to_end(key)
+        if len(self._unread) > self.CACHE_SIZE:
+            self._unread.popitem(last=False)
 
     def mark_message_as_delivered(self, message_id: str):
         """Marca mensagem como entregue"""
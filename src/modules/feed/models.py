@@ -1,11 +1,10 @@
-import uuid
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from secrets import token_hex
 from typing import List, Dict, Optional
-from datetime import datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class Post:
     """Modelo para posts do feed"""
     id: str
@@ -23,14 +22,8 @@ class Post:
     shares_count: int = 0
     weight_score: float = 1.0  # Score calculado com base no peso dos votos
     is_pinned: bool = False
-    tags: List[str] = None
-    metadata: Dict = None
-
-    def __post_init__(self):
-        if self.tags is None:
-            self.tags = []
-        if self.metadata is None:
-            self.metadata = {}
+    tags: List[str] = field(default_factory=list)
+    metadata: Dict = field(default_factory=dict)
 
     @classmethod
     def create(cls, author_id: str, author_username: str, content: str,
@@ -42,7 +35,7 @@ class Post:
             thread_level = 1  # Será calculado dinamicamente pelo serviço
 
         return cls(
-            id=str(uuid.uuid4()),
+            id=token_hex(16),
             author_id=author_id,
             author_username=author_username,
             content=content,
@@ -55,7 +48,7 @@ class Post:
     @property
     def formatted_time(self) -> str:
         """Retorna timestamp formatado"""
-        return datetime.fromtimestamp(self.timestamp).strftime("%d/%m/%Y %H:%M")
+        return time.strftime("%d/%m/%Y %H:%M", time.localtime(self.timestamp))
 
     @property
     def net_votes(self) -> int:
@@ -63,7 +56,7 @@ class Post:
         return self.upvotes - self.downvotes
 
 
-@dataclass
+@dataclass(slots=True)
 class Vote:
     """Modelo para votos em posts"""
     id: str
@@ -72,24 +65,23 @@ class Vote:
     voter_username: str
     vote_type: str  # "up", "down"
     vote_weight: float = 1.0  # Peso do voto baseado na reputação do usuário
-    timestamp: float = time.time()
+    timestamp: float = field(default_factory=time.time)
 
     @classmethod
     def create(cls, post_id: str, voter_id: str, voter_username: str,
                vote_type: str, vote_weight: float = 1.0):
         """Cria um novo voto"""
         return cls(
-            id=str(uuid.uuid4()),
+            id=token_hex(16),
             post_id=post_id,
             voter_id=voter_id,
             voter_username=voter_username,
             vote_type=vote_type,
-            vote_weight=vote_weight,
-            timestamp=time.time()
+            vote_weight=vote_weight
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class CommunityBadge:
     """Modelo para selos comunitários"""
     id: str
@@ -97,23 +89,22 @@ class CommunityBadge:
     badge_type: str  # "funny", "informative", "controversial", "helpful", "creative"
     awarded_by: str
     awarded_by_username: str
-    timestamp: float = time.time()
+    timestamp: float = field(default_factory=time.time)
     count: int = 1  # Quantas vezes foi atribuído
 
     @classmethod
     def create(cls, post_id: str, badge_type: str, awarded_by: str, awarded_by_username: str):
         """Cria um novo selo comunitário"""
         return cls(
-            id=str(uuid.uuid4()),
+            id=token_hex(16),
             post_id=post_id,
             badge_type=badge_type,
             awarded_by=awarded_by,
-            awarded_by_username=awarded_by_username,
-            timestamp=time.time()
+            awarded_by_username=awarded_by_username
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class UserReputation:
     """Modelo para reputação do usuário"""
     user_id: str
@@ -126,7 +117,7 @@ class UserReputation:
     engagement_score: float = 1.0  # Score de engajamento
     vote_weight: float = 1.0  # Peso dos votos deste usuário
     reputation_level: str = "novato"  # novato, ativo, experiente, especialista, lenda
-    last_updated: float = time.time()
+    last_updated: float = field(default_factory=time.time)
 
     @property
     def vote_accuracy(self) -> float:
@@ -136,15 +127,27 @@ class UserReputation:
         # Aqui seria calculado com base no histórico de votos bem-sucedidos
         return min(1.0, self.positive_votes_received / self.total_votes_given)
 
-    def calculate_vote_weight(self) -> float:
+    def recalculate(self):
+        """Atualiza os campos derivados (vote_weight, reputation_level) após mudar os contadores
+
+        Leituras usam os campos já calculados; a precisão dos votos é computada uma vez só.
+        """
+        accuracy = self.vote_accuracy
+        self.vote_weight = self.calculate_vote_weight(accuracy)
+        self.update_reputation_level(accuracy)
+
+    def calculate_vote_weight(self, accuracy: Optional[float] = None) -> float:
         """Calcula o peso do voto baseado na reputação"""
+        if accuracy is None:
+            accuracy = self.vote_accuracy
+
         base_weight = 1.0
 
         # Bônus por engajamento
         engagement_bonus = min(2.0, self.engagement_score)
 
         # Bônus por precisão de votos
-        accuracy_bonus = self.vote_accuracy * 0.5
+        accuracy_bonus = accuracy * 0.5
 
         # Bônus por selos recebidos
         badge_bonus = min(1.0, self.badges_received * 0.1)
@@ -154,9 +157,12 @@ class UserReputation:
 
         return min(5.0, weight)  # Máximo de 5x
 
-    def update_reputation_level(self):
-        """Atualiza o nível de reputação baseado nas métricas"""
-        score = self.engagement_score + self.vote_accuracy + (self.badges_received * 0.1)
+    def update_reputation_level(self, accuracy: Optional[float] = None):
+        """Atualiza o nível de reputação baseado nas métricas (e carimba last_updated)"""
+        if accuracy is None:
+            accuracy = self.vote_accuracy
+        self.last_updated = time.time()
+        score = self.engagement_score + accuracy + (self.badges_received * 0.1)
 
         if score >= 10:
             self.reputation_level = "lenda"
@@ -170,7 +176,7 @@ class UserReputation:
             self.reputation_level = "novato"
 
 
-@dataclass
+@dataclass(slots=True)
 class SubThread:
     """Modelo para sub-threads (ramificações de discussão)"""
     id: str
@@ -180,7 +186,7 @@ class SubThread:
     description: str
     created_by: str
     created_by_username: str
-    timestamp: float = time.time()
+    timestamp: float = field(default_factory=time.time)
     posts_count: int = 0
     participants_count: int = 0
     is_active: bool = True
@@ -190,14 +196,13 @@ class SubThread:
                created_by: str, created_by_username: str, parent_thread_id: Optional[str] = None):
         """Cria uma nova sub-thread"""
         return cls(
-            id=str(uuid.uuid4()),
+            id=token_hex(16),
             root_post_id=root_post_id,
             parent_thread_id=parent_thread_id,
             title=title,
             description=description,
             created_by=created_by,
-            created_by_username=created_by_username,
-            timestamp=time.time()
+            created_by_username=created_by_username
         )
 
 
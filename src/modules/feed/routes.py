@@ -1,44 +1,93 @@
-from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import JSONResponse
-from typing import Dict, Any, List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, Response
+from typing import Annotated, Dict, Any, List, Literal, Optional
+import hashlib
 import logging
+import orjson
+from pydantic import BaseModel, StringConstraints
 
 from .service import FeedService
 from .models import BADGE_TYPES, POST_TYPES
 
 logger = logging.getLogger(__name__)
 
+# Texto obrigatório: espaços das pontas removidos e ao menos um caractere
+NonEmptyStr = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]
+StrippedStr = Annotated[str, StringConstraints(strip_whitespace=True)]
+
+
+class CreatePostIn(BaseModel):
+    """Corpo de POST /api/feed/posts"""
+    content: NonEmptyStr
+    post_type: Literal[tuple(POST_TYPES)] = "text"
+    parent_post_id: Optional[str] = None
+    tags: List[str] = []
+
+
+class VoteIn(BaseModel):
+    """Corpo de POST /api/feed/posts/{post_id}/vote"""
+    vote_type: Literal["up", "down"]
+
+
+class AwardBadgeIn(BaseModel):
+    """Corpo de POST /api/feed/posts/{post_id}/badges"""
+    badge_type: Literal[tuple(BADGE_TYPES)]
+
+
+class CreateThreadIn(BaseModel):
+    """Corpo de POST /api/feed/posts/{post_id}/threads"""
+    title: NonEmptyStr
+    description: StrippedStr = ""
+    parent_thread_id: Optional[str] = None
+
+
+def _static_body(payload: dict) -> tuple:
+    """Serializa uma resposta fixa uma única vez: (corpo, ETag)"""
+    body = orjson.dumps(payload)
+    return body, f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+# Respostas fixas das rotas de referência (pré-serializadas na importação)
+_BADGE_TYPES_BODY = _static_body({"success": True, "badge_types": BADGE_TYPES})
+_POST_TYPES_BODY = _static_body({"success": True, "post_types": POST_TYPES})
+_STATS_BODY = _static_body({
+    "success": True,
+    "stats": {
+        "total_posts": 0,
+        "total_votes": 0,
+        "total_badges": 0,
+        "active_threads": 0,
+        "message": "Estatísticas serão implementadas em breve"
+    }
+})
+STATIC_MAX_AGE = 3600
+
+# Campos fixos de cada selo (nome legível e tipo); por requisição só entra a contagem
+_BADGE_META = {badge_type: {"name": name, "type": badge_type} for badge_type, name in BADGE_TYPES.items()}
+
+
+def static_json_response(request: Request, static: tuple) -> Response:
+    """Serve um corpo pré-serializado com ETag; If-None-Match igual responde 304 sem corpo"""
+    body, etag = static
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={STATIC_MAX_AGE}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 
 def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
     """Configura rotas do feed social"""
-    router = APIRouter(prefix="/api/feed", tags=["feed"])
+    router = APIRouter(prefix="/api/feed", tags=["feed"], default_response_class=ORJSONResponse)
 
     # ========== POSTS ==========
 
     @router.post("/posts")
-    async def create_post(data: Dict[str, Any]):
+    async def create_post(data: CreatePostIn):
         """Cria um novo post"""
         try:
-            content = data.get('content')
-            post_type = data.get('post_type', 'text')
-            parent_post_id = data.get('parent_post_id')
-            tags = data.get('tags', [])
-
-            if not content or not content.strip():
-                return JSONResponse(
-                    status_code=400,
-                    content={"error": "Conteúdo do post é obrigatório"}
-                )
-
-            if post_type not in POST_TYPES:
-                return JSONResponse(
-                    status_code=400,
-                    content={"error": f"Tipo de post inválido: {post_type}"}
-                )
-
             user = node.get_current_user()
             if not user:
-                return JSONResponse(
+                return ORJSONResponse(
                     status_code=401,
                     content={"error": "Usuário não autenticado"}
                 )
@@ -46,10 +95,10 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
             post = feed_service.create_post(
                 author_id=node.current_user_id,
                 author_username=user['username'],
-                content=content.strip(),
-                post_type=post_type,
-                parent_post_id=parent_post_id,
-                tags=tags
+                content=data.content,
+                post_type=data.post_type,
+                parent_post_id=data.parent_post_id,
+                tags=data.tags
             )
 
             return {
@@ -68,7 +117,7 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
 
         except Exception as e:
             logger.error(f"Erro criando post: {e}")
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=500,
                 content={"error": str(e)}
             )
@@ -83,29 +132,22 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
         try:
             user = node.get_current_user()
             if not user:
-                return JSONResponse(
+                return ORJSONResponse(
                     status_code=401,
                     content={"error": "Usuário não autenticado"}
                 )
 
-            posts = feed_service.get_feed(
+            body = feed_service.get_feed_json(
                 user_id=node.current_user_id,
                 limit=limit,
                 offset=offset,
                 sort_by=sort_by
             )
-
-            return {
-                "success": True,
-                "posts": posts,
-                "total": len(posts),
-                "offset": offset,
-                "sort_by": sort_by
-            }
+            return Response(content=body, media_type="application/json")
 
         except Exception as e:
             logger.error(f"Erro obtendo feed: {e}")
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=500,
                 content={"error": str(e)}
             )
@@ -116,22 +158,19 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
         try:
             user = node.get_current_user()
             if not user:
-                return JSONResponse(
+                return ORJSONResponse(
                     status_code=401,
                     content={"error": "Usuário não autenticado"}
                 )
 
-            post = feed_service.get_post_by_id(post_id)
+            # Já inclui o voto do usuário atual ('user_vote')
+            post = feed_service.get_post_by_id(post_id, node.current_user_id)
             if not post:
-                return JSONResponse(
+                return ORJSONResponse(
                     status_code=404,
                     content={"error": "Post não encontrado"}
                 )
 
-            # Incluir voto do usuário atual
-            user_vote = feed_service.get_user_vote(post_id, node.current_user_id)
-            post['user_vote'] = user_vote
-
             return {
                 "success": True,
                 "post": post
@@ -139,7 +178,7 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
 
         except Exception as e:
             logger.error(f"Erro obtendo post {post_id}: {e}")
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=500,
                 content={"error": str(e)}
             )
@@ -154,18 +193,17 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
         try:
             user = node.get_current_user()
             if not user:
-                return JSONResponse(
+                return ORJSONResponse(
                     status_code=401,
                     content={"error": "Usuário não autenticado"}
                 )
 
             comments = feed_service.get_post_comments(post_id, limit, offset)
 
-            # Adicionar voto do usuário para cada comentário
+            # Adicionar voto do usuário para cada comentário (uma consulta para a página toda)
+            votes = feed_service.get_user_votes([comment['id'] for comment in comments], node.current_user_id)
             for comment in comments:
-                comment['user_vote'] = feed_service.get_user_vote(
-                    comment['id'], node.current_user_id
-                )
+                comment['user_vote'] = votes.get(comment['id'])
 
             return {
                 "success": True,
@@ -176,7 +214,7 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
 
         except Exception as e:
             logger.error(f"Erro obtendo comentários do post {post_id}: {e}")
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=500,
                 content={"error": str(e)}
             )
@@ -184,20 +222,14 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
     # ========== VOTAÇÃO ==========
 
     @router.post("/posts/{post_id}/vote")
-    async def vote_post(post_id: str, data: Dict[str, Any]):
+    async def vote_post(post_id: str, data: VoteIn):
         """Vota em um post"""
         try:
-            vote_type = data.get('vote_type')
-
-            if vote_type not in ["up", "down"]:
-                return JSONResponse(
-                    status_code=400,
-                    content={"error": "Tipo de voto deve ser 'up' ou 'down'"}
-                )
+            vote_type = data.vote_type
 
             user = node.get_current_user()
             if not user:
-                return JSONResponse(
+                return ORJSONResponse(
                     status_code=401,
                     content={"error": "Usuário não autenticado"}
                 )
@@ -210,14 +242,13 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
             )
 
             if not success:
-                return JSONResponse(
+                return ORJSONResponse(
                     status_code=400,
                     content={"error": "Erro ao processar voto"}
                 )
 
             # Retornar estado atualizado do post
-            post = feed_service.get_post_by_id(post_id)
-            user_vote = feed_service.get_user_vote(post_id, node.current_user_id)
+            post = feed_service.get_post_by_id(post_id, node.current_user_id)
 
             return {
                 "success": True,
@@ -228,12 +259,12 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
                     "net_votes": post['net_votes'],
                     "weight_score": post['weight_score']
                 },
-                "user_vote": user_vote
+                "user_vote": post['user_vote']
             }
 
         except Exception as e:
             logger.error(f"Erro votando no post {post_id}: {e}")
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=500,
                 content={"error": str(e)}
             )
@@ -241,23 +272,14 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
     # ========== SELOS COMUNITÁRIOS ==========
 
     @router.post("/posts/{post_id}/badges")
-    async def award_badge(post_id: str, data: Dict[str, Any]):
+    async def award_badge(post_id: str, data: AwardBadgeIn):
         """Atribui selo comunitário a um post"""
         try:
-            badge_type = data.get('badge_type')
-
-            if badge_type not in BADGE_TYPES:
-                return JSONResponse(
-                    status_code=400,
-                    content={
-                        "error": f"Tipo de selo inválido: {badge_type}",
-                        "available_badges": list(BADGE_TYPES.keys())
-                    }
-                )
+            badge_type = data.badge_type
 
             user = node.get_current_user()
             if not user:
-                return JSONResponse(
+                return ORJSONResponse(
                     status_code=401,
                     content={"error": "Usuário não autenticado"}
                 )
@@ -270,7 +292,7 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
             )
 
             if not success:
-                return JSONResponse(
+                return ORJSONResponse(
                     status_code=400,
                     content={"error": "Você já atribuiu este selo a este post"}
                 )
@@ -286,7 +308,7 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
 
         except Exception as e:
             logger.error(f"Erro atribuindo selo ao post {post_id}: {e}")
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=500,
                 content={"error": str(e)}
             )
@@ -297,14 +319,11 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
         try:
             badges = feed_service.get_post_badges(post_id)
 
-            # Formatar com nomes legíveis
-            formatted_badges = {}
-            for badge_type, count in badges.items():
-                formatted_badges[badge_type] = {
-                    "count": count,
-                    "name": BADGE_TYPES.get(badge_type, badge_type),
-                    "type": badge_type
-                }
+            # Formatar com nomes legíveis (tipos desconhecidos usam o próprio tipo como nome)
+            formatted_badges = {
+                badge_type: {"count": count, **(_BADGE_META.get(badge_type) or {"name": badge_type, "type": badge_type})}
+                for badge_type, count in badges.items()
+            }
 
             return {
                 "success": True,
@@ -313,7 +332,7 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
 
         except Exception as e:
             logger.error(f"Erro obtendo selos do post {post_id}: {e}")
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=500,
                 content={"error": str(e)}
             )
@@ -321,33 +340,23 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
     # ========== SUB-THREADS ==========
 
     @router.post("/posts/{post_id}/threads")
-    async def create_sub_thread(post_id: str, data: Dict[str, Any]):
+    async def create_sub_thread(post_id: str, data: CreateThreadIn):
         """Cria uma sub-thread para um post"""
         try:
-            title = data.get('title')
-            description = data.get('description', '')
-            parent_thread_id = data.get('parent_thread_id')
-
-            if not title or not title.strip():
-                return JSONResponse(
-                    status_code=400,
-                    content={"error": "Título da sub-thread é obrigatório"}
-                )
-
             user = node.get_current_user()
             if not user:
-                return JSONResponse(
+                return ORJSONResponse(
                     status_code=401,
                     content={"error": "Usuário não autenticado"}
                 )
 
             sub_thread = feed_service.create_sub_thread(
                 root_post_id=post_id,
-                title=title.strip(),
-                description=description.strip(),
+                title=data.title,
+                description=data.description,
                 created_by=node.current_user_id,
                 created_by_username=user['username'],
-                parent_thread_id=parent_thread_id
+                parent_thread_id=data.parent_thread_id
             )
 
             return {
@@ -363,7 +372,7 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
 
         except Exception as e:
             logger.error(f"Erro criando sub-thread para post {post_id}: {e}")
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=500,
                 content={"error": str(e)}
             )
@@ -382,7 +391,7 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
 
         except Exception as e:
             logger.error(f"Erro obtendo sub-threads do post {post_id}: {e}")
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=500,
                 content={"error": str(e)}
             )
@@ -396,7 +405,7 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
             reputation = feed_service.get_user_reputation(user_id)
 
             if not reputation:
-                return JSONResponse(
+                return ORJSONResponse(
                     status_code=404,
                     content={"error": "Reputação não encontrada"}
                 )
@@ -420,7 +429,7 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
 
         except Exception as e:
             logger.error(f"Erro obtendo reputação do usuário {user_id}: {e}")
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=500,
                 content={"error": str(e)}
             )
@@ -431,7 +440,7 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
         try:
             user = node.get_current_user()
             if not user:
-                return JSONResponse(
+                return ORJSONResponse(
                     status_code=401,
                     content={"error": "Usuário não autenticado"}
                 )
@@ -440,7 +449,7 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
 
         except Exception as e:
             logger.error(f"Erro obtendo minha reputação: {e}")
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=500,
                 content={"error": str(e)}
             )
@@ -456,7 +465,7 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
         try:
             user = node.get_current_user()
             if not user:
-                return JSONResponse(
+                return ORJSONResponse(
                     status_code=401,
                     content={"error": "Usuário não autenticado"}
                 )
@@ -489,7 +498,7 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
 
         except Exception as e:
             logger.error(f"Erro na pesquisa '{q}': {e}")
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=500,
                 content={"error": str(e)}
             )
@@ -506,7 +515,7 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
         try:
             current_user = node.get_current_user()
             if not current_user:
-                return JSONResponse(
+                return ORJSONResponse(
                     status_code=401,
                     content={"error": "Usuário não autenticado"}
                 )
@@ -527,7 +536,7 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
 
         except Exception as e:
             logger.error(f"Erro obtendo posts do usuário {user_id}: {e}")
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=500,
                 content={"error": str(e)}
             )
@@ -543,14 +552,14 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
             content = data.get('content', '')
 
             if retweet_type not in ['simple', 'quote']:
-                return JSONResponse(
+                return ORJSONResponse(
                     status_code=400,
                     content={"error": "Tipo de retweet deve ser 'simple' ou 'quote'"}
                 )
 
             user = node.get_current_user()
             if not user:
-                return JSONResponse(
+                return ORJSONResponse(
                     status_code=401,
                     content={"error": "Usuário não autenticado"}
                 )
@@ -558,7 +567,7 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
             # Verificar se o post existe
             original_post = feed_service.get_post_by_id(post_id)
             if not original_post:
-                return JSONResponse(
+                return ORJSONResponse(
                     status_code=404,
                     content={"error": "Post não encontrado"}
                 )
@@ -580,7 +589,7 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
 
         except Exception as e:
             logger.error(f"Erro republicando post {post_id}: {e}")
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=500,
                 content={"error": str(e)}
             )
@@ -588,44 +597,20 @@ def setup_feed_routes(feed_service: FeedService, node) -> APIRouter:
     # ========== INFORMAÇÕES GERAIS ==========
 
     @router.get("/badge-types")
-    async def get_badge_types():
+    async def get_badge_types(request: Request):
         """Lista tipos de selos disponíveis"""
-        return {
-            "success": True,
-            "badge_types": BADGE_TYPES
-        }
+        return static_json_response(request, _BADGE_TYPES_BODY)
 
     @router.get("/post-types")
-    async def get_post_types():
+    async def get_post_types(request: Request):
         """Lista tipos de posts disponíveis"""
-        return {
-            "success": True,
-            "post_types": POST_TYPES
-        }
+        return static_json_response(request, _POST_TYPES_BODY)
 
     @router.get("/stats")
-    async def get_feed_stats():
+    async def get_feed_stats(request: Request):
         """Estatísticas gerais do feed"""
-        try:
-            # TODO: Implementar estatísticas gerais
-            # Por enquanto, retornar dados básicos
-
-            return {
-                "success": True,
-                "stats": {
-                    "total_posts": 0,
-                    "total_votes": 0,
-                    "total_badges": 0,
-                    "active_threads": 0,
-                    "message": "Estatísticas serão implementadas em breve"
-                }
-            }
-
-        except Exception as e:
-            logger.error(f"Erro obtendo estatísticas: {e}")
-            return JSONResponse(
-                status_code=500,
-                content={"error": str(e)}
-            )
+        # TODO: Implementar estatísticas gerais
+        # Por enquanto, retornar dados básicos (fixos)
+        return static_json_response(request, _STATS_BODY)
 
     return router
\ No newline at end of file
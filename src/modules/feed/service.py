@@ -3,7 +3,9 @@ import json
 import time
 import logging
 import threading
+from collections import OrderedDict
 from typing import List, Dict, Optional, Tuple
+import orjson
 from ..feed.models import Post, Vote, CommunityBadge, UserReputation, SubThread, BADGE_TYPES
 
 logger = logging.getLogger(__name__)
@@ -12,10 +14,43 @@ logger = logging.getLogger(__name__)
 class FeedService:
     """Serviço principal para operações do feed social"""
 
+    # Cache de leitura (feed e selos consultados em polling pela interface); qualquer escrita invalida
+    CACHE_SIZE = 256
+    FEED_CACHE_TTL = 30.0
+    BADGES_CACHE_TTL = 120.0
+
     def __init__(self, database):
         self.db = database
         self._db_lock = threading.RLock()
 
+        # chave -> (expira_em, valor); ("feed", usuário, ordem, offset, limite) e ("badges", post)
+        self._cache: "OrderedDict[Tuple, Tuple[float, object]]" = OrderedDict()
+        self._cache_generation = 0
+        self._cache_lock = threading.Lock()
+
+    def _cache_get(self, key):
+        """Valor em cache ainda válido (None se ausente/expirado) e a geração atual"""
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None and time.monotonic() < entry[0]:
+                self._cache.move_to_end(key)
+                return entry[1], self._cache_generation
+            return None, self._cache_generation
+
+    def _cache_put(self, key, value, ttl: float, generation: int):
+        """Guarda a leitura, exceto se houve escrita enquanto ela rodava"""
+        with self._cache_lock:
+            if generation == self._cache_generation:
+                self._cache[key] = (time.monotonic() + ttl, value)
+                if len(self._cache) > self.CACHE_SIZE:
+                    self._cache.popitem(last=False)
+
+    def _invalidate(self):
+        """Descarta o cache de leitura (posts, votos, selos e reputação mudaram)"""
+        with self._cache_lock:
+            self._cache_generation += 1
+            self._cache.clear()
+
     def _get_connection_with_retry(self, max_retries=3):
         """Obtém conexão com retry automático"""
         for attempt in range(max_retries):
@@ -54,6 +89,7 @@ class FeedService:
         if parent_post_id:
             self._increment_comments_count(parent_post_id)
 
+        self._invalidate()
         logger.info(f"Post criado: {post.id} por {author_username}")
         return post
 
@@ -72,18 +108,21 @@ class FeedService:
             "engagement": "ORDER BY (upvotes + downvotes + comments_count) DESC, timestamp DESC"
         }.get(sort_by, "ORDER BY timestamp DESC")
 
+        # Voto do usuário já vem na mesma consulta (sem uma busca extra por post)
         cursor.execute(f'''
-            SELECT fp.*, ur.reputation_level, ur.vote_weight
+            SELECT fp.*, ur.reputation_level, ur.vote_weight, v.vote_type AS user_vote
             FROM feed_posts fp
             LEFT JOIN user_reputation ur ON fp.author_id = ur.user_id
+            LEFT JOIN feed_votes v ON v.post_id = fp.id AND v.voter_id = ?
             WHERE fp.parent_post_id IS NULL
             {order_clause}
             LIMIT ? OFFSET ?
-        ''', (limit, offset))
+        ''', (user_id, limit, offset))
 
         posts = []
         for row in cursor.fetchall():
             post_data = self._row_to_post_dict(row)
+            post_data['user_vote'] = row[19]
 
             # Carregar badges do post
             post_data['badges'] = self._get_post_badges(post_data['id'])
@@ -96,25 +135,45 @@ class FeedService:
         conn.close()
         return posts
 
-    def get_post_by_id(self, post_id: str) -> Optional[Dict]:
-        """Busca um post específico"""
+    def get_feed_json(self, user_id: str, limit: int = 50, offset: int = 0,
+                      sort_by: str = "timestamp") -> bytes:
+        """Resposta de GET /api/feed/posts já em JSON: serializada uma vez por atualização do feed"""
+        key = ("feed", user_id, sort_by, offset, limit)
+        body, generation = self._cache_get(key)
+        if body is None:
+            posts = self.get_feed(user_id, limit, offset, sort_by)
+            body = orjson.dumps({
+                "success": True,
+                "posts": posts,
+                "total": len(posts),
+                "offset": offset,
+                "sort_by": sort_by
+            })
+            self._cache_put(key, body, self.FEED_CACHE_TTL, generation)
+        return body
+
+    def get_post_by_id(self, post_id: str, voter_id: Optional[str] = None) -> Optional[Dict]:
+        """Busca um post específico (com 'user_vote' do voter_id, se informado)"""
         conn = sqlite3.connect(self.db.db_path, timeout=30)
         conn.execute('PRAGMA journal_mode=WAL')
         conn.execute('PRAGMA busy_timeout=30000')
         cursor = conn.cursor()
 
         cursor.execute('''
-            SELECT fp.*, ur.reputation_level, ur.vote_weight
+            SELECT fp.*, ur.reputation_level, ur.vote_weight, v.vote_type AS user_vote
             FROM feed_posts fp
             LEFT JOIN user_reputation ur ON fp.author_id = ur.user_id
+            LEFT JOIN feed_votes v ON v.post_id = fp.id AND v.voter_id = ?
             WHERE fp.id = ?
-        ''', (post_id,))
+        ''', (voter_id, post_id))
 
         row = cursor.fetchone()
         conn.close()
 
         if row:
             post_data = self._row_to_post_dict(row)
+            if voter_id is not None:
+                post_data['user_vote'] = row[19]
             post_data['badges'] = self._get_post_badges(post_id)
             post_data['comments'] = self._get_post_comments(post_id)
             return post_data
@@ -150,7 +209,7 @@ class FeedService:
                         logger.info(f"Voto atualizado: {voter_username} em {post_id}")
                 else:
                     # Criar novo voto
-                    vote_weight = self._get_user_vote_weight(voter_id)
+                    vote_weight = self._get_vote_weights_with_conn(conn, [voter_id])[voter_id]
                     vote = Vote.create(post_id, voter_id, voter_username, vote_type, vote_weight)
                     self._save_vote_with_conn(conn, vote)
                     logger.info(f"Novo voto: {voter_username} ({vote_type}) em {post_id}")
@@ -160,6 +219,7 @@ class FeedService:
                 self._update_user_stats_with_conn(conn, voter_id, votes_given_increment=1)
 
                 conn.commit()
+                self._invalidate()
                 return True
 
             except Exception as e:
@@ -169,11 +229,72 @@ class FeedService:
             finally:
                 conn.close()
 
+    def cast_votes(self, votes: List[Vote]) -> int:
+        """Grava uma rajada de votos em uma única transação (executemany + um commit)
+
+        Um voto por (post, votante): votos repetidos substituem o anterior (UNIQUE em feed_votes).
+        O peso vem da reputação do votante, como em vote_post. Retorna quantos votos válidos
+        foram gravados.
+        """
+        votes = [vote for vote in votes if vote.vote_type in ("up", "down")]
+        if not votes:
+            return 0
+
+        with self._db_lock:
+            conn = self._get_connection_with_retry()
+            try:
+                weights = self._get_vote_weights_with_conn(conn, [vote.voter_id for vote in votes])
+                for vote in votes:
+                    vote.vote_weight = weights[vote.voter_id]
+
+                # Só votos em posts ainda não votados contam em votes_given (os demais substituem)
+                new_pairs = {(vote.post_id, vote.voter_id) for vote in votes}
+                new_pairs -= self._existing_vote_pairs_with_conn(conn, new_pairs)
+
+                self._save_votes_with_conn(conn, votes)
+
+                # Pontuação recalculada uma vez por post e estatísticas uma vez por votante
+                for post_id in {vote.post_id for vote in votes}:
+                    self._recalculate_post_scores_with_conn(conn, post_id)
+                votes_given: Dict[str, int] = {}
+                for _, voter_id in new_pairs:
+                    votes_given[voter_id] = votes_given.get(voter_id, 0) + 1
+                for voter_id, count in votes_given.items():
+                    self._update_user_stats_with_conn(conn, voter_id, votes_given_increment=count)
+
+                conn.commit()
+                self._invalidate()
+                logger.info(f"{len(votes)} votos gravados em lote")
+                return len(votes)
+
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Erro gravando {len(votes)} votos: {e}")
+                raise
+            finally:
+                conn.close()
+
     def get_user_vote(self, post_id: str, user_id: str) -> Optional[str]:
         """Retorna o tipo de voto do usuário no post"""
         vote = self._get_user_vote(post_id, user_id)
         return vote['vote_type'] if vote else None
 
+    def get_user_votes(self, post_ids: List[str], voter_id: str) -> Dict[str, str]:
+        """Votos do usuário em vários posts com uma única consulta (post_id -> tipo do voto)"""
+        if not post_ids:
+            return {}
+
+        placeholders = ",".join("?" * len(post_ids))
+        conn = sqlite3.connect(self.db.db_path, timeout=30)
+        conn.execute('PRAGMA busy_timeout=30000')
+        try:
+            return dict(conn.execute(
+                f'SELECT post_id, vote_type FROM feed_votes WHERE voter_id = ? AND post_id IN ({placeholders})',
+                [voter_id, *post_ids]
+            ).fetchall())
+        finally:
+            conn.close()
+
     # ========== SELOS COMUNITÁRIOS ==========
 
     def award_badge(self, post_id: str, badge_type: str, awarded_by: str,
@@ -194,12 +315,18 @@ class FeedService:
         if post:
             self._update_user_stats(post['author_id'], badges_increment=1)
 
+        self._invalidate()
         logger.info(f"Selo '{badge_type}' atribuído ao post {post_id} por {awarded_by_username}")
         return True
 
     def get_post_badges(self, post_id: str) -> Dict[str, int]:
         """Retorna contagem de selos do post"""
-        return self._get_post_badges(post_id)
+        key = ("badges", post_id)
+        badges, generation = self._cache_get(key)
+        if badges is None:
+            badges = self._get_post_badges(post_id)
+            self._cache_put(key, badges, self.BADGES_CACHE_TTL, generation)
+        return badges
 
     # ========== SUB-THREADS ==========
 
@@ -284,11 +411,10 @@ class FeedService:
             # Recalcular métricas
             stats = self._calculate_user_engagement_stats(user_id)
             reputation.engagement_score = stats['engagement_score']
-            reputation.vote_weight = reputation.calculate_vote_weight()
-            reputation.update_reputation_level()
-            reputation.last_updated = time.time()
+            reputation.recalculate()
 
             self._save_user_reputation(reputation)
+            self._invalidate()
 
     # ========== MÉTODOS INTERNOS ==========
 
@@ -329,13 +455,16 @@ class FeedService:
 
     def _save_vote_with_conn(self, conn, vote: Vote):
         """Salva voto no banco usando conexão existente"""
-        cursor = conn.cursor()
-        cursor.execute('''
+        self._save_votes_with_conn(conn, [vote])
+
+    def _save_votes_with_conn(self, conn, votes: List[Vote]):
+        """Salva vários votos com um único executemany usando conexão existente"""
+        conn.executemany('''
             INSERT OR REPLACE INTO feed_votes
             (id, post_id, voter_id, voter_username, vote_type, vote_weight, timestamp)
             VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (vote.id, vote.post_id, vote.voter_id, vote.voter_username,
-              vote.vote_type, vote.vote_weight, vote.timestamp))
+        ''', [(vote.id, vote.post_id, vote.voter_id, vote.voter_username,
+               vote.vote_type, vote.vote_weight, vote.timestamp) for vote in votes])
 
     def _save_badge(self, badge: CommunityBadge):
         """Salva selo no banco"""
@@ -493,10 +622,30 @@ class FeedService:
             }
         return None
 
-    def _get_user_vote_weight(self, user_id: str) -> float:
-        """Obtém peso do voto do usuário"""
-        reputation = self.get_user_reputation(user_id)
-        return reputation.vote_weight if reputation else 1.0
+    def _get_vote_weights_with_conn(self, conn, user_ids: List[str]) -> Dict[str, float]:
+        """Pesos de voto já materializados em user_reputation, em uma consulta (1.0 sem reputação)
+
+        Lê só a coluna vote_weight (gravada por calculate_user_reputation), sem montar UserReputation
+        nem recalcular o peso por voto.
+        """
+        weights = dict.fromkeys(user_ids, 1.0)
+        placeholders = ",".join("?" * len(weights))
+        weights.update(conn.execute(
+            f'SELECT user_id, vote_weight FROM user_reputation WHERE user_id IN ({placeholders})',
+            list(weights)
+        ).fetchall())
+        return weights
+
+    def _existing_vote_pairs_with_conn(self, conn, pairs) -> set:
+        """Quais pares (post_id, voter_id) já têm voto gravado, em uma consulta"""
+        post_ids = list({post_id for post_id, _ in pairs})
+        voter_ids = list({voter_id for _, voter_id in pairs})
+        rows = conn.execute(
+            f'SELECT post_id, voter_id FROM feed_votes WHERE post_id IN ({",".join("?" * len(post_ids))}) '
+            f'AND voter_id IN ({",".join("?" * len(voter_ids))})',
+            post_ids + voter_ids
+        ).fetchall()
+        return {row for row in map(tuple, rows) if row in pairs}
 
     def _calculate_thread_level(self, parent_post_id: str) -> int:
         """Calcula nível da thread"""
@@ -771,6 +920,7 @@ class FeedService:
             retweets_count = cursor.fetchone()[0]
 
             conn.commit()
+            self._invalidate()
             return {
                 "retweet_id": retweet_id,
                 "retweets_count": retweets_count
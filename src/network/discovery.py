@@ -11,7 +11,7 @@ import json
 import requests
 import asyncio
 import logging
-from typing import List, Dict, Tuple, Optional
+from typing import Callable, List, Dict, Tuple, Optional
 from dataclasses import dataclass
 import struct
 import psutil  # pip install psutil
@@ -349,6 +349,9 @@ class NetworkManager:
         
         # Cache de peers
         self.all_peers: Dict[str, DiscoveredPeer] = {}
+
+        # Chamado quando um peer entra ou sai (ex.: P2PNode.invalidate_peers)
+        self.on_peers_changed: Optional[Callable[[], None]] = None
         
     def start(self):
         """Inicia todos os sistemas de descoberta"""
@@ -372,7 +375,9 @@ class NetworkManager:
             try:
                 # Atualiza peers LAN
                 lan_peers = self.lan_discovery.get_discovered_peers()
+                changed = False
                 for peer in lan_peers:
+                    changed = changed or peer.node_id not in self.all_peers
                     self.all_peers[peer.node_id] = peer
                 
                 # Remove peers antigos
@@ -383,6 +388,9 @@ class NetworkManager:
                 ]
                 for pid in expired:
                     del self.all_peers[pid]
+
+                if changed or expired:
+                    self._notify_peers_changed()
                 
                 logger.info(f"📊 Peers ativos: {len(self.all_peers)} (LAN: {len(lan_peers)})")
                 
@@ -392,6 +400,11 @@ class NetworkManager:
                 logger.error(f"Erro na descoberta periódica: {e}")
                 time.sleep(30)
     
+    def _notify_peers_changed(self):
+        """Avisa o callback registrado que o conjunto de peers mudou"""
+        if self.on_peers_changed:
+            self.on_peers_changed()
+
     def get_all_peers(self) -> List[DiscoveredPeer]:
         """Retorna todos os peers descobertos"""
         return list(self.all_peers.values())
@@ -417,6 +430,7 @@ class NetworkManager:
                 )
                 
                 self.all_peers[peer.node_id] = peer
+                self._notify_peers_changed()
                 logger.info(f"➕ Peer manual adicionado: {peer.username} ({host}:{port})")
                 return peer
             